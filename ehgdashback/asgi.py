@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ehgdashback.settings")
+# Sob ASGI, form POST, contagem de notificações, sessão e sidebar usam views async.
+os.environ.setdefault("DJANGO_ROOT_URLCONF", "ehgdashback.urls_asgi")
 
 application = get_asgi_application()
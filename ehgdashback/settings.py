@@ -44,6 +44,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
+    # rejeita flood nos POSTs públicos antes de sessão/auth/ORM
+    "src.common.middleware.rate_limit.PublicWriteRateLimitMiddleware",
 
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -55,7 +57,8 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
-ROOT_URLCONF = "ehgdashback.urls"
+# asgi.py troca para "ehgdashback.urls_asgi" (views async nos endpoints mais acessados)
+ROOT_URLCONF = os.environ.get("DJANGO_ROOT_URLCONF", "ehgdashback.urls")
 
 TEMPLATES = [
     {
@@ -87,6 +90,32 @@ DATABASES = {
     }
 }
 
+# CACHE — compartilhado entre workers/nós quando REDIS_URL estiver definido
+REDIS_URL = os.environ.get("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# RATE LIMIT (janela deslizante, src/common/ratelimit.py) para /api/forms/ e /sheets/sheet-data/
+# capacity pedidos por janela de capacity / refill_per_minute minutos
+RATE_LIMIT_PUBLIC_WRITES = {
+    "per_form_type": {"capacity": 5, "refill_per_minute": 10},   # por IP + formType (na view)
+    "per_ip": {"capacity": 20, "refill_per_minute": 60},         # por IP, todas as rotas somadas (middleware)
+    # proxies nossos na frente da app; o IP vem do X-Forwarded-For contado da direita.
+    # Errar para mais deixa o cliente escolher o próprio IP; para menos, todos dividem o do proxy
+    "trusted_proxies": int(os.environ.get("RATE_LIMIT_TRUSTED_PROXIES", "1")),
+}
+
 # DRF
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
@@ -147,3 +176,30 @@ SESSION_COOKIE_SECURE = False if DEBUG else True
 CSRF_COOKIE_SECURE = False if DEBUG else True
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
+
+# FORMS — reenvio suprimido até N segundos depois do envio aceito (src/forms/dedup.py)
+FORMS_DEDUP_WINDOW_SECONDS = 10 * 60
+
+# NOTIFICATIONS — push (SSE) em /api/notifications/stream/ (src/notifications/broker.py)
+# "local": só conexões do mesmo processo; "postgres": LISTEN/NOTIFY entre processos/nós
+# vazio: "postgres" quando o banco é Postgres, senão "local"
+NOTIFICATIONS_BROKER = os.environ.get("NOTIFICATIONS_BROKER", "")
+NOTIFICATIONS_STREAM_HEARTBEAT_SECONDS = 25
+
+# REPORTS — arquivos gerados pelo worker (python manage.py run_report_worker)
+REPORTS_OUTPUT_DIR = Path(os.environ.get("REPORTS_OUTPUT_DIR", BASE_DIR / "var" / "reports"))
+REPORT_JOB_HEARTBEAT_SECONDS = 30       # o worker renova ReportJob.heartbeat_at dos jobs que roda
+REPORT_JOB_TIMEOUT_SECONDS = 5 * 60     # job "Running" sem heartbeat há mais tempo que isso volta para a fila
+REPORT_JOB_MAX_ATTEMPTS = 3
+REPORTS_CACHE_MAX_BYTES = int(os.environ.get("REPORTS_CACHE_MAX_BYTES", 2 * 1024 ** 3))  # LRU dos resultados em cache
+REPORTS_INCREMENTAL_LAG_SECONDS = 60  # linhas mais novas que isso ficam fora dos parciais (transações ainda abertas)
+# custo estimado pelo EXPLAIN (unidades do planner do Postgres), ver src/reports/planner.py
+REPORTS_MAX_SYNC_COST = int(os.environ.get("REPORTS_MAX_SYNC_COST", 1_000_000))  # acima: export só pela fila
+REPORTS_MAX_COST = int(os.environ.get("REPORTS_MAX_COST", 50_000_000))           # acima: recusado
+REPORTS_SYNC_STATEMENT_TIMEOUT_MS = 30 * 1000       # export em streaming na request
+REPORTS_JOB_STATEMENT_TIMEOUT_MS = 10 * 60 * 1000   # geração no worker
+REPORTS_PREVIEW_SAMPLE_ROWS = 50_000                # tamanho alvo da amostra do preview (src/reports/preview.py)
+REPORTS_PREVIEW_STATEMENT_TIMEOUT_MS = 1000
+# execução particionada no worker (src/reports/parallel.py): processos por job e custo mínimo
+REPORTS_PARALLEL_PROCESSES = int(os.environ.get("REPORTS_PARALLEL_PROCESSES", os.cpu_count() or 1))
+REPORTS_PARALLEL_MIN_COST = 5_000_000
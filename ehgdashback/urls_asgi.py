@@ -0,0 +1,26 @@
+"""
+URL configuration usada quando o projeto roda sob ASGI (ehgdashback/asgi.py).
+
+Os endpoints mais acessados são atendidos por views async nativas (ORM async,
+sem ocupar uma thread enquanto esperam o Postgres). Todo o resto cai nas
+rotas normais de ehgdashback.urls.
+"""
+from django.urls import path, include
+
+from src.forms.api.async_views import forms_async_view
+from src.menu_itens.api.async_views import sidebar_async_view
+from src.notifications.api.async_views import notification_count_async_view, notification_stream_async_view
+from src.users.api.async_views import auth_session_async_view
+
+
+urlpatterns = [
+    path("api/forms/", forms_async_view, name="forms-async"),
+    path("api/notifications/count/", notification_count_async_view, name="notifications-count-async"),
+    # push (SSE) no lugar do polling de /count/; só existe sob ASGI
+    path("api/notifications/stream/", notification_stream_async_view, name="notifications-stream-async"),
+    path("api/auth/session/", auth_session_async_view, name="auth-session-async"),
+    path("api/menu/sidebar/", sidebar_async_view, name="sidebar-async"),
+
+    # demais rotas (sync / DRF)
+    path("", include("ehgdashback.urls")),
+]
@@ -0,0 +1,145 @@
+"""
+Benchmark: views sync (WSGI/DRF) x views async (ASGI) nos endpoints mais acessados.
+
+Sobe os dois servidores apontando para o mesmo banco, por exemplo:
+
+    gunicorn ehgdashback.wsgi -w 1 --threads 8 -b 127.0.0.1:8001
+    uvicorn ehgdashback.asgi:application --workers 1 --port 8002
+
+e roda:
+
+    python scripts/bench_async_views.py \\
+        --sync http://127.0.0.1:8001 --async http://127.0.0.1:8002 \\
+        --token <JWT access> --concurrency 10,50,200 --requests 2000
+
+Para cada endpoint e nível de concorrência imprime req/s, p50, p95, p99 e erros.
+Só usa a stdlib (asyncio + sockets) para não virar dependência do projeto.
+
+O POST de forms muda o e-mail e o X-Forwarded-For a cada requisição: com o mesmo
+corpo e o mesmo IP quase tudo voltaria 429 (limite por IP) ou cairia no dedup, e o
+número mediria só esses atalhos. O X-Forwarded-For só vale falando direto com o
+servidor (sem proxy na frente); atrás de um proxy, suba os servidores com
+RATE_LIMIT_PUBLIC_WRITES desligado para o bench. A coluna "errors" conta 429.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from urllib.parse import urlsplit
+
+ENDPOINTS = [
+    ("forms POST", "POST", "/api/forms/", {
+        "formType": "homepage", "first_name": "Bench", "last_name": "Mark",
+        "email": "bench@example.com", "phone": "5555555555", "zipCode": "33101",
+    }),
+    ("notifications count", "GET", "/api/notifications/count/", None),
+    ("auth session", "GET", "/api/auth/session/", None),
+    ("sidebar", "GET", "/api/menu/sidebar/", None),
+]
+
+
+_SEQ = itertools.count(1)
+
+
+def _vary(body):
+    """Corpo e IP únicos por requisição (sem 429 do limite por IP e sem dedup)."""
+    n = next(_SEQ)
+    body = {**body, "email": f"bench+{n}@example.com"}
+    ip = f"10.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}"
+    return body, ip
+
+
+async def _request(host, port, method, path, body, token):
+    forwarded_for = None
+    if body is not None:
+        body, forwarded_for = _vary(body)
+    payload = json.dumps(body).encode() if body is not None else b""
+    headers = [
+        f"{method} {path} HTTP/1.1",
+        f"Host: {host}:{port}",
+        "Connection: close",
+        "Accept: application/json",
+    ]
+    if forwarded_for:
+        headers.append(f"X-Forwarded-For: {forwarded_for}")
+    if token:
+        headers.append(f"Authorization: Bearer {token}")
+    if payload:
+        headers.append("Content-Type: application/json")
+        headers.append(f"Content-Length: {len(payload)}")
+    raw = ("\r\n".join(headers) + "\r\n\r\n").encode() + payload
+
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(raw)
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()  # descarta o resto da resposta
+    finally:
+        writer.close()
+    parts = status_line.split()
+    return int(parts[1]) if len(parts) > 1 else 0
+
+
+async def _run(base_url, method, path, body, token, concurrency, total):
+    url = urlsplit(base_url)
+    host, port = url.hostname, url.port or 80
+    latencies, errors = [], 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                status = await _request(host, port, method, path, body, token)
+            except OSError:
+                status = 0
+            latencies.append(time.perf_counter() - t0)
+            if status >= 400 or status == 0:
+                errors += 1
+
+    t_start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - t_start
+    return elapsed, latencies, errors
+
+
+def _pct(sorted_vals, p):
+    if not sorted_vals:
+        return 0.0
+    idx = min(len(sorted_vals) - 1, int(round(p / 100.0 * (len(sorted_vals) - 1))))
+    return sorted_vals[idx]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sync", dest="sync_url", required=True, help="URL base do servidor WSGI")
+    parser.add_argument("--async", dest="async_url", required=True, help="URL base do servidor ASGI")
+    parser.add_argument("--token", default="", help="JWT de acesso (endpoints autenticados)")
+    parser.add_argument("--concurrency", default="10,50,200")
+    parser.add_argument("--requests", type=int, default=1000, help="requisições por cenário")
+    args = parser.parse_args()
+
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    print(f"{'endpoint':<22}{'mode':<7}{'conc':>6}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for name, method, path, body in ENDPOINTS:
+        for conc in levels:
+            for mode, base in (("sync", args.sync_url), ("async", args.async_url)):
+                elapsed, lat, errors = asyncio.run(
+                    _run(base, method, path, body, args.token, conc, args.requests)
+                )
+                lat.sort()
+                print(
+                    f"{name:<22}{mode:<7}{conc:>6}"
+                    f"{len(lat) / elapsed:>10.1f}"
+                    f"{_pct(lat, 50) * 1000:>9.1f}{_pct(lat, 95) * 1000:>9.1f}{_pct(lat, 99) * 1000:>9.1f}"
+                    f"{errors:>8}"
+                )
+        if len(levels) > 1:
+            print()
+
+
+if __name__ == "__main__":
+    main()
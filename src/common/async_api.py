@@ -0,0 +1,170 @@
+# src/common/async_api.py
+"""
+Helpers para views async (ASGI) que não passam pelo DRF.
+
+O DRF ainda não suporta APIView async, então as views "quentes" servidas pelo
+ehgdashback/asgi.py usam views Django puras + estes helpers, reproduzindo a
+mesma regra de autenticação das views DRF: JWT primeiro, sessão como fallback.
+CSRF também segue o SessionAuthentication: exigido quando a sessão autentica o
+usuário, dispensado para um Bearer (JWT) válido e para anônimos
+(session_csrf_protect); Bearer inválido segue a regra da sessão.
+
+Views sync que fazem streaming (exports) usam streaming_content: sob ASGI o
+StreamingHttpResponse consumiria o iterador síncrono inteiro (sync_to_async(list))
+antes de enviar o primeiro byte.
+"""
+import json
+from functools import wraps
+from typing import AsyncIterator, Iterable, Union
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.views.decorators.csrf import csrf_exempt
+
+try:
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+    from rest_framework_simplejwt.settings import api_settings as jwt_settings
+except Exception:  # JWT é opcional, igual às views DRF
+    JWTAuthentication = None
+
+User = get_user_model()
+
+
+class _CSRFCheck(CsrfViewMiddleware):
+    # mesmo truque do DRF: devolve o motivo em vez da resposta 403 padrão
+    def _reject(self, request, reason):
+        return reason
+
+
+def _csrf_failure_reason(request):
+    check = _CSRFCheck(lambda req: None)
+    check.process_request(request)
+    return check.process_view(request, None, (), {})
+
+
+def session_csrf_protect(view):
+    """
+    CSRF como no SessionAuthentication do DRF, para views async.
+    JWT válido no header -> isento; sessão com usuário autenticado -> token CSRF
+    obrigatório (403 no formato do DRF); anônimo -> isento (POST público).
+    """
+    @wraps(view)
+    async def _wrapped(request, *args, **kwargs):
+        if await _ajwt_user(request) is None:
+            user = await request.auser()
+            if user.is_authenticated:
+                reason = _csrf_failure_reason(request)
+                if reason:
+                    return JsonResponse({"detail": f"CSRF Failed: {reason}"}, status=403)
+        return await view(request, *args, **kwargs)
+
+    # o CsrfViewMiddleware global não age: a regra acima é a única
+    return csrf_exempt(_wrapped)
+
+
+def _has_jwt_header(request) -> bool:
+    return JWTAuthentication is not None and bool(request.META.get(jwt_settings.AUTH_HEADER_NAME))
+
+
+async def _ajwt_user(request):
+    """Usuário do JWT do header Authorization (valida sem I/O, busca com o ORM async) ou None."""
+    if not _has_jwt_header(request):
+        return None
+    jwt_auth = JWTAuthentication()
+    header = jwt_auth.get_header(request)
+    raw_token = jwt_auth.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    try:
+        token = jwt_auth.get_validated_token(raw_token)
+        user_id = token[jwt_settings.USER_ID_CLAIM]
+    except (InvalidToken, TokenError, KeyError):
+        return None
+    try:
+        user = await User.objects.aget(**{jwt_settings.USER_ID_FIELD: user_id})
+    except User.DoesNotExist:
+        return None
+    return user if user.is_active else None
+
+
+async def aget_authenticated_user(request):
+    """
+    Retorna o usuário autenticado (ou None).
+    - Authorization: Bearer <token> -> valida o JWT sem I/O e busca o User com o ORM async
+    - sem header -> usuário da sessão via request.auser()
+    """
+    if _has_jwt_header(request):
+        return await _ajwt_user(request)
+
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+def async_login_required(view):
+    """
+    Equivalente async de permission_classes=[IsAuthenticated].
+    Injeta o usuário em request.user e responde 401 no mesmo formato do DRF.
+    """
+    @wraps(view)
+    async def _wrapped(request, *args, **kwargs):
+        user = await aget_authenticated_user(request)
+        if user is None:
+            return JsonResponse(
+                {"detail": "Authentication credentials were not provided."},
+                status=401,
+            )
+        request.user = user
+        return await view(request, *args, **kwargs)
+
+    return _wrapped
+
+
+def json_payload(request) -> dict:
+    """
+    Lê o corpo como JSON (frontend) com fallback para form-encoded.
+    Retorna {} se o corpo for inválido.
+    """
+    content_type = request.content_type or ""
+    if content_type.startswith("application/json"):
+        try:
+            data = json.loads(request.body or b"{}")
+        except (ValueError, UnicodeDecodeError):
+            return {}
+        return data if isinstance(data, dict) else {}
+    return request.POST.dict()
+
+
+async def aiter_sync(iterable: Iterable) -> AsyncIterator:
+    """
+    Iterador síncrono -> assíncrono, um item por vez via sync_to_async(thread_sensitive=True).
+    Todos os next() rodam na thread sync da request (ThreadSensitiveContext do
+    ASGIHandler): a conexão do banco e a transação abertas pelo gerador (cursor
+    server-side, statement_timeout) continuam nela entre um chunk e outro e são
+    fechadas quando o stream termina ou o cliente desconecta (close do gerador).
+    """
+    iterator = iter(iterable)
+    step = sync_to_async(next, thread_sensitive=True)
+    done = object()
+    try:
+        while True:
+            item = await step(iterator, done)
+            if item is done:
+                return
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            await sync_to_async(close, thread_sensitive=True)()
+
+
+def is_asgi_request(request) -> bool:
+    return isinstance(getattr(request, "_request", request), ASGIRequest)  # _request: Request do DRF
+
+
+def streaming_content(request, iterable: Iterable) -> Union[Iterable, AsyncIterator]:
+    """Conteúdo para StreamingHttpResponse: sob ASGI aiter_sync(iterable), sob WSGI o próprio iterável."""
+    return aiter_sync(iterable) if is_asgi_request(request) else iterable
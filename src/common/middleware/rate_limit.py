@@ -0,0 +1,50 @@
+# src/common/middleware/rate_limit.py
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from src.common.ratelimit import Bucket, ahit, bucket_key, client_ip, hit, public_write_conf, throttled_response
+
+
+class PublicWriteRateLimitMiddleware:
+    """
+    Limite por IP para POSTs públicos (/api/forms/ e /sheets/sheet-data/ somados,
+    um bucket por IP), IP via ratelimit.client_ip. Estoura -> 429 com
+    Retry-After, antes de chegar no ORM. Não lê o corpo: o limite por IP + formType
+    fica nas views (src.common.ratelimit.check_form_type).
+
+    Configurável via settings.RATE_LIMIT_PUBLIC_WRITES (mesmas chaves de ratelimit.DEFAULTS).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        conf = public_write_conf()
+        self.paths = tuple(conf["paths"])
+        self.per_ip = Bucket(**conf["per_ip"])
+        self.cache_alias = conf["cache"]
+        self.trusted_proxies = int(conf["trusted_proxies"])
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _applies(self, request) -> bool:
+        return request.method == "POST" and request.path in self.paths
+
+    def _key(self, request) -> str:
+        return bucket_key("ip", client_ip(request, self.trusted_proxies))
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if self._applies(request):
+            allowed, retry_after = hit(self._key(request), self.per_ip, self.cache_alias)
+            if not allowed:
+                return throttled_response(retry_after)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if self._applies(request):
+            allowed, retry_after = await ahit(self._key(request), self.per_ip, self.cache_alias)
+            if not allowed:
+                return throttled_response(retry_after)
+        return await self.get_response(request)
@@ -1,6 +1,8 @@
 # src/common/middleware/session_meta.py
 from datetime import datetime, timezone
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
 def _client_ip(request):
     xff = request.META.get("HTTP_X_FORWARDED_FOR")
     if xff:
@@ -12,11 +14,22 @@ class SessionMetaMiddleware:
     """
     Salva IP, user-agent e last_seen na sessão do usuário autenticado.
     Isso alimenta /api/users/<id>/sessions/ (o endpoint já lê 'ip' e 'ua').
+
+    Suporta sync e async: sob ASGI não força as views async a voltarem
+    para uma thread (usa request.auser() e a API async da sessão).
     """
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
         resp = self.get_response(request)
 
         try:
@@ -42,3 +55,29 @@ class SessionMetaMiddleware:
             pass
 
         return resp
+
+    async def __acall__(self, request):
+        resp = await self.get_response(request)
+
+        try:
+            user = await request.auser()
+            if user.is_authenticated:
+                sess = request.session
+                ua = request.META.get("HTTP_USER_AGENT", "Unknown")
+                ip = _client_ip(request)
+                touched = False
+
+                if await sess.aget("ua") != ua:
+                    await sess.aset("ua", ua)
+                    touched = True
+                if await sess.aget("ip") != ip:
+                    await sess.aset("ip", ip)
+                    touched = True
+
+                await sess.aset("last_seen", datetime.now(timezone.utc).isoformat())
+                if touched:
+                    await sess.asave()
+        except Exception:
+            pass
+
+        return resp
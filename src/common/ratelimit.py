@@ -0,0 +1,146 @@
+# src/common/ratelimit.py
+"""
+Limite de taxa guardado no cache do Django (settings.CACHES), janela deslizante.
+
+Cada chave conta os pedidos da janela atual com cache.add + cache.incr (atômicos
+no Redis, no Memcached e no LocMem): uma rajada concorrente recebe contagens
+1, 2, 3... e só as primeiras `capacity` passam. A janela anterior entra com peso
+proporcional ao que ainda resta dela (aproximação clássica de sliding window).
+
+Com um backend compartilhado (Redis/Memcached) o limite vale para todos os
+workers/nós.
+
+IP do cliente (client_ip): o X-Forwarded-For é lido da direita para a esquerda,
+pulando os `trusted_proxies` proxies nossos; o valor mais à esquerda é escrito
+pelo cliente e qualquer um escolheria o próprio bucket com ele.
+"""
+import hashlib
+import math
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+
+DEFAULTS = {
+    # rotas que aceitam escrita sem autenticação
+    "paths": ["/api/forms/", "/sheets/sheet-data/"],
+    # por IP + formType: poucos envios seguidos do mesmo formulário (checado na view)
+    "per_form_type": {"capacity": 5, "refill_per_minute": 10},
+    # por IP (todos os formulários somados; checado no middleware)
+    "per_ip": {"capacity": 20, "refill_per_minute": 60},
+    "cache": "default",
+    # proxies nossos na frente da app (cada um acrescenta o IP de quem o chamou no
+    # X-Forwarded-For); 0 = sem proxy, vale o REMOTE_ADDR
+    "trusted_proxies": 1,
+}
+
+
+@dataclass(frozen=True)
+class Bucket:
+    capacity: float          # pedidos por janela (rajada máxima)
+    refill_per_minute: float  # taxa média -> janela = capacity / taxa
+
+    @property
+    def window(self) -> int:
+        if self.refill_per_minute <= 0:
+            return 3600
+        return max(1, int(math.ceil(self.capacity * 60.0 / self.refill_per_minute)))
+
+
+def public_write_conf() -> dict:
+    """settings.RATE_LIMIT_PUBLIC_WRITES sobre DEFAULTS."""
+    return {**DEFAULTS, **getattr(settings, "RATE_LIMIT_PUBLIC_WRITES", {})}
+
+
+def client_ip(request, trusted_proxies: Optional[int] = None) -> str:
+    """IP de quem chamou o primeiro proxy confiável (ver docstring do módulo)."""
+    if trusted_proxies is None:
+        trusted_proxies = int(public_write_conf()["trusted_proxies"])
+    remote = request.META.get("REMOTE_ADDR") or "unknown"
+    if trusted_proxies <= 0:
+        return remote
+    hops = [h.strip() for h in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if h.strip()]
+    if not hops:
+        return remote
+    # o último proxy confiável acrescentou o IP de quem o chamou; além dele, tudo é do cliente
+    return hops[-min(trusted_proxies, len(hops))]
+
+
+def bucket_key(scope: str, *parts) -> str:
+    raw = "|".join(str(p) for p in parts)
+    return f"rl:{scope}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+
+def _windows(key: str, bucket: Bucket, now: float):
+    index, elapsed = divmod(now, bucket.window)
+    index = int(index)
+    return f"{key}:{index}", f"{key}:{index - 1}", elapsed
+
+
+def _decide(count: int, previous: int, elapsed: float, bucket: Bucket) -> Tuple[bool, int]:
+    """Função pura: (permitido, retry_after) a partir das contagens das duas janelas."""
+    weight = 1.0 - elapsed / bucket.window
+    if previous * weight + count <= bucket.capacity:
+        return True, 0
+    return False, max(1, int(math.ceil(bucket.window - elapsed)))
+
+
+def hit(key: str, bucket: Bucket, cache_alias: str = "default") -> Tuple[bool, int]:
+    cache = caches[cache_alias]
+    current, previous, elapsed = _windows(key, bucket, time.time())
+    # a janela atual vive 2x: ainda é lida como "anterior" pela próxima
+    cache.add(current, 0, timeout=2 * bucket.window)
+    try:
+        count = cache.incr(current)
+    except ValueError:
+        # expirou entre o add e o incr
+        cache.add(current, 1, timeout=2 * bucket.window)
+        count = 1
+    return _decide(count, cache.get(previous) or 0, elapsed, bucket)
+
+
+async def ahit(key: str, bucket: Bucket, cache_alias: str = "default") -> Tuple[bool, int]:
+    cache = caches[cache_alias]
+    current, previous, elapsed = _windows(key, bucket, time.time())
+    await cache.aadd(current, 0, timeout=2 * bucket.window)
+    try:
+        count = await cache.aincr(current)
+    except ValueError:
+        await cache.aadd(current, 1, timeout=2 * bucket.window)
+        count = 1
+    return _decide(count, await cache.aget(previous) or 0, elapsed, bucket)
+
+
+def throttled_response(retry_after: int) -> JsonResponse:
+    """429 no formato do DRF, com Retry-After."""
+    resp = JsonResponse(
+        {"detail": f"Request was throttled. Expected available in {retry_after} seconds."},
+        status=429,
+    )
+    resp["Retry-After"] = str(retry_after)
+    return resp
+
+
+def _form_type_bucket(request, form_type: str):
+    conf = public_write_conf()
+    key = bucket_key("form", request.path, client_ip(request, conf["trusted_proxies"]), str(form_type or "homepage")[:40])
+    return key, Bucket(**conf["per_form_type"]), conf["cache"]
+
+
+def check_form_type(request, form_type: Optional[str]) -> Optional[JsonResponse]:
+    """
+    Limite por IP + formType, chamado pela view depois de ler o corpo (o middleware
+    não lê o corpo). None = pode seguir; senão a resposta 429.
+    """
+    key, bucket, alias = _form_type_bucket(request, form_type)
+    allowed, retry_after = hit(key, bucket, alias)
+    return None if allowed else throttled_response(retry_after)
+
+
+async def acheck_form_type(request, form_type: Optional[str]) -> Optional[JsonResponse]:
+    key, bucket, alias = _form_type_bucket(request, form_type)
+    allowed, retry_after = await ahit(key, bucket, alias)
+    return None if allowed else throttled_response(retry_after)
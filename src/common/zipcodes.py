@@ -0,0 +1,126 @@
+# src/common/zipcodes.py
+"""
+Índice local de ZIP codes dos EUA (data/us_zipcodes.csv.gz) para completar e
+normalizar city/state de FormSubmission e SheetData.
+
+O dataset só é carregado na primeira consulta (nada acontece no startup) e
+fica em memória uma vez por processo em arrays compactos:
+  - _zips:   array('I') ordenado com o ZIP como inteiro
+  - _cities: array('H') com o índice da cidade em _city_names
+  - _states: array('B') com o índice do estado em _state_codes
+A consulta é uma busca binária (bisect) — alguns microssegundos.
+"""
+import csv
+import gzip
+import io
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Optional, Tuple
+
+DATA_FILE = Path(__file__).resolve().parent / "data" / "us_zipcodes.csv.gz"
+
+US_STATES = {
+    "alabama": "AL", "alaska": "AK", "arizona": "AZ", "arkansas": "AR", "california": "CA",
+    "colorado": "CO", "connecticut": "CT", "delaware": "DE", "district of columbia": "DC",
+    "florida": "FL", "georgia": "GA", "hawaii": "HI", "idaho": "ID", "illinois": "IL",
+    "indiana": "IN", "iowa": "IA", "kansas": "KS", "kentucky": "KY", "louisiana": "LA",
+    "maine": "ME", "maryland": "MD", "massachusetts": "MA", "michigan": "MI", "minnesota": "MN",
+    "mississippi": "MS", "missouri": "MO", "montana": "MT", "nebraska": "NE", "nevada": "NV",
+    "new hampshire": "NH", "new jersey": "NJ", "new mexico": "NM", "new york": "NY",
+    "north carolina": "NC", "north dakota": "ND", "ohio": "OH", "oklahoma": "OK", "oregon": "OR",
+    "pennsylvania": "PA", "rhode island": "RI", "south carolina": "SC", "south dakota": "SD",
+    "tennessee": "TN", "texas": "TX", "utah": "UT", "vermont": "VT", "virginia": "VA",
+    "washington": "WA", "west virginia": "WV", "wisconsin": "WI", "wyoming": "WY",
+    "puerto rico": "PR", "guam": "GU", "virgin islands": "VI", "american samoa": "AS",
+    "northern mariana islands": "MP",
+}
+
+_ZIP_RE = re.compile(r"^\s*(\d{5})(?:[-\s]?\d{4})?\s*$")
+
+_lock = threading.Lock()
+_index = None  # (zips, cities, states, city_names, state_codes)
+
+
+def _load():
+    zips, cities, states = array("I"), array("H"), array("B")
+    city_names, state_codes = [], []
+    city_pos, state_pos = {}, {}
+
+    with gzip.open(DATA_FILE, "rb") as fh:
+        reader = csv.reader(io.TextIOWrapper(fh, encoding="utf-8"))
+        next(reader, None)  # header
+        for zip_code, city, state in reader:
+            if city not in city_pos:
+                city_pos[city] = len(city_names)
+                city_names.append(city)
+            if state not in state_pos:
+                state_pos[state] = len(state_codes)
+                state_codes.append(state)
+            zips.append(int(zip_code))
+            cities.append(city_pos[city])
+            states.append(state_pos[state])
+
+    return zips, cities, states, tuple(city_names), tuple(state_codes)
+
+
+def _get_index():
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index = _load()
+    return _index
+
+
+def normalize_zip(value) -> Optional[str]:
+    """'33101', '33101-1234', ' 33101 ' -> '33101'; qualquer outra coisa -> None."""
+    if value is None:
+        return None
+    m = _ZIP_RE.match(str(value))
+    return m.group(1) if m else None
+
+
+def lookup(zip_code) -> Optional[Tuple[str, str]]:
+    """Retorna (city, state) do ZIP ou None se não existir no dataset."""
+    z = normalize_zip(zip_code)
+    if not z:
+        return None
+    zips, cities, states, city_names, state_codes = _get_index()
+    key = int(z)
+    i = bisect_left(zips, key)
+    if i < len(zips) and zips[i] == key:
+        return city_names[cities[i]], state_codes[states[i]]
+    return None
+
+
+def normalize_state(value) -> Optional[str]:
+    """'florida', 'Fl', ' FL ' -> 'FL'. Valor não reconhecido volta só com strip()."""
+    if value is None:
+        return None
+    raw = str(value).strip()
+    if not raw:
+        return raw
+    if len(raw) == 2 and raw.upper() in US_STATES.values():
+        return raw.upper()
+    return US_STATES.get(raw.lower(), raw)
+
+
+def enrich_location(zip_code, city, state) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Completa/normaliza (city, state) a partir do ZIP:
+      - ZIP conhecido: state vira a sigla do dataset; city é preenchida se vier vazia
+        ou padronizada se for a mesma cidade com outra grafia (caixa/espaços)
+      - ZIP desconhecido: só normaliza o state (nome -> sigla) e faz strip da city
+    """
+    city = city.strip() if isinstance(city, str) else city
+    found = lookup(zip_code)
+    if not found:
+        return city, normalize_state(state)
+
+    ref_city, ref_state = found
+    if not city or " ".join(city.split()).lower() == ref_city.lower():
+        city = ref_city
+    return city, ref_state
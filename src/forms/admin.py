@@ -1,7 +1,7 @@
 # src/forms/admin.py
 
 from django.contrib import admin
-from .models import FormSubmission
+from .models import FormBackfillCheckpoint, FormDedupStat, FormSubmission
 
 @admin.register(FormSubmission)
 class FormSubmissionAdmin(admin.ModelAdmin):
@@ -69,4 +69,18 @@ class FormSubmissionAdmin(admin.ModelAdmin):
     )
 
     # Torna o 'created_at' e 'profile' (se aplicável) somente leitura
-    readonly_fields = ('created_at',)
\ No newline at end of file
+    readonly_fields = ('created_at',)
+
+
+@admin.register(FormDedupStat)
+class FormDedupStatAdmin(admin.ModelAdmin):
+    # Envios duplicados suprimidos no ingest (por dia e formType)
+    list_display = ("day", "formType", "suppressed")
+    list_filter = ("formType", "day")
+    ordering = ("-day", "formType")
+
+
+@admin.register(FormBackfillCheckpoint)
+class FormBackfillCheckpointAdmin(admin.ModelAdmin):
+    list_display = ("name", "last_id", "rows_copied", "finished", "updated_at")
+    readonly_fields = ("updated_at",)
@@ -0,0 +1,35 @@
+# src/forms/api/async_views.py
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_http_methods
+
+from src.common.async_api import json_payload, session_csrf_protect
+from src.common.ratelimit import acheck_form_type
+from src.forms.models import FormSubmission
+from src.forms.services import aingest_submission
+from .views import FORM_SUBMISSION_FIELDS
+
+
+@session_csrf_protect  # mesma regra da APIView: CSRF só para sessão autenticada
+@require_http_methods(["GET", "POST"])
+async def forms_async_view(request):
+    """
+    Versão async de FormSubmissionAPIView (servida pelo ASGI).
+    GET  -> 200 submissions mais recentes
+    POST -> cria FormSubmission sem ocupar uma thread enquanto espera o Postgres
+    """
+    if request.method == "GET":
+        qs = (
+            FormSubmission.objects
+            .order_by("-id")
+            .values(*FORM_SUBMISSION_FIELDS)
+            [:200]
+        )
+        forms = [row async for row in qs]
+        return JsonResponse(forms, safe=False)
+
+    data = json_payload(request)
+    throttled = await acheck_form_type(request, data.get("formType"))
+    if throttled is not None:
+        return throttled
+    await aingest_submission(data)
+    return HttpResponse(status=201)
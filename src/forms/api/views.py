@@ -4,6 +4,9 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from src.forms.models import FormSubmission
+from src.common.ratelimit import check_form_type
+from src.forms.services import ingest_submission
+from src.reports.incremental import invalidate_for_update
 
 # Lista de campos que serão incluídos nas respostas GET e na atualização PATCH.
 # Deve corresponder exatamente aos campos do seu FormSubmission model.
@@ -49,37 +52,12 @@ class FormSubmissionAPIView(APIView):
     def post(self, request):
         """Cria um novo FormSubmission com todos os dados de formulário."""
         data = request.data
+        throttled = check_form_type(request, data.get("formType"))
+        if throttled is not None:
+            return throttled
 
-        # O .create() recebe diretamente os dados do request.data
-        FormSubmission.objects.create(
-            formType=data.get("formType"),
-            company_id=data.get("company_id"),
-
-            # Dados do Cliente/Referido
-            first_name=data.get("first_name"),
-            last_name=data.get("last_name"),
-            email=data.get("email"),
-            phone=data.get("phone"),
-
-            # Dados de Cobertura e Renda
-            zipCode=data.get("zipCode"),
-            coverageType=data.get("coverageType"),
-            insuranceCoverage=data.get("insuranceCoverage"),
-            householdIncome=data.get("householdIncome"),
-
-            # Dados Pessoais e Endereço
-            dob=data.get("dob"),
-            address=data.get("address"),
-            city=data.get("city"),
-            state=data.get("state"),
-
-            # Dados do Indicador (Referrer)
-            referrerFirstName=data.get("referrerFirstName"),
-            referrerEmail=data.get("referrerEmail"),
-
-            # O profile_id não é recebido no POST de frontend, mas mantido para integridade
-            # profile_id=data.get("profile_id"),
-        )
+        # Mesmo mapeamento da view async; duplicados da janela não são gravados
+        ingest_submission(data)
         return Response(status=201)  # Retorna 201 Created para sucesso
 
 
@@ -110,8 +88,9 @@ class FormSubmissionDetailAPIView(APIView):
         if "company_id" in request.data:
             payload["company_id"] = request.data["company_id"]
 
-        # Atualiza o registro no banco de dados
+        # Atualiza o registro no banco de dados (.update() não dispara signals)
         FormSubmission.objects.filter(pk=pk).update(**payload)
+        invalidate_for_update(FormSubmission, payload)
         return Response()
 
     def delete(self, request, pk):
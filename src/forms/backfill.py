@@ -0,0 +1,82 @@
+# src/forms/backfill.py
+"""
+Backfill histórico SheetData -> FormSubmission.
+
+- lê o SheetData em chunks por pk (id > checkpoint, ORDER BY id)
+- insere o chunk com bulk_create e avança o checkpoint NA MESMA transação:
+  se o processo cair, o chunk inteiro é refeito ou nada dele foi gravado
+- o checkpoint é travado (SELECT ... FOR UPDATE) durante o chunk, então duas
+  execuções simultâneas não copiam a mesma faixa
+- cada cópia guarda o id de origem em source_sheet_id (UNIQUE) e o insert ignora
+  conflitos: --reset ou rodar de novo não duplica nada
+- created_at recebe o datetime da planilha: relatórios e filtros por data veem o
+  histórico na data original (o hwm do refresh incremental é por pk, não por data)
+"""
+from django.db import transaction
+
+from src.forms.models import FormBackfillCheckpoint, FormSubmission
+from src.sheets.models import SheetData
+
+CHECKPOINT_NAME = "sheetdata"
+
+# SheetData -> FormSubmission (campos com nome diferente)
+FIELD_MAP = {
+    "id": "source_sheet_id",
+    "firstName": "first_name",
+    "lastName": "last_name",
+    "datetime": "created_at",
+}
+# Campos com o mesmo nome nos dois models
+SAME_FIELDS = (
+    "company_id", "formType", "email", "phone", "zipCode", "coverageType",
+    "insuranceCoverage", "householdIncome", "dob", "address", "city", "state",
+    "referrerFirstName", "referrerEmail",
+)
+SOURCE_FIELDS = SAME_FIELDS + tuple(FIELD_MAP)
+
+
+def _truncate(value, field):
+    max_length = FormSubmission._meta.get_field(field).max_length
+    if max_length and isinstance(value, str) and len(value) > max_length:
+        return value[:max_length]
+    return value
+
+
+def _to_submission(row) -> FormSubmission:
+    kwargs = {f: row[f] for f in SAME_FIELDS}
+    for src, dst in FIELD_MAP.items():
+        kwargs[dst] = row[src]
+    for f in ("first_name", "last_name", "phone"):
+        kwargs[f] = _truncate(kwargs[f], f)
+    return FormSubmission(**kwargs)
+
+
+def get_checkpoint(name: str = CHECKPOINT_NAME) -> FormBackfillCheckpoint:
+    checkpoint, _ = FormBackfillCheckpoint.objects.get_or_create(name=name)
+    return checkpoint
+
+
+def backfill_chunk(chunk_size: int = 1000, name: str = CHECKPOINT_NAME) -> int:
+    """Copia o próximo chunk. Retorna quantas linhas leu (0 = terminou)."""
+    get_checkpoint(name)
+    with transaction.atomic():
+        checkpoint = FormBackfillCheckpoint.objects.select_for_update().get(name=name)
+        rows = list(
+            SheetData.objects
+            .filter(id__gt=checkpoint.last_id)
+            .order_by("id")
+            .values(*SOURCE_FIELDS)[:chunk_size]
+        )
+        if not rows:
+            if not checkpoint.finished:
+                checkpoint.finished = True
+                checkpoint.save(update_fields=["finished", "updated_at"])
+            return 0
+
+        # linhas já copiadas (source_sheet_id) são ignoradas pelo banco
+        FormSubmission.objects.bulk_create([_to_submission(r) for r in rows], ignore_conflicts=True)
+        checkpoint.last_id = rows[-1]["id"]
+        checkpoint.rows_copied += len(rows)
+        checkpoint.finished = False
+        checkpoint.save(update_fields=["last_id", "rows_copied", "finished", "updated_at"])
+    return len(rows)
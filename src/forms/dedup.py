@@ -0,0 +1,104 @@
+# src/forms/dedup.py
+"""
+Supressão de envios duplicados (duplo clique / retry de páginas parceiras).
+
+Chave = sha1(contato normalizado | formType | company | bloco de tempo).
+- LRU local (por processo) responde os duplicados mais comuns sem ir ao banco
+- FormSubmission.dedup_key é UNIQUE: entre processos/nós o banco decide
+- janela real: um reenvio é suprimido se houver envio ACEITO nos últimos
+  FORMS_DEDUP_WINDOW_SECONDS (chaves do bloco atual e do anterior, filtradas pelo
+  horário do envio aceito); depois disso o mesmo contato passa de novo
+- só envios aceitos abrem a janela: reenvios suprimidos não a estendem
+Duplicados não são gravados; só incrementam FormDedupStat (dia + formType).
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone as dt_timezone
+from typing import Any, Iterable, Mapping, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from src.forms.models import FormDedupStat
+
+WINDOW_SECONDS = getattr(settings, "FORMS_DEDUP_WINDOW_SECONDS", 600)
+LRU_SIZE = getattr(settings, "FORMS_DEDUP_LRU_SIZE", 10_000)
+
+
+def _contact(data: Mapping[str, Any]) -> str:
+    email = (data.get("email") or "").strip().lower()
+    if email:
+        return f"e:{email}"
+    phone = re.sub(r"\D", "", data.get("phone") or "")
+    return f"p:{phone}" if phone else ""
+
+
+def window_keys(data: Mapping[str, Any], now: Optional[float] = None) -> Tuple[Optional[str], Optional[str]]:
+    """(chave da janela atual, chave da janela anterior) ou (None, None) sem contato."""
+    contact = _contact(data)
+    if not contact:
+        return None, None
+    bucket = int((now if now is not None else time.time()) // WINDOW_SECONDS)
+    base = f"{contact}|{data.get('formType') or ''}|{data.get('company_id') or ''}"
+    return (
+        hashlib.sha1(f"{base}|{bucket}".encode()).hexdigest(),
+        hashlib.sha1(f"{base}|{bucket - 1}".encode()).hexdigest(),
+    )
+
+
+def window_start(now: float) -> datetime:
+    """Envios aceitos a partir deste instante ainda suprimem reenvios."""
+    return datetime.fromtimestamp(now - WINDOW_SECONDS, tz=dt_timezone.utc)
+
+
+class RecentKeys:
+    """LRU de tamanho fixo (thread-safe): chave -> horário do envio aceito."""
+
+    def __init__(self, maxsize: int = LRU_SIZE):
+        self.maxsize = maxsize
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def seen(self, keys: Iterable[str], since: float) -> bool:
+        """Alguma das chaves foi aceita em `since` ou depois? (não renova nada)"""
+        with self._lock:
+            return any(self._keys.get(k, -1.0) >= since for k in keys)
+
+    def add(self, key: str, accepted_at: float) -> None:
+        with self._lock:
+            self._keys[key] = accepted_at
+            self._keys.move_to_end(key)
+            while len(self._keys) > self.maxsize:
+                self._keys.popitem(last=False)
+
+
+recent_keys = RecentKeys()
+
+
+def record_suppressed(form_type: Optional[str]) -> None:
+    """Incrementa o contador diário de duplicados suprimidos."""
+    day = timezone.localdate()
+    form_type = form_type or ""
+    updated = FormDedupStat.objects.filter(day=day, formType=form_type).update(suppressed=F("suppressed") + 1)
+    if not updated:
+        try:
+            with transaction.atomic():
+                FormDedupStat.objects.create(day=day, formType=form_type, suppressed=1)
+        except IntegrityError:
+            FormDedupStat.objects.filter(day=day, formType=form_type).update(suppressed=F("suppressed") + 1)
+
+
+async def arecord_suppressed(form_type: Optional[str]) -> None:
+    day = timezone.localdate()
+    form_type = form_type or ""
+    updated = await FormDedupStat.objects.filter(day=day, formType=form_type).aupdate(suppressed=F("suppressed") + 1)
+    if not updated:
+        try:
+            await FormDedupStat.objects.acreate(day=day, formType=form_type, suppressed=1)
+        except IntegrityError:
+            await FormDedupStat.objects.filter(day=day, formType=form_type).aupdate(suppressed=F("suppressed") + 1)
@@ -0,0 +1,55 @@
+# src/forms/management/commands/backfill_sheetdata_to_forms.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from src.forms.backfill import CHECKPOINT_NAME, backfill_chunk, get_checkpoint
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia o histórico do SheetData para FormSubmission em chunks por pk, com "
+        "checkpoint a cada chunk (pode ser interrompido e retomado). Rode "
+        "link_form_profiles depois para vincular os profiles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument("--sleep", type=float, default=0.5, help="pausa (s) entre chunks")
+        parser.add_argument(
+            "--max-rate", type=float, default=0,
+            help="limite de linhas/s (0 = só o --sleep)",
+        )
+        parser.add_argument("--max-chunks", type=int, default=0, help="0 = sem limite")
+        parser.add_argument("--name", default=CHECKPOINT_NAME, help="nome do checkpoint")
+        parser.add_argument("--reset", action="store_true", help="recomeça do início (id 0)")
+
+    def handle(self, *args, **opts):
+        checkpoint = get_checkpoint(opts["name"])
+        if opts["reset"]:
+            checkpoint.last_id = 0
+            checkpoint.rows_copied = 0
+            checkpoint.finished = False
+            checkpoint.save()
+        self.stdout.write(f"retomando após id {checkpoint.last_id} ({checkpoint.rows_copied} já copiadas)")
+
+        chunks = total = 0
+        while True:
+            started = time.monotonic()
+            copied = backfill_chunk(opts["chunk_size"], opts["name"])
+            if not copied:
+                break
+            chunks += 1
+            total += copied
+            self.stdout.write(f"chunk {chunks}: {copied} linha(s)")
+            if opts["max_chunks"] and chunks >= opts["max_chunks"]:
+                break
+
+            # throttle: pausa fixa + o necessário para respeitar --max-rate
+            pause = opts["sleep"]
+            if opts["max_rate"] > 0:
+                pause = max(pause, copied / opts["max_rate"] - (time.monotonic() - started))
+            if pause > 0:
+                time.sleep(pause)
+
+        self.stdout.write(self.style.SUCCESS(f"{total} linha(s) copiada(s) em {chunks} chunk(s)."))
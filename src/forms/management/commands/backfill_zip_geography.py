@@ -0,0 +1,61 @@
+# src/forms/management/commands/backfill_zip_geography.py
+from django.core.management.base import BaseCommand
+
+from src.common.zipcodes import enrich_location
+from src.forms.models import FormSubmission
+from src.reports.incremental import invalidate_for_update
+from src.sheets.models import SheetData
+
+MODELS = {
+    "forms": FormSubmission,
+    "sheets": SheetData,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Completa/normaliza city e state pelo ZIP (índice local) em FormSubmission "
+        "e SheetData. Percorre por faixas de PK e grava só as linhas que mudaram."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", choices=["forms", "sheets", "all"], default="all")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **opts):
+        names = list(MODELS) if opts["model"] == "all" else [opts["model"]]
+        for name in names:
+            scanned, changed = self._backfill(MODELS[name], opts["chunk_size"], opts["dry_run"])
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: {scanned} linha(s) lida(s), {changed} atualizada(s)"
+                + (" (dry-run)" if opts["dry_run"] else "")
+            ))
+
+    def _backfill(self, model, chunk_size, dry_run):
+        last_pk = 0
+        scanned = changed = 0
+        while True:
+            rows = list(
+                model.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", "zipCode", "city", "state")[:chunk_size]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            scanned += len(rows)
+
+            updates = []
+            for pk, zip_code, city, state in rows:
+                new_city, new_state = enrich_location(zip_code, city, state)
+                if (new_city, new_state) != (city, state):
+                    updates.append(model(pk=pk, city=new_city, state=new_state))
+
+            if updates and not dry_run:
+                model.objects.bulk_update(updates, ["city", "state"])
+                # bulk_update não dispara signals: parciais de relatório que usam city/state
+                invalidate_for_update(model, ["city", "state"])
+            changed += len(updates)
+
+        return scanned, changed
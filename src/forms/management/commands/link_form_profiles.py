@@ -0,0 +1,36 @@
+# src/forms/management/commands/link_form_profiles.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from src.users.services import link_form_submissions_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Vincula FormSubmission sem profile ao Profile do cliente (cria User/Profile "
+        "Customer quando necessário), em lotes. Use --loop para rodar como worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--loop", action="store_true", help="fica rodando em background")
+        parser.add_argument("--sleep", type=float, default=5.0, help="pausa (s) quando não há pendências")
+        parser.add_argument("--max-batches", type=int, default=0, help="0 = sem limite")
+
+    def handle(self, *args, **opts):
+        batches = total = 0
+        while True:
+            linked = link_form_submissions_batch(batch_size=opts["batch_size"])
+            if linked:
+                batches += 1
+                total += linked
+                self.stdout.write(f"lote {batches}: {linked} submission(s) vinculada(s)")
+            if opts["max_batches"] and batches >= opts["max_batches"]:
+                break
+            if not linked:
+                if not opts["loop"]:
+                    break
+                time.sleep(opts["sleep"])
+
+        self.stdout.write(self.style.SUCCESS(f"{total} submission(s) vinculada(s) em {batches} lote(s)."))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0006_remove_formsubmission_extra_formsubmission_address_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='formsubmission',
+            name='dedup_key',
+            field=models.CharField(blank=True, editable=False, max_length=40, null=True, unique=True),
+        ),
+        migrations.CreateModel(
+            name='FormDedupStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('formType', models.CharField(blank=True, default='', max_length=20)),
+                ('suppressed', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Form Dedup Stat',
+                'verbose_name_plural': 'Form Dedup Stats',
+                'ordering': ('-day', 'formType'),
+                'constraints': [models.UniqueConstraint(fields=('day', 'formType'), name='forms_dedupstat_day_formtype_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0007_formsubmission_dedup_key_formdedupstat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormBackfillCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('rows_copied', models.PositiveBigIntegerField(default=0)),
+                ('finished', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Form Backfill Checkpoint',
+                'verbose_name_plural': 'Form Backfill Checkpoints',
+            },
+        ),
+        migrations.AlterField(
+            model_name='formsubmission',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False),
+        ),
+    ]
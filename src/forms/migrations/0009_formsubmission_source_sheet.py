@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0008_formbackfillcheckpoint_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='formsubmission',
+            name='source_sheet_id',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
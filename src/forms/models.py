@@ -1,6 +1,8 @@
 # src/forms/models.py (Versão CONSOLIDADA)
 
 from django.db import models
+from django.utils import timezone
+
 from src.company.models import Company
 
 # Não precisamos mais do JSONField
@@ -71,7 +73,13 @@ class FormSubmission(models.Model):
     referrerEmail = models.EmailField(blank=True, null=True)
 
     # Metadata
-    created_at = models.DateTimeField(auto_now_add=True, db_index=True)  # datetime da SheetData é o created_at
+    # momento da gravação; o backfill do SheetData grava o datetime original da planilha
+    # (default em vez de auto_now_add, que sobrescreveria o valor no bulk_create)
+    created_at = models.DateTimeField(default=timezone.now, editable=False, db_index=True)
+    # Backfill do SheetData (src/forms/backfill.py): linha de origem (UNIQUE: reexecutar não duplica)
+    source_sheet_id = models.BigIntegerField(unique=True, null=True, blank=True, editable=False)
+    # Hash contato+formType+company+janela (ver src/forms/dedup.py). UNIQUE barra duplicados entre nós.
+    dedup_key = models.CharField(max_length=40, unique=True, null=True, blank=True, editable=False)
 
     # NOTA: O campo 'extra' FOI REMOVIDO!
 
@@ -81,4 +89,38 @@ class FormSubmission(models.Model):
         ordering = ("-created_at",)
 
     def __str__(self):
-        return f"{self.formType} – {self.email or self.phone or 'no contact'} @ {self.created_at:%Y-%m-%d}"
\ No newline at end of file
+        return f"{self.formType} – {self.email or self.phone or 'no contact'} @ {self.created_at:%Y-%m-%d}"
+
+
+class FormDedupStat(models.Model):
+    """Contador diário de envios duplicados suprimidos (não gravados)."""
+    day = models.DateField()
+    formType = models.CharField(max_length=20, blank=True, default="")
+    suppressed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Form Dedup Stat"
+        verbose_name_plural = "Form Dedup Stats"
+        ordering = ("-day", "formType")
+        constraints = [
+            models.UniqueConstraint(fields=["day", "formType"], name="forms_dedupstat_day_formtype_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.day:%Y-%m-%d} {self.formType or '-'}: {self.suppressed}"
+
+
+class FormBackfillCheckpoint(models.Model):
+    """Progresso de cópias em lote para FormSubmission (ex.: backfill do SheetData)."""
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)  # último pk da origem já copiado
+    rows_copied = models.PositiveBigIntegerField(default=0)
+    finished = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Form Backfill Checkpoint"
+        verbose_name_plural = "Form Backfill Checkpoints"
+
+    def __str__(self):
+        return f"{self.name}: id>{self.last_id} ({self.rows_copied} copiadas)"
@@ -0,0 +1,114 @@
+# src/forms/services.py
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from django.db import IntegrityError, transaction
+
+from src.common.zipcodes import enrich_location
+from src.forms.dedup import (
+    WINDOW_SECONDS,
+    arecord_suppressed,
+    record_suppressed,
+    recent_keys,
+    window_keys,
+    window_start,
+)
+from src.forms.models import FormSubmission
+
+# Campos aceitos no POST público (mesmos nomes do model FormSubmission).
+FORM_SUBMISSION_INPUT_FIELDS = (
+    "formType",
+    "company_id",
+    # Dados do Cliente/Referido
+    "first_name",
+    "last_name",
+    "email",
+    "phone",
+    # Dados de Cobertura e Renda
+    "zipCode",
+    "coverageType",
+    "insuranceCoverage",
+    "householdIncome",
+    # Dados Pessoais e Endereço
+    "dob",
+    "address",
+    "city",
+    "state",
+    # Dados do Indicador (Referrer)
+    "referrerFirstName",
+    "referrerEmail",
+)
+
+
+def submission_kwargs_from_payload(data: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Monta os kwargs de FormSubmission a partir do payload do frontend.
+    Compartilhado entre a view DRF (sync) e a view ASGI (async).
+    O profile_id não é recebido no POST de frontend.
+    city/state são completados/normalizados pelo ZIP (índice local).
+    """
+    kwargs = {field: data.get(field) for field in FORM_SUBMISSION_INPUT_FIELDS}
+    kwargs["city"], kwargs["state"] = enrich_location(
+        kwargs["zipCode"], kwargs["city"], kwargs["state"]
+    )
+    return kwargs
+
+
+def ingest_submission(data: Mapping[str, Any]) -> Optional[FormSubmission]:
+    """
+    Cria o FormSubmission do POST público, suprimindo duplicados da janela
+    (mesmo contato + formType + company). Retorna None quando foi duplicado.
+    """
+    kwargs = submission_kwargs_from_payload(data)
+    now = time.time()
+    key, prev_key = window_keys(kwargs, now)
+    if key is None:
+        return FormSubmission.objects.create(**kwargs)
+
+    keys = (key, prev_key)
+    if (
+        recent_keys.seen(keys, since=now - WINDOW_SECONDS)
+        or FormSubmission.objects.filter(dedup_key__in=keys, created_at__gte=window_start(now)).exists()
+    ):
+        # suprimido não entra no LRU: só envio aceito abre a janela
+        record_suppressed(kwargs.get("formType"))
+        return None
+
+    try:
+        with transaction.atomic():
+            obj = FormSubmission.objects.create(dedup_key=key, **kwargs)
+    except IntegrityError:
+        # outro processo/nó gravou a mesma chave (índice único do bloco)
+        if not FormSubmission.objects.filter(dedup_key=key).exists():
+            raise
+        record_suppressed(kwargs.get("formType"))
+        return None
+    recent_keys.add(key, now)
+    return obj
+
+
+async def aingest_submission(data: Mapping[str, Any]) -> Optional[FormSubmission]:
+    """Versão async de ingest_submission (ORM async, usada pela view ASGI)."""
+    kwargs = submission_kwargs_from_payload(data)
+    now = time.time()
+    key, prev_key = window_keys(kwargs, now)
+    if key is None:
+        return await FormSubmission.objects.acreate(**kwargs)
+
+    keys = (key, prev_key)
+    if (
+        recent_keys.seen(keys, since=now - WINDOW_SECONDS)
+        or await FormSubmission.objects.filter(dedup_key__in=keys, created_at__gte=window_start(now)).aexists()
+    ):
+        await arecord_suppressed(kwargs.get("formType"))
+        return None
+
+    try:
+        obj = await FormSubmission.objects.acreate(dedup_key=key, **kwargs)
+    except IntegrityError:
+        if not await FormSubmission.objects.filter(dedup_key=key).aexists():
+            raise
+        await arecord_suppressed(kwargs.get("formType"))
+        return None
+    recent_keys.add(key, now)
+    return obj
@@ -1,3 +1,252 @@
-from django.test import TestCase
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from src.common import zipcodes
+from src.common.ratelimit import Bucket, bucket_key, client_ip, hit
+from src.forms.backfill import backfill_chunk, get_checkpoint
+from src.forms.dedup import WINDOW_SECONDS, recent_keys
+from src.forms.models import FormSubmission
+from src.forms.services import ingest_submission
+from src.sheets.models import SheetData
+
+
+@override_settings(ROOT_URLCONF="ehgdashback.urls_asgi")
+class FormsAsyncViewCsrfTests(TestCase):
+    """POST /api/forms/ (view async): CSRF igual ao SessionAuthentication do DRF."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client(enforce_csrf_checks=True)
+        self.payload = {"formType": "contact", "email": "a@example.com", "first_name": "Ana"}
+
+    def test_anonymous_post_does_not_need_csrf(self):
+        resp = self.client.post("/api/forms/", self.payload, content_type="application/json")
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(FormSubmission.objects.count(), 1)
+
+    def test_session_post_without_csrf_is_rejected(self):
+        user = get_user_model().objects.create_user("staff", password="x")
+        self.client.force_login(user)
+        resp = self.client.post("/api/forms/", self.payload, content_type="application/json")
+        self.assertEqual(resp.status_code, 403)
+        self.assertEqual(FormSubmission.objects.count(), 0)
+
+    def test_valid_bearer_post_is_exempt(self):
+        user = get_user_model().objects.create_user("staff", password="x")
+        self.client.force_login(user)
+        token = AccessToken.for_user(user)
+        resp = self.client.post(
+            "/api/forms/", self.payload, content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+        self.assertEqual(resp.status_code, 201)
+
+    def test_invalid_bearer_does_not_skip_csrf(self):
+        user = get_user_model().objects.create_user("staff", password="x")
+        self.client.force_login(user)
+        resp = self.client.post(
+            "/api/forms/", self.payload, content_type="application/json",
+            HTTP_AUTHORIZATION="Bearer whatever",
+        )
+        self.assertEqual(resp.status_code, 403)
+        self.assertEqual(FormSubmission.objects.count(), 0)
+
+
+class RateLimitTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_burst_only_lets_capacity_through(self):
+        bucket = Bucket(capacity=5, refill_per_minute=1)
+        key = bucket_key("test", "burst")
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(lambda _: hit(key, bucket)[0], range(50)))
+        self.assertEqual(sum(results), 5)
+
+    def test_rejected_hit_reports_retry_after(self):
+        bucket = Bucket(capacity=1, refill_per_minute=1)
+        key = bucket_key("test", "retry")
+        self.assertEqual(hit(key, bucket), (True, 0))
+        allowed, retry_after = hit(key, bucket)
+        self.assertFalse(allowed)
+        self.assertTrue(1 <= retry_after <= 60)
+
+
+class FormRateLimitEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def _post(self, form_type, ip="10.0.0.1"):
+        return self.client.post(
+            "/api/forms/", {"formType": form_type, "email": f"{form_type}@example.com"},
+            content_type="application/json", REMOTE_ADDR=ip,
+        )
+
+    def test_per_form_type_limit(self):
+        codes = [self._post("contact").status_code for _ in range(6)]
+        self.assertEqual(codes[-1], 429)
+        self.assertNotIn(429, codes[:5])
+        # outro formType do mesmo IP ainda passa
+        self.assertNotEqual(self._post("quote").status_code, 429)
+
+    def test_per_ip_limit(self):
+        codes = [self._post(f"type{i}").status_code for i in range(21)]
+        self.assertEqual(codes[-1], 429)
+        self.assertNotEqual(self._post("contact", ip="10.0.0.2").status_code, 429)
+
+    def test_spoofed_forwarded_for_does_not_pick_a_new_bucket(self):
+        # o proxy acrescenta o IP real à direita; o valor à esquerda vem do cliente
+        codes = [
+            self.client.post(
+                "/api/forms/", {"formType": f"type{i}", "email": f"{i}@example.com"},
+                content_type="application/json", REMOTE_ADDR="10.9.9.9",
+                HTTP_X_FORWARDED_FOR=f"1.2.3.{i}, 10.0.0.1",
+            ).status_code
+            for i in range(21)
+        ]
+        self.assertEqual(codes[-1], 429)
+
+    def test_per_ip_bucket_is_shared_across_paths(self):
+        for i in range(20):
+            self._post(f"type{i}")
+        resp = self.client.post("/sheets/sheet-data/", {}, content_type="application/json", REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(resp.status_code, 429)
+
+
+class ClientIpTests(SimpleTestCase):
+    def _ip(self, xff=None, proxies=1):
+        extra = {"HTTP_X_FORWARDED_FOR": xff} if xff is not None else {}
+        return client_ip(RequestFactory().get("/", REMOTE_ADDR="10.9.9.9", **extra), proxies)
+
+    def test_counts_trusted_hops_from_the_right(self):
+        self.assertEqual(self._ip("6.6.6.6, 1.1.1.1"), "1.1.1.1")
+        self.assertEqual(self._ip("6.6.6.6, 1.1.1.1, 10.0.0.5", proxies=2), "1.1.1.1")
+        self.assertEqual(self._ip("1.1.1.1", proxies=3), "1.1.1.1")
+
+    def test_without_proxy_or_header_uses_remote_addr(self):
+        self.assertEqual(self._ip("6.6.6.6", proxies=0), "10.9.9.9")
+        self.assertEqual(self._ip(), "10.9.9.9")
+
+
+class DedupWindowTests(TestCase):
+    def setUp(self):
+        recent_keys._keys.clear()
+
+    def _ingest(self, at):
+        with mock.patch("src.forms.services.time.time", return_value=at):
+            obj = ingest_submission({"formType": "contact", "email": "dup@example.com"})
+        if obj is not None:
+            # created_at no mesmo relógio do teste
+            FormSubmission.objects.filter(pk=obj.pk).update(
+                created_at=datetime.fromtimestamp(at, tz=dt_timezone.utc)
+            )
+        return obj
+
+    def test_retries_do_not_extend_the_window(self):
+        t0 = time.time()
+        self.assertIsNotNone(self._ingest(t0))
+        for delta in (1, WINDOW_SECONDS / 2, WINDOW_SECONDS - 1):
+            self.assertIsNone(self._ingest(t0 + delta))
+        # janela conta do envio aceito, não do último reenvio nem do bloco
+        self.assertIsNotNone(self._ingest(t0 + WINDOW_SECONDS + 1))
+        self.assertEqual(FormSubmission.objects.count(), 2)
+
+    def test_window_is_checked_in_the_database_without_the_lru(self):
+        t0 = time.time()
+        self.assertIsNotNone(self._ingest(t0))
+        recent_keys._keys.clear()
+        self.assertIsNone(self._ingest(t0 + WINDOW_SECONDS - 1))
+        recent_keys._keys.clear()
+        self.assertIsNotNone(self._ingest(t0 + WINDOW_SECONDS + 1))
+
+
+class BackfillTests(TestCase):
+    def test_rerun_after_reset_does_not_duplicate(self):
+        sheet = SheetData.objects.create(
+            coverageType="individual", insuranceCoverage="Health",
+            householdIncome="0k-15k", email="old@example.com",
+        )
+        # datetime é auto_now_add na planilha: data antiga via update
+        SheetData.objects.filter(pk=sheet.pk).update(datetime=datetime(2023, 5, 1, 12, tzinfo=dt_timezone.utc))
+        sheet.refresh_from_db()
+        while backfill_chunk(chunk_size=10):
+            pass
+        checkpoint = get_checkpoint()
+        checkpoint.last_id = 0
+        checkpoint.save()
+        while backfill_chunk(chunk_size=10):
+            pass
+
+        sub = FormSubmission.objects.get()
+        self.assertEqual(sub.source_sheet_id, sheet.pk)
+        self.assertEqual(sub.created_at, sheet.datetime)
+
+
+class ZipcodeLookupTests(SimpleTestCase):
+    def test_bisect_hits_and_misses_at_the_edges(self):
+        zips, *_ = zipcodes._get_index()
+        first, last = zips[0], zips[-1]
+        self.assertIsNotNone(zipcodes.lookup(f"{first:05d}"))
+        self.assertIsNotNone(zipcodes.lookup(f"{last:05d}"))
+        # antes do primeiro, depois do último e num buraco entre dois ZIPs vizinhos
+        self.assertIsNone(zipcodes.lookup(f"{first - 1:05d}"))
+        self.assertIsNone(zipcodes.lookup(f"{last + 1:05d}"))
+        gap = next(i for i in range(1, len(zips)) if zips[i] - zips[i - 1] > 1)
+        self.assertIsNone(zipcodes.lookup(f"{zips[gap - 1] + 1:05d}"))
+        self.assertIsNone(zipcodes.lookup("00000"))
+
+    def test_zip_formats(self):
+        self.assertEqual(zipcodes.lookup("33101"), ("Miami", "FL"))
+        self.assertEqual(zipcodes.lookup(" 33101-1234 "), ("Miami", "FL"))
+        for bad in ("3310", "331011", "abcde", "", None):
+            self.assertIsNone(zipcodes.lookup(bad))
+
+    def test_enrich_location(self):
+        self.assertEqual(zipcodes.enrich_location("33101", "", "florida"), ("Miami", "FL"))
+        self.assertEqual(zipcodes.enrich_location("33101", "  miami ", None), ("Miami", "FL"))
+        # cidade diferente da do dataset é mantida
+        self.assertEqual(zipcodes.enrich_location("33101", "Brickell", "FL"), ("Brickell", "FL"))
+        self.assertEqual(zipcodes.enrich_location("00000", " Nowhere ", "texas"), ("Nowhere", "TX"))
+
+
+class BackfillZipGeographyCommandTests(TestCase):
+    def setUp(self):
+        self.sub = FormSubmission.objects.create(formType="contact")
+        self.other = FormSubmission.objects.create(formType="contact")
+        self.sheet = SheetData.objects.create(
+            coverageType="individual", insuranceCoverage="Health",
+            householdIncome="0k-15k", email="zip@example.com",
+        )
+        # valores crus, sem passar por nenhuma normalização na escrita
+        FormSubmission.objects.filter(pk=self.sub.pk).update(zipCode="33101", city="", state="florida")
+        FormSubmission.objects.filter(pk=self.other.pk).update(zipCode="33101", city="Miami", state="FL")
+        SheetData.objects.filter(pk=self.sheet.pk).update(zipCode="33101-0001", city=None, state=None)
+
+    def _run(self, *args):
+        out = StringIO()
+        call_command("backfill_zip_geography", "--chunk-size", "1", *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_writes_nothing(self):
+        out = self._run("--dry-run")
+        self.assertIn("forms: 2 linha(s) lida(s), 1 atualizada(s) (dry-run)", out)
+        self.assertEqual(FormSubmission.objects.get(pk=self.sub.pk).state, "florida")
+
+    def test_updates_only_changed_rows(self):
+        out = self._run()
+        self.assertIn("forms: 2 linha(s) lida(s), 1 atualizada(s)", out)
+        self.assertIn("sheets: 1 linha(s) lida(s), 1 atualizada(s)", out)
+        sub = FormSubmission.objects.get(pk=self.sub.pk)
+        self.assertEqual((sub.city, sub.state), ("Miami", "FL"))
+        sheet = SheetData.objects.get(pk=self.sheet.pk)
+        self.assertEqual((sheet.city, sheet.state), ("Miami", "FL"))
+        self.assertIn("forms: 2 linha(s) lida(s), 0 atualizada(s)", self._run("--model", "forms"))
@@ -0,0 +1,74 @@
+# src/menu_itens/api/async_views.py
+from django.db.models import Min, Q
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from src.common.async_api import async_login_required
+from src.users.models import Profile
+from ..models import MenuItem
+
+
+def _build_tree(items, parent_id):
+    """
+    Monta a árvore em memória (mesmo formato de _serialize_item),
+    ordenando pelo 'order' do vínculo visível e depois por id.
+    """
+    level = sorted(
+        (it for it in items.values() if it["parent_id"] == parent_id),
+        key=lambda it: (it["order"], it["id"]),
+    )
+    return [
+        {
+            "key": it["key"],
+            "label": it["label"],
+            "icon": it["icon"],
+            "path": it["path"],
+            "children": _build_tree(items, it["id"]),
+        }
+        for it in level
+    ]
+
+
+@require_GET
+@async_login_required
+async def sidebar_async_view(request):
+    """
+    Versão async de SidebarView (servida pelo ASGI).
+    Em vez de uma query por nível da árvore, busca todos os itens visíveis
+    para o user_type/user_role em uma única query e monta a árvore em memória.
+    """
+    profile = await (
+        Profile.objects.select_related("user_type", "user_role")
+        .filter(user_id=request.user.id)
+        .afirst()
+    )
+    if profile is None:
+        # Mesmo comportamento da view sync: cria o Profile que faltar.
+        profile, _ = await Profile.objects.aget_or_create(user=request.user)
+
+    user_type_id = getattr(getattr(profile, "user_type", None), "id", None)
+    user_role_id = getattr(getattr(profile, "user_role", None), "id", None)
+
+    visible = (
+        MenuItem.objects.filter(is_active=True)
+        .filter(
+            Q(role_links__is_visible=True)
+            & (
+                Q(role_links__user_type_id=user_type_id)
+                | Q(role_links__user_role_id=user_role_id)
+            )
+            & (  # blindagem contra links sem type/role definido
+                Q(role_links__user_type__isnull=False)
+                | Q(role_links__user_role__isnull=False)
+            )
+        )
+        .values("id", "parent_id", "key", "label", "icon", "path")
+        .annotate(order=Min("role_links__order"))
+    )
+    items = {row["id"]: row async for row in visible}
+
+    return JsonResponse({
+        "user_type": getattr(getattr(profile, "user_type", None), "user_type", None),
+        "user_role": getattr(getattr(profile, "user_role", None), "user_role", None),
+        "items": _build_tree(items, None),
+    })
@@ -0,0 +1,66 @@
+# src/notifications/api/async_views.py
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from src.common.async_api import async_login_required
+from src.notifications.broker import get_broker
+from src.notifications.counters import aunread_count
+
+
+@require_GET
+@async_login_required
+async def notification_count_async_view(request):
+    """
+    GET /api/notifications/count/  -> { "unread": <int> }
+    Versão async de NotificationCountView (servida pelo ASGI); lê o contador por usuário.
+    """
+    unread = await aunread_count(request.user.id)
+    return JsonResponse({"unread": unread})
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@require_GET
+@async_login_required
+async def notification_stream_async_view(request):
+    """
+    GET /api/notifications/stream/  -> text/event-stream (SSE), só no ASGI.
+    Substitui o polling de /count/: eventos "unread" ({"unread": <int>}, o primeiro
+    já na conexão), "notification" (notificação nova) e "resync" (buscar tudo de novo).
+    Comentário ": ping" a cada NOTIFICATIONS_STREAM_HEARTBEAT_SECONDS mantém a conexão
+    viva em proxies. Fan-out em src/notifications/broker.py.
+    O banco só é usado na contagem inicial: a conexão é fechada logo depois, e a
+    stream (que pode durar horas) não segura uma conexão do Postgres.
+    """
+    user_id = request.user.id
+    heartbeat = getattr(settings, "NOTIFICATIONS_STREAM_HEARTBEAT_SECONDS", 25)
+
+    async def events():
+        broker = get_broker()
+        # assina antes de ler a contagem: nada que mude entre as duas coisas se perde
+        sub = broker.subscribe(user_id)
+        try:
+            unread = await aunread_count(user_id)
+            # mesma thread do ORM async (thread_sensitive): fecha a conexão usada na contagem
+            await sync_to_async(connection.close)()
+            yield "retry: 5000\n\n" + _sse("unread", {"unread": unread})
+            while True:
+                message = await sub.get(heartbeat)
+                if message is None:
+                    yield ": ping\n\n"
+                else:
+                    yield _sse(message["event"], message["data"])
+        finally:
+            broker.unsubscribe(sub)
+
+    resp = StreamingHttpResponse(events(), content_type="text/event-stream")
+    resp["Cache-Control"] = "no-cache"
+    resp["X-Accel-Buffering"] = "no"  # nginx: não segurar os eventos no buffer
+    return resp
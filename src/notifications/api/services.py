@@ -1,7 +1,10 @@
 # src/notifications/api/services.py
+from collections import Counter
 from typing import Iterable, Optional
 from django.contrib.auth import get_user_model
 from django.db import transaction
+from src.notifications import push
+from src.notifications.counters import bump_many
 from src.notifications.models import Notification  # ajuste se necessário
 
 User = get_user_model()
@@ -16,7 +19,7 @@ def create_notification(
     kind: Optional[str] = None,
 ) -> Notification:
     """
-    Cria uma notificação para um usuário.
+    Cria uma notificação para um usuário (o contador de não lidas sobe pelo post_save).
     """
     return Notification.objects.create(
         recipient=recipient,
@@ -38,6 +41,7 @@ def bulk_notify(
 ) -> int:
     """
     Cria notificações em lote. Retorna a quantidade criada.
+    bulk_create não dispara signals: o contador de não lidas e o push são feitos aqui.
     """
     payloads = [
         Notification(
@@ -50,6 +54,8 @@ def bulk_notify(
         for r in recipients
     ]
     created = Notification.objects.bulk_create(payloads)
+    push.notifications_created(created)
+    bump_many(Counter(n.recipient_id for n in created))
     return len(created)
 
 
@@ -12,6 +12,7 @@ try:
 except Exception:
     AUTH_CLASSES = (SessionAuthentication,)
 
+from src.notifications.counters import mark_read, unread_count
 from src.notifications.models import Notification  # ajuste se o caminho do model for diferente
 
 
@@ -30,12 +31,13 @@ def serialize_notification(n: Notification) -> dict:
 class NotificationCountView(APIView):
     """
     GET /api/notifications/count/  -> { "unread": <int> }
+    Lê o contador por usuário (NotificationUnreadCounter), sem COUNT(*).
     """
     authentication_classes = AUTH_CLASSES
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        unread = Notification.objects.filter(recipient=request.user, is_read=False).count()
+        unread = unread_count(request.user.id)
         return Response({"unread": unread})
 
 
@@ -97,7 +99,7 @@ class NotificationMarkReadView(APIView):
             return Response({"detail": "Forbidden."}, status=403)
 
         if not notif.is_read:
+            mark_read(Notification.objects.filter(pk=notif.pk))
             notif.is_read = True
-            notif.save(update_fields=["is_read"])
 
         return Response({"ok": True, "id": notif.id, "is_read": notif.is_read})
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class NotificationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'src.notifications'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+
+        from .counters import notification_deleted, notification_saved
+        from .models import Notification
+
+        post_save.connect(notification_saved, sender=Notification, dispatch_uid="notifications_counter_save")
+        post_delete.connect(notification_deleted, sender=Notification, dispatch_uid="notifications_counter_delete")
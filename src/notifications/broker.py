@@ -0,0 +1,191 @@
+# src/notifications/broker.py
+"""
+Fan-out dos eventos de notificação para as conexões SSE abertas
+(notification_stream_async_view, servida pelo ASGI).
+
+- LocalBroker: assinantes do próprio processo, uma asyncio.Queue por conexão.
+  publish pode vir de qualquer thread (signals via sync_to_async, WSGI): a entrega
+  vai pelo call_soon_threadsafe do loop de cada assinante
+- PostgresBroker: publish vira pg_notify(canal, json); uma thread por processo faz
+  LISTEN numa conexão própria e entrega aos assinantes locais -> eventos de outros
+  processos/nós (workers WSGI, jobs, outros ASGI) chegam a qualquer conexão
+- NOTIFICATIONS_BROKER = "local" | "postgres" (ou o caminho de uma classe com a
+  mesma interface); vazio = "postgres" se o banco for Postgres, senão "local"
+- o LISTEN funciona com psycopg2 e psycopg 3 (o driver que o Django estiver usando)
+- cliente lento (fila cheia) ou LISTEN reconectado: a fila é trocada por um
+  "resync" (o frontend busca a contagem/lista de novo)
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "notifications"
+LISTEN_POLL_SECONDS = 5
+QUEUE_SIZE = 100
+# limite do payload do NOTIFY é 8000 bytes
+PG_MAX_PAYLOAD = 7900
+RESYNC = {"event": "resync", "data": {}}
+
+
+class Subscription:
+    """Uma conexão SSE: fila no loop de quem assinou."""
+
+    def __init__(self, user_id: int, maxsize: int = QUEUE_SIZE):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    def deliver(self, message: Dict[str, Any]) -> None:
+        # roda no loop do assinante
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            message = RESYNC
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Próximo evento ou None se nada chegou em `timeout` segundos."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LocalBroker:
+    """Assinantes e publicação no mesmo processo."""
+
+    def __init__(self):
+        self._subs = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: int) -> Subscription:
+        sub = Subscription(user_id)
+        with self._lock:
+            self._subs[user_id].add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subs.get(sub.user_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[sub.user_id]
+
+    def wants(self, user_id: int) -> bool:
+        """Vale a pena montar o evento? (sem assinante local, não)"""
+        return user_id in self._subs
+
+    def publish(self, user_id: int, event: str, data: Dict[str, Any]) -> None:
+        self.dispatch({"user": user_id, "event": event, "data": data})
+
+    def dispatch(self, message: Dict[str, Any]) -> None:
+        """Entrega aos assinantes locais do usuário (RESYNC: a todos)."""
+        with self._lock:
+            if message is RESYNC:
+                subs = [s for group in self._subs.values() for s in group]
+            else:
+                subs = list(self._subs.get(message["user"], ()))
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub.deliver, message)
+            except RuntimeError:
+                # loop já fechado: a conexão morreu sem passar pelo unsubscribe
+                self.unsubscribe(sub)
+
+
+class PostgresBroker(LocalBroker):
+    """LISTEN/NOTIFY: publish em qualquer processo, entrega nos assinantes de todos."""
+
+    def __init__(self, using: str = DEFAULT_DB_ALIAS):
+        super().__init__()
+        self.using = using
+        self._listener = None
+
+    def wants(self, user_id: int) -> bool:
+        # assinantes podem estar em outro processo
+        return True
+
+    def subscribe(self, user_id: int) -> Subscription:
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name="notifications-listen", daemon=True)
+                self._listener.start()
+        return super().subscribe(user_id)
+
+    def publish(self, user_id: int, event: str, data: Dict[str, Any]) -> None:
+        payload = json.dumps({"user": user_id, "event": event, "data": data}, default=str)
+        if len(payload.encode()) > PG_MAX_PAYLOAD:
+            # corpo grande: vai só o id, o frontend busca a notificação
+            payload = json.dumps({"user": user_id, "event": event, "data": {"id": data.get("id"), "truncated": True}})
+        with connections[self.using].cursor() as cur:
+            cur.execute("SELECT pg_notify(%s, %s)", [CHANNEL, payload])
+
+    def _listen(self) -> None:
+        from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+        # conexão própria (fora do pool da request), em autocommit, só para o LISTEN
+        first = True
+        while True:
+            conn = connections.create_connection(self.using)
+            try:
+                conn.ensure_connection()
+                raw = conn.connection
+                raw.autocommit = True
+                pending = []
+                if is_psycopg3:
+                    # psycopg 3 entrega as notificações lidas a cada comando aos handlers
+                    raw.add_notify_handler(pending.append)
+                with raw.cursor() as cur:
+                    cur.execute(f"LISTEN {CHANNEL}")
+                if not first:
+                    # eventos enviados enquanto estava desconectado se perderam
+                    self.dispatch(RESYNC)
+                first = False
+                while True:
+                    if not select.select([raw.fileno()], [], [], LISTEN_POLL_SECONDS)[0]:
+                        continue
+                    if is_psycopg3:
+                        raw.execute("SELECT 1")  # lê o socket: notificações vão para `pending`
+                    else:
+                        raw.poll()
+                        pending.extend(raw.notifies)
+                        del raw.notifies[:]
+                    notes, pending[:] = pending[:], []
+                    for note in notes:
+                        try:
+                            self.dispatch(json.loads(note.payload))
+                        except (ValueError, KeyError):
+                            logger.warning("Payload inválido no canal %s: %r", CHANNEL, note.payload[:200])
+            except Exception:
+                logger.exception("LISTEN %s caiu; reconectando", CHANNEL)
+                time.sleep(1)
+            finally:
+                conn.close()
+
+
+_BROKERS = {"local": LocalBroker, "postgres": PostgresBroker}
+
+
+def default_broker_name() -> str:
+    # "local" com vários processos (workers ASGI, WSGI, jobs) não entrega nada entre eles
+    return "postgres" if connections[DEFAULT_DB_ALIAS].vendor == "postgresql" else "local"
+
+
+@lru_cache(maxsize=1)
+def get_broker() -> LocalBroker:
+    name = getattr(settings, "NOTIFICATIONS_BROKER", "") or default_broker_name()
+    cls = _BROKERS.get(name) or import_string(name)
+    return cls()
@@ -0,0 +1,107 @@
+# src/notifications/counters.py
+"""
+Contador de notificações não lidas por usuário (NotificationUnreadCounter).
+
+- create/save/delete de Notification: signals (post_save/post_delete) ajustam o
+  contador na mesma transação do write (create_notification, admin, shell)
+- bulk_create não dispara signals: bulk_notify chama bump_many
+- marcar como lida: mark_read(), que trava as linhas, atualiza e ajusta o contador
+- reconcile() corrige o contador a partir da tabela (rodar periodicamente:
+  manage.py reconcile_notification_counters no cron)
+- leitura (badge): unread_count / aunread_count, uma busca pela pk
+- toda mudança avisa as conexões SSE depois do commit (src/notifications/push.py)
+"""
+from collections import Counter
+from typing import Dict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from src.notifications import push
+from src.notifications.models import Notification, NotificationUnreadCounter
+
+
+def _add(user_id: int, delta: int) -> None:
+    updated = NotificationUnreadCounter.objects.filter(pk=user_id).update(unread=F("unread") + delta)
+    if not updated:
+        try:
+            with transaction.atomic():
+                NotificationUnreadCounter.objects.create(user_id=user_id, unread=delta)
+        except IntegrityError:
+            NotificationUnreadCounter.objects.filter(pk=user_id).update(unread=F("unread") + delta)
+
+
+def bump(user_id: int, delta: int) -> None:
+    if delta:
+        _add(user_id, delta)
+        push.unread_changed([user_id])
+
+
+def bump_many(deltas: Dict[int, int]) -> None:
+    # ordem fixa das chaves: transações concorrentes travam os contadores na mesma ordem
+    changed = [user_id for user_id, delta in sorted(deltas.items()) if delta]
+    for user_id in changed:
+        _add(user_id, deltas[user_id])
+    push.unread_changed(changed)
+
+
+def mark_read(queryset) -> int:
+    """Marca as notificações não lidas do queryset como lidas, mantendo o contador."""
+    with transaction.atomic():
+        rows = list(queryset.filter(is_read=False).select_for_update().order_by().values_list("pk", "recipient_id"))
+        if not rows:
+            return 0
+        updated = Notification.objects.filter(pk__in=[pk for pk, _ in rows]).update(is_read=True)
+        bump_many({user_id: -n for user_id, n in Counter(uid for _, uid in rows).items()})
+    return updated
+
+
+def unread_count(user_id: int) -> int:
+    return NotificationUnreadCounter.objects.filter(pk=user_id).values_list("unread", flat=True).first() or 0
+
+
+async def aunread_count(user_id: int) -> int:
+    return await NotificationUnreadCounter.objects.filter(pk=user_id).values_list("unread", flat=True).afirst() or 0
+
+
+def reconcile() -> int:
+    """Recalcula o contador a partir de Notification. Retorna quantos usuários foram corrigidos."""
+    with transaction.atomic():
+        # trava os contadores antes de contar: bumps concorrentes esperam e somam por cima
+        current = dict(NotificationUnreadCounter.objects.select_for_update().values_list("user_id", "unread"))
+        actual = dict(
+            Notification.objects.filter(is_read=False).order_by()
+            .values("recipient_id").annotate(n=Count("pk")).values_list("recipient_id", "n")
+        )
+        changed = []
+        for user_id in sorted(set(current) | set(actual)):
+            n = actual.get(user_id, 0)
+            if user_id not in current:
+                _add(user_id, n)
+            elif current[user_id] != n:
+                NotificationUnreadCounter.objects.filter(pk=user_id).update(unread=n)
+            else:
+                continue
+            changed.append(user_id)
+        push.unread_changed(changed)
+    return len(changed)
+
+
+# ---------------------------------------------------------------------
+# Signals (conectados em NotificationsConfig.ready)
+# ---------------------------------------------------------------------
+
+def notification_saved(sender, instance: Notification, created: bool, **kwargs):
+    old = getattr(instance, "_loaded_is_read", None)
+    if created:
+        push.notifications_created([instance])
+        if not instance.is_read:
+            bump(instance.recipient_id, 1)
+    elif old is not None and old != instance.is_read:
+        bump(instance.recipient_id, 1 if old else -1)
+    instance._loaded_is_read = instance.is_read
+
+
+def notification_deleted(sender, instance: Notification, **kwargs):
+    if not instance.is_read:
+        bump(instance.recipient_id, -1)
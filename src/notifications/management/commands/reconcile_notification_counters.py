@@ -0,0 +1,12 @@
+# src/notifications/management/commands/reconcile_notification_counters.py
+from django.core.management.base import BaseCommand
+
+from src.notifications.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = "Corrige o contador de não lidas por usuário a partir da tabela de notificações (rodar no cron)."
+
+    def handle(self, *args, **opts):
+        n = reconcile()
+        self.stdout.write(self.style.SUCCESS(f"{n} contador(es) de não lidas corrigido(s)."))
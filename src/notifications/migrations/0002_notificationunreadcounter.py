@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    Notification = apps.get_model("notifications", "Notification")
+    NotificationUnreadCounter = apps.get_model("notifications", "NotificationUnreadCounter")
+    rows = Notification.objects.filter(is_read=False).order_by().values("recipient_id").annotate(n=Count("pk"))
+    NotificationUnreadCounter.objects.bulk_create(
+        [NotificationUnreadCounter(user_id=r["recipient_id"], unread=r["n"]) for r in rows]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationUnreadCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
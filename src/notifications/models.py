@@ -15,3 +15,21 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "is_read" in field_names:
+            # valor original: o contador de não lidas usa na transição (src/notifications/counters.py)
+            instance._loaded_is_read = instance.is_read
+        return instance
+
+
+class NotificationUnreadCounter(models.Model):
+    """Não lidas por usuário, mantido a cada escrita (src/notifications/counters.py)."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="+")
+    unread = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread}"
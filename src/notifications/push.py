@@ -0,0 +1,45 @@
+# src/notifications/push.py
+"""
+Eventos enviados às conexões SSE (src/notifications/broker.py), sempre depois do
+commit da transação que criou/alterou as notificações:
+
+- "notification": notificação nova (mesmo formato da listagem)
+- "unread": contagem de não lidas mudou ({"unread": <int>}, lida do contador)
+"""
+from typing import Iterable
+
+from django.db import transaction
+
+from src.notifications.broker import get_broker
+from src.notifications.models import Notification, NotificationUnreadCounter
+
+
+def _publish_created(notifications) -> None:
+    from src.notifications.api.views import serialize_notification
+
+    broker = get_broker()
+    for n in notifications:
+        if broker.wants(n.recipient_id):
+            broker.publish(n.recipient_id, "notification", serialize_notification(n))
+
+
+def _publish_unread(user_ids) -> None:
+    broker = get_broker()
+    user_ids = [uid for uid in user_ids if broker.wants(uid)]
+    if not user_ids:
+        return
+    counts = dict(NotificationUnreadCounter.objects.filter(pk__in=user_ids).values_list("user_id", "unread"))
+    for uid in user_ids:
+        broker.publish(uid, "unread", {"unread": counts.get(uid, 0)})
+
+
+def notifications_created(notifications: Iterable[Notification]) -> None:
+    notifications = list(notifications)
+    if notifications:
+        transaction.on_commit(lambda: _publish_created(notifications))
+
+
+def unread_changed(user_ids: Iterable[int]) -> None:
+    user_ids = sorted(set(user_ids))
+    if user_ids:
+        transaction.on_commit(lambda: _publish_unread(user_ids))
@@ -1,3 +1,83 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from src.notifications import broker
+from src.notifications.api.services import bulk_notify, create_notification
+from src.notifications.counters import mark_read, reconcile, unread_count
+from src.notifications.models import Notification, NotificationUnreadCounter
+
+
+class UnreadCounterTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.alice = User.objects.create_user("alice", password="x")
+        self.bob = User.objects.create_user("bob", password="x")
+
+    def assertUnread(self, alice, bob):
+        self.assertEqual((unread_count(self.alice.pk), unread_count(self.bob.pk)), (alice, bob))
+
+    def test_create_counts_unread_only(self):
+        create_notification(recipient=self.alice, title="a")
+        Notification.objects.create(recipient=self.alice, title="already read", is_read=True)
+        self.assertUnread(1, 0)
+
+    def test_bulk_notify_bumps_every_recipient(self):
+        self.assertEqual(bulk_notify([self.alice, self.bob, self.alice], title="hi"), 3)
+        self.assertUnread(2, 1)
+
+    def test_mark_read_is_idempotent(self):
+        bulk_notify([self.alice, self.alice, self.bob], title="hi")
+        qs = Notification.objects.filter(recipient=self.alice)
+        self.assertEqual(mark_read(qs), 2)
+        self.assertEqual(mark_read(qs), 0)
+        self.assertUnread(0, 1)
+
+    def test_save_toggling_is_read(self):
+        n = create_notification(recipient=self.alice, title="a")
+        n = Notification.objects.get(pk=n.pk)
+        n.is_read = True
+        n.save()
+        self.assertUnread(0, 0)
+        n.is_read = False
+        n.save()
+        self.assertUnread(1, 0)
+
+    def test_delete_unread_and_read(self):
+        unread = create_notification(recipient=self.alice, title="a")
+        read = create_notification(recipient=self.alice, title="b")
+        mark_read(Notification.objects.filter(pk=read.pk))
+        Notification.objects.get(pk=read.pk).delete()
+        self.assertUnread(1, 0)
+        unread.delete()
+        self.assertUnread(0, 0)
+
+    def test_reconcile_fixes_drift(self):
+        bulk_notify([self.alice, self.bob], title="hi")
+        # escrita que não passa pelos signals/helpers: o contador fica errado
+        Notification.objects.filter(recipient=self.bob).update(is_read=True)
+        NotificationUnreadCounter.objects.filter(pk=self.alice.pk).update(unread=7)
+        self.assertUnread(7, 1)
+        self.assertEqual(reconcile(), 2)
+        self.assertUnread(1, 0)
+        self.assertEqual(reconcile(), 0)
+
+
+class BrokerSelectionTests(TestCase):
+    def tearDown(self):
+        broker.get_broker.cache_clear()
+
+    def _broker(self, vendor):
+        broker.get_broker.cache_clear()
+        with mock.patch.object(broker.connections[broker.DEFAULT_DB_ALIAS], "vendor", vendor):
+            return broker.get_broker()
+
+    @override_settings(NOTIFICATIONS_BROKER="")
+    def test_default_follows_the_database(self):
+        self.assertIs(type(self._broker("postgresql")), broker.PostgresBroker)
+        self.assertIs(type(self._broker("sqlite")), broker.LocalBroker)
+
+    @override_settings(NOTIFICATIONS_BROKER="local")
+    def test_explicit_setting_wins(self):
+        self.assertIs(type(self._broker("postgresql")), broker.LocalBroker)
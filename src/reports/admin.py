@@ -1,10 +1,11 @@
 # reports/admin.py
+from django import forms
 from django.contrib import admin, messages
 from django.utils.html import format_html
 from django.http import HttpResponse
-from django.utils import timezone
 
-from .models import Report
+from .counters import set_status
+from .models import Report, ReportBlob, ReportConfigBlob, ReportJob, ReportPartial, ReportStatusCounter
 
 # Tenta usar um widget JSON mais amigável (opcional)
 try:
@@ -17,8 +18,30 @@ except Exception:
     JSONEditorWidget = None
 
 
+class ReportAdminForm(forms.ModelForm):
+    # config mora em ReportConfigBlob: campo do form lido/gravado pela propriedade Report.config
+    config = forms.JSONField(
+        required=False,
+        widget=JSONEditorWidget() if HAS_JSON_WIDGET else forms.Textarea(attrs={"rows": 12}),
+    )
+
+    class Meta:
+        model = Report
+        exclude = ("config_blob",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk and not self.instance._state.adding:
+            self.initial["config"] = self.instance.config
+
+    def save(self, commit=True):
+        self.instance.config = self.cleaned_data.get("config")
+        return super().save(commit=commit)
+
+
 @admin.register(Report)
 class ReportAdmin(admin.ModelAdmin):
+    form = ReportAdminForm
     list_display = ("name", "type", "status", "owner", "updated_at", "created_at", "open_in_app")
     list_display_links = ("name",)
     list_filter = ("status", "type", "owner", ("updated_at", admin.DateFieldListFilter), ("created_at", admin.DateFieldListFilter))
@@ -27,7 +50,7 @@ class ReportAdmin(admin.ModelAdmin):
     list_per_page = 25
     date_hierarchy = "updated_at"
     autocomplete_fields = ("owner",)
-    readonly_fields = ("created_at", "updated_at")
+    readonly_fields = ("created_at", "updated_at", "status_reason")
 
     # >>> IMPORTANTE: aqui precisa ser um DICT, não um método <<<
     if HAS_JSON_WIDGET:
@@ -44,22 +67,23 @@ class ReportAdmin(admin.ModelAdmin):
 
     @admin.action(description="Mark selected as Ready")
     def mark_ready(self, request, queryset):
-        updated = queryset.update(status=Report.Status.READY, updated_at=timezone.now())
+        updated = set_status(queryset, Report.Status.READY, status_reason="")
         self.message_user(request, f"{updated} report(s) updated to Ready.", messages.SUCCESS)
 
     @admin.action(description="Mark selected as Processing")
     def mark_processing(self, request, queryset):
-        updated = queryset.update(status=Report.Status.PROCESSING, updated_at=timezone.now())
+        updated = set_status(queryset, Report.Status.PROCESSING, status_reason="")
         self.message_user(request, f"{updated} report(s) updated to Processing.", messages.SUCCESS)
 
     @admin.action(description="Mark selected as Failed")
     def mark_failed(self, request, queryset):
-        updated = queryset.update(status=Report.Status.FAILED, updated_at=timezone.now())
+        updated = set_status(queryset, Report.Status.FAILED, status_reason="Marked as failed in the admin.")
         self.message_user(request, f"{updated} report(s) updated to Failed.", messages.SUCCESS)
 
     @admin.action(description="Duplicate selected reports")
     def duplicate_reports(self, request, queryset):
         count = 0
+        # a cópia aponta para o mesmo ReportConfigBlob (só o refcount sobe)
         for r in queryset:
             r.pk = None
             r.name = f"{r.name} (Copy)"
@@ -86,3 +110,47 @@ class ReportAdmin(admin.ModelAdmin):
                 r.created_at.isoformat() if r.created_at else "",
             ])
         return resp
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "report", "format", "status", "attempts", "rows", "duration_ms", "created_at", "finished_at")
+    list_filter = ("status", "format")
+    search_fields = ("report__name", "worker", "error")
+    raw_id_fields = ("report", "requested_by")
+    readonly_fields = ("created_at", "started_at", "heartbeat_at", "finished_at", "duration_ms", "rows", "size_bytes", "blob", "worker")
+
+
+@admin.register(ReportPartial)
+class ReportPartialAdmin(admin.ModelAdmin):
+    # agregados parciais do refresh incremental (apagar força recálculo completo)
+    list_display = ("config_hash", "source", "high_water_id", "updated_at")
+    list_filter = ("source",)
+    readonly_fields = ("config_hash", "source", "high_water_id", "pending_hwm", "pending_at", "rows", "updated_at")
+
+
+@admin.register(ReportStatusCounter)
+class ReportStatusCounterAdmin(admin.ModelAdmin):
+    # mantido automaticamente; para reconciliar: python manage.py rebuild_report_counters
+    list_display = ("status", "type", "count")
+    list_filter = ("status",)
+    readonly_fields = ("status", "type", "count")
+
+
+@admin.register(ReportBlob)
+class ReportBlobAdmin(admin.ModelAdmin):
+    # refcount mantido automaticamente; para reconciliar/limpar: python manage.py gc_report_blobs
+    list_display = ("hash", "codec", "size_bytes", "stored_bytes", "refcount", "updated_at")
+    list_filter = ("codec",)
+    search_fields = ("hash",)
+    readonly_fields = ("hash", "codec", "size_bytes", "stored_bytes", "refcount", "created_at", "updated_at")
+
+
+@admin.register(ReportConfigBlob)
+class ReportConfigBlobAdmin(admin.ModelAdmin):
+    # refcount mantido automaticamente; para reconciliar/limpar: python manage.py gc_report_blobs
+    list_display = ("hash", "codec", "size_bytes", "refcount", "updated_at")
+    list_filter = ("codec",)
+    search_fields = ("hash",)
+    exclude = ("data",)
+    readonly_fields = ("hash", "codec", "size_bytes", "refcount", "created_at", "updated_at")
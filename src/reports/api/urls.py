@@ -3,8 +3,15 @@ from . import views
 
 urlpatterns = [
     path("reports/", views.reports_list_create_api, name="reports-list-create"),
+    path("reports/preview/", views.report_preview_api, name="reports-preview"),
     path("reports/stats/", views.reports_stats_api, name="reports-stats"),
     path("report-types/", views.report_types_list_api, name="report-types"),
     path("reports/<uuid:pk>/", views.report_detail_api, name="report-detail"),
     path("reports/<uuid:pk>/export/", views.report_export_api, name="report-export"),
+    path("reports/<uuid:pk>/plan/", views.report_plan_api, name="report-plan"),
+    path("reports/<uuid:pk>/generate/", views.report_generate_api, name="report-generate"),
+    path("reports/<uuid:pk>/jobs/<int:job_id>/", views.report_job_detail_api, name="report-job-detail"),
+    path("reports/<uuid:pk>/results/", views.report_results_api, name="report-results"),
+    path("reports/<uuid:pk>/jobs/<int:job_id>/results/", views.report_results_api, name="report-job-results"),
+    path("reports/<uuid:pk>/jobs/<int:job_id>/download/", views.report_job_download_api, name="report-job-download"),
 ]
@@ -1,17 +1,33 @@
 # src/reports/api/views.py
-from typing import Dict, Any, List
+import base64
+import json
+import uuid
+from typing import Dict, Any
 from datetime import datetime
+from django.conf import settings
 from django.db.models import Q, Count
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
-from django.utils.dateparse import parse_date
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date, parse_datetime
 
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.negotiation import DefaultContentNegotiation
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 
-from src.reports.models import Report
+from src.common.async_api import is_asgi_request, streaming_content
+from src.reports import blobs
+from src.reports.engine import ReportConfigError
+from src.reports.cache import artifact_key, lookup, stream_and_cache
+from src.reports.export import CONTENT_TYPES, resolve_format
+from src.reports.incremental import refresh_for
+from src.reports.counters import set_status
+from src.reports.jobs import enqueue_report
+from src.reports.models import Report, ReportJob, ReportStatusCounter
+from src.reports.planner import ASYNC, REJECT, ReportTimeoutError, plan_report, statement_timeout
+from src.reports.preview import preview_report
+from src.reports.results import read_page
 
 # ---------------------------------------------------------------------
 # Helpers
@@ -56,6 +72,7 @@ def serialize_report(r: Report) -> Dict[str, Any]:
         "name": r.name,
         "type": r.type,
         "status": r.status,
+        "status_reason": r.status_reason or None,
         "owner": getattr(r.owner, "username", None) or getattr(r.owner, "email", None),
         "updated_at": _fmt_date(r.updated_at) or _fmt_date(r.created_at),
         "created_at": _fmt_date(r.created_at),
@@ -71,6 +88,7 @@ def serialize_report_detail(r: Report) -> Dict[str, Any]:
         "name": r.name,
         "type": r.type,
         "status": r.status,
+        "status_reason": r.status_reason or None,
         "owner": {
             "id": getattr(r.owner, "id", None),
             "username": getattr(r.owner, "username", None),
@@ -81,6 +99,23 @@ def serialize_report_detail(r: Report) -> Dict[str, Any]:
         "created_at": _fmt_date(r.created_at),
     }
 
+def serialize_job(j: ReportJob) -> Dict[str, Any]:
+    return {
+        "id": j.id,
+        "report": str(j.report_id),
+        "format": j.format,
+        "status": j.status,
+        "created_at": _fmt_date(j.created_at),
+        "started_at": _fmt_date(j.started_at),
+        "finished_at": _fmt_date(j.finished_at),
+        "duration_ms": j.duration_ms,
+        "rows": j.rows,
+        "size_bytes": j.size_bytes,
+        "error": j.error or None,
+        "download_url": f"/api/reports/{j.report_id}/jobs/{j.id}/download/" if j.status == ReportJob.Status.DONE else None,
+        "results_url": f"/api/reports/{j.report_id}/jobs/{j.id}/results/" if j.result_blob_id else None,
+    }
+
 def _apply_filters(qs, request):
     """
     Filtros para listagens/stats:
@@ -111,13 +146,62 @@ def _apply_filters(qs, request):
 
     return qs
 
+class _FileFormatNegotiation(DefaultContentNegotiation):
+    """
+    Nos endpoints de export, ?format= escolhe o formato do ARQUIVO (csv, xlsx, ...),
+    não o renderer do DRF (que devolveria 404 para formatos que ele não conhece).
+    """
+    class settings:
+        URL_FORMAT_OVERRIDE = None
+
+def file_format_param(func):
+    func.content_negotiation_class = _FileFormatNegotiation
+    return func
+
+def _encode_cursor(r: Report) -> str:
+    raw = json.dumps([r.updated_at.isoformat(), str(r.id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        ts, pk = json.loads(raw)
+        updated_at = parse_datetime(ts)
+        if updated_at is None:
+            raise ValueError(ts)
+        return updated_at, uuid.UUID(pk)
+    except Exception:
+        return None
+
 def _paginate(request, qs):
+    """Paginação legada por ?page=&page_size= (OFFSET + COUNT(*))."""
     page = _safe_int(request.query_params.get("page"), 1) or 1
     page_size = _safe_int(request.query_params.get("page_size"), 10) or 10
     total = qs.count()
     start = (page - 1) * page_size
     end = start + page_size
-    return page, page_size, total, qs[start:end]
+    return page, page_size, total, qs.order_by("-updated_at", "-id")[start:end]
+
+def _keyset_page(request, qs):
+    """
+    Keyset em (updated_at, id) decrescente: ?cursor=<next_cursor>&page_size=10
+    Custo constante em qualquer profundidade (sem OFFSET).
+    """
+    page_size = _safe_int(request.query_params.get("page_size"), 10) or 10
+    page_size = max(1, min(page_size, 100))
+    qs = qs.order_by("-updated_at", "-id")
+
+    cursor = request.query_params.get("cursor")
+    if cursor:
+        decoded = _decode_cursor(cursor)
+        if decoded is None:
+            return None, None, page_size
+        updated_at, pk = decoded
+        qs = qs.filter(Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lt=pk))
+
+    rows = list(qs[:page_size + 1])  # uma avaliação só; +1 indica se há próxima página
+    next_cursor = _encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    return rows[:page_size], next_cursor, page_size
 
 # ---------------------------------------------------------------------
 # Endpoints
@@ -128,27 +212,52 @@ def _paginate(request, qs):
 def reports_list_create_api(request):
     """
     GET: lista relatórios (autenticado). Suporta filtros e paginação.
+         Padrão (legado): ?page=&page_size= -> {results, count, page, page_size}.
+         Com ?cursor= (vazio na primeira página) a paginação é por keyset:
+         {results, next_cursor, page_size}; ?with_count=1 inclui o total.
          Use '?include=config' para trazer 'config' na listagem.
     POST: cria relatório (somente admin).
     """
     if request.method == "GET":
-        qs = Report.objects.select_related("owner").all().order_by("-updated_at")
+        include_config = (request.query_params.get("include") or "").lower() == "config"
+        qs = Report.objects.select_related("owner")
+        if include_config:
+            # a linha só guarda o hash: o config vem do ReportConfigBlob no mesmo SELECT
+            qs = qs.select_related("config_blob")
         qs = _apply_filters(qs, request)
-        page, page_size, total, page_qs = _paginate(request, qs)
 
-        data = [serialize_report(r) for r in page_qs]
-
-        # incluir config se solicitado explicitamente (evita payloads grandes por padrão)
-        if (request.query_params.get("include") or "").lower() == "config":
-            for i, r in enumerate(page_qs):
-                data[i]["config"] = r.config or {}
-
-        return Response({
-            "results": data,
-            "count": total,
-            "page": page,
+        def serialize(rows):
+            data = []
+            for r in rows:
+                item = serialize_report(r)
+                if include_config:
+                    item["config"] = r.config or {}
+                data.append(item)
+            return data
+
+        # keyset só quando pedido: clientes antigos continuam recebendo page/count
+        if "cursor" not in request.query_params:
+            page, page_size, total, page_qs = _paginate(request, qs)
+            return Response({
+                "results": serialize(page_qs),
+                "count": total,
+                "page": page,
+                "page_size": page_size,
+            })
+
+        page, next_cursor, page_size = _keyset_page(request, qs)
+        if page is None:
+            return Response({"detail": "Invalid cursor."}, status=status.HTTP_400_BAD_REQUEST)
+
+        out = {
+            "results": serialize(page),
+            "next_cursor": next_cursor,
             "page_size": page_size,
-        })
+        }
+        # total é um COUNT(*) à parte: só quando pedido
+        if (request.query_params.get("with_count") or "").lower() in {"1", "true", "yes"}:
+            out["count"] = qs.count()
+        return Response(out)
 
     # POST
     if not _is_admin(request):
@@ -174,7 +283,7 @@ def reports_list_create_api(request):
 @api_view(["GET", "PATCH", "DELETE"])
 @permission_classes([IsAuthenticated])
 def report_detail_api(request, pk):
-    r = get_object_or_404(Report.objects.select_related("owner"), pk=pk)
+    r = get_object_or_404(Report.objects.select_related("owner", "config_blob"), pk=pk)
 
     if request.method == "GET":
         return Response(serialize_report_detail(r))
@@ -189,14 +298,19 @@ def report_detail_api(request, pk):
         status_val = payload.get("status")
         config = payload.get("config")
 
+        # só os campos enviados: status não é regravado por cima de um set_status concorrente
+        fields = {"updated_at"}
         if name is not None:
             r.name = name.strip() or r.name
+            fields.add("name")
         if rtype is not None:
             r.type = rtype.strip() or r.type
+            fields.add("type")
         if status_val is not None and status_val in Report.Status.values:
             r.status = status_val
+            fields.add("status")
         if config is not None:
-            r.config = config
+            r.config = config  # Report.save acrescenta config_blob se o conteúdo mudou
 
         # opcional: permitir trocar owner (admin only)
         owner_id = payload.get("owner_id")
@@ -205,10 +319,11 @@ def report_detail_api(request, pk):
             User = get_user_model()
             try:
                 r.owner = User.objects.get(pk=int(owner_id))
+                fields.add("owner")
             except Exception:
                 pass
 
-        r.save()
+        r.save(update_fields=fields)
         return Response(serialize_report_detail(r))
 
     # DELETE
@@ -235,16 +350,25 @@ def report_types_list_api(request):
 def reports_stats_api(request):
     """
     Contagens para cartões do topo.
+    Sem filtros (ou só ?type=): lê os contadores mantidos por status/type
+    (src/reports/counters.py). Com q/from/to: agrega sobre Report.
     """
-    qs = Report.objects.all()
-    qs = _apply_filters(qs, request)
-
-    total = qs.count()
-    agg = qs.values("status").annotate(c=Count("id"))
-    by = {row["status"]: row["c"] for row in agg}
+    params = request.query_params
+    if any(params.get(k) for k in ("q", "from", "to")):
+        qs = _apply_filters(Report.objects.all(), request)
+        agg = qs.order_by().values("status").annotate(c=Count("id"))
+        by = {row["status"]: row["c"] for row in agg}
+    else:
+        counters = ReportStatusCounter.objects.all()
+        rtype = (params.get("type") or "").strip()
+        if rtype:
+            counters = counters.filter(type__iexact=rtype)
+        by = {}
+        for st, c in counters.values_list("status", "count"):
+            by[st] = by.get(st, 0) + c
 
     out = {
-        "total": total,
+        "total": sum(by.values()),
         "ready": by.get("Ready", 0) + by.get("Active", 0),
         "processing": by.get("Processing", 0) + by.get("Scheduled", 0),
         "failed": by.get("Failed", 0),
@@ -253,28 +377,180 @@ def reports_stats_api(request):
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@file_format_param
 def report_export_api(request, pk):
     """
-    Exporta CSV (placeholder). Em produção, gere dataset conforme r.config.
+    Exporta o relatório gerado a partir de r.config (ver src/reports/engine.py).
+    ?format=csv|csv.gz|jsonl|xlsx|arrow|parquet (xlsx/arrow/parquet se as libs estiverem instaladas)
+    As linhas vêm de um cursor server-side e saem em streaming (chunked, memória constante);
+    o resultado fica no cache (src/reports/cache.py) para os próximos exports.
+    Sob ASGI o corpo é um iterador assíncrono que puxa um chunk por vez na thread da
+    request (src/common/async_api.aiter_sync): nada é acumulado em memória e a
+    transação do statement_timeout fecha no fim do stream ou na desconexão.
+    Sem cache, o custo estimado (src/reports/planner.py) decide: acima do orçamento
+    síncrono vira job (202), acima do orçamento total é recusado (400).
     """
     r = get_object_or_404(Report, pk=pk)
 
-    fmt = (request.query_params.get("format") or "csv").lower()
-    if fmt != "csv":
-        return Response({"detail": "Only CSV is supported right now."}, status=status.HTTP_400_BAD_REQUEST)
-
-    # Exemplo simplificado
-    rows: List[Dict[str, Any]] = [
-        {"metric": "revenue", "value": 12345, "date": "2025-08-01"},
-        {"metric": "orders", "value": 678, "date": "2025-08-01"},
-    ]
-
-    import csv
-    resp = HttpResponse(content_type="text/csv")
-    resp["Content-Disposition"] = f'attachment; filename="{(r.name or "report").replace(" ", "_")}.csv"'
-    writer = csv.DictWriter(resp, fieldnames=["metric", "value", "date"])
-    writer.writeheader()
-    for row in rows:
-        writer.writerow(row)
+    try:
+        fmt = resolve_format(request.query_params.get("format") or "csv")
+        key = artifact_key(r.config, fmt)
+    except ReportConfigError as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    filename = f'{(r.name or "report").replace(" ", "_")}.{fmt}'
+    # mesmo config + mesmos dados já exportados: serve o arquivo pronto
+    artifact = lookup(key)
+    if artifact is not None:
+        return _blob_response(request, artifact.blob, filename, CONTENT_TYPES[fmt])
+
+    plan = plan_report(r.config)
+    if plan.mode == REJECT:
+        return Response({"detail": plan.reason, "plan": plan.to_dict()}, status=status.HTTP_400_BAD_REQUEST)
+    if plan.mode == ASYNC:
+        job = enqueue_report(r, fmt, user=request.user, plan=plan)
+        return Response(
+            {"detail": plan.reason, "plan": plan.to_dict(), "job": serialize_job(job)},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    # ASGI: chunks puxados um a um na thread da request (src/common/async_api.aiter_sync)
+    resp = StreamingHttpResponse(
+        streaming_content(request, _stream_with_timeout(r, fmt, key)), content_type=CONTENT_TYPES[fmt],
+    )
+    resp["Content-Disposition"] = f'attachment; filename="{filename}"'
     return resp
- 
\ No newline at end of file
+
+def _blob_response(request, blob, filename: str, content_type: str):
+    """
+    Download de um blob: sem compressão (WSGI) vai direto do arquivo; comprimido
+    ou sob ASGI, lido/descomprimido em streaming chunk a chunk.
+    """
+    if blob.codec == "none" and not is_asgi_request(request):
+        return FileResponse(blobs.open_blob(blob), as_attachment=True, filename=filename, content_type=content_type)
+    resp = StreamingHttpResponse(streaming_content(request, blobs.iter_blob(blob)), content_type=content_type)
+    resp["Content-Disposition"] = f'attachment; filename="{filename}"'
+    resp["Content-Length"] = str(blob.size_bytes)
+    return resp
+
+def _stream_with_timeout(r: Report, fmt: str, key: str):
+    """stream_and_cache dentro do statement_timeout síncrono; estourou -> Report Failed com o motivo."""
+    # parcial incremental atualizado antes, na transação dele (não trava durante o stream)
+    refresh_for(r.config)
+    try:
+        with statement_timeout(getattr(settings, "REPORTS_SYNC_STATEMENT_TIMEOUT_MS", 30 * 1000)):
+            yield from stream_and_cache(r.config, fmt, key, refresh=False)
+    except ReportTimeoutError as e:
+        set_status(Report.objects.filter(pk=r.pk), Report.Status.FAILED, status_reason=str(e))
+        raise
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def report_plan_api(request, pk):
+    """
+    Custo estimado (EXPLAIN) do config e o modo de execução: sync | async | reject.
+    Admin vê também o SQL compilado.
+    """
+    r = get_object_or_404(Report.objects.select_related("config_blob").only("id", "config_blob__codec", "config_blob__data"), pk=pk)
+    try:
+        plan = plan_report(r.config)
+    except ReportConfigError as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    out = plan.to_dict()
+    if _is_admin(request):
+        out["sql"] = plan.sql
+    return Response(out)
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+@file_format_param
+def report_generate_api(request, pk):
+    """
+    Enfileira a geração do relatório (o worker run_report_worker gera o arquivo).
+    Responde 202 com o job; acompanhe em /reports/<pk>/jobs/<job_id>/.
+    """
+    r = get_object_or_404(Report, pk=pk)
+    fmt = (request.data or {}).get("format") or request.query_params.get("format") or "csv"
+    try:
+        job = enqueue_report(r, fmt, user=request.user)
+    except ReportConfigError as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(serialize_job(job), status=status.HTTP_202_ACCEPTED)
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def report_job_detail_api(request, pk, job_id):
+    job = get_object_or_404(ReportJob, pk=job_id, report_id=pk)
+    return Response(serialize_job(job))
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def report_job_download_api(request, pk, job_id):
+    job = get_object_or_404(ReportJob.objects.select_related("report", "blob"), pk=job_id, report_id=pk)
+    if job.status != ReportJob.Status.DONE:
+        return Response({"detail": f"Report is not ready (status: {job.status})."}, status=status.HTTP_409_CONFLICT)
+
+    if not blobs.exists(job.blob):
+        # arquivo saiu do cache (LRU): é só gerar de novo
+        return Response({"detail": "Report file expired; generate it again."}, status=status.HTTP_410_GONE)
+
+    filename = f'{(job.report.name or "report").replace(" ", "_")}.{job.format}'
+    return _blob_response(request, job.blob, filename, CONTENT_TYPES.get(job.format, "application/octet-stream"))
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def report_results_api(request, pk, job_id=None):
+    """
+    Página do resultado colunar de um job (sem job_id: o último job concluído com resultado).
+    ?offset=0&limit=100&sort=<coluna> (-<coluna> decrescente). Lido do arquivo por
+    memory map (src/reports/results.py): não roda a query de novo.
+    """
+    jobs = ReportJob.objects.select_related("result_blob").filter(report_id=pk, status=ReportJob.Status.DONE)
+    if job_id is not None:
+        job = get_object_or_404(jobs, pk=job_id)
+    else:
+        job = jobs.filter(result_blob__isnull=False).order_by("-finished_at").first()
+        if job is None:
+            get_object_or_404(Report.objects.only("id"), pk=pk)
+            return Response({"detail": "No stored result for this report; generate it first."}, status=status.HTTP_404_NOT_FOUND)
+
+    if not blobs.exists(job.result_blob):
+        return Response({"detail": "Report result expired; generate it again."}, status=status.HTTP_410_GONE)
+
+    sort = request.query_params.get("sort") or None
+    descending = bool(sort and sort.startswith("-"))
+    try:
+        page = read_page(
+            job.result_blob,
+            offset=_safe_int(request.query_params.get("offset"), 0),
+            limit=_safe_int(request.query_params.get("limit"), 100),
+            sort=sort.lstrip("-") if sort else None,
+            descending=descending,
+        )
+    except ValueError as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    page["job"] = job.id
+    return Response(page)
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def report_preview_api(request):
+    """
+    Preview amostrado para o builder (src/reports/preview.py).
+    Body: {"config": {...}, "seed": 0} (ou o próprio config). Não precisa salvar o relatório.
+    Só admin: config arbitrário roda query em qualquer source, como criar/editar relatório.
+    """
+    if not _is_admin(request):
+        return Response({"detail": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
+
+    data = request.data or {}
+    config = data.get("config") if isinstance(data.get("config"), dict) else data
+    try:
+        return Response(preview_report(config, seed=_safe_int(data.get("seed"), 0)))
+    except ReportConfigError as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except ReportTimeoutError:
+        return Response(
+            {"detail": "Preview timed out; narrow the date range or filters."},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
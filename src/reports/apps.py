@@ -4,3 +4,31 @@ from django.apps import AppConfig
 class ReportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'src.reports'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+
+        from . import blobs, configs, incremental, versions
+        from .counters import report_deleted, report_pre_delete, report_pre_save, report_saved
+        from .models import Report, ReportArtifact
+
+        pre_save.connect(report_pre_save, sender=Report, dispatch_uid="reports_counter_pre_save")
+        post_save.connect(report_saved, sender=Report, dispatch_uid="reports_counter_save")
+        pre_delete.connect(report_pre_delete, sender=Report, dispatch_uid="reports_counter_pre_delete")
+        post_delete.connect(report_deleted, sender=Report, dispatch_uid="reports_counter_delete")
+        # refcount dos configs; pre_delete: config_blob ainda pode ser lido se veio adiado
+        post_save.connect(configs.report_saved, sender=Report, dispatch_uid="reports_config_save")
+        pre_delete.connect(configs.report_deleted, sender=Report, dispatch_uid="reports_config_delete")
+        # refcount do blob store
+        post_save.connect(blobs.artifact_saved, sender=ReportArtifact, dispatch_uid="reports_artifact_blob_save")
+        post_delete.connect(blobs.artifact_deleted, sender=ReportArtifact, dispatch_uid="reports_artifact_blob_delete")
+        # parciais do refresh incremental: UPDATE/DELETE nos campos usados apagam os da source
+        for model in incremental.tracked_models():
+            label = model._meta.label_lower
+            post_save.connect(incremental.tracked_saved, sender=model, dispatch_uid=f"reports_partials_save_{label}")
+            post_delete.connect(incremental.tracked_deleted, sender=model, dispatch_uid=f"reports_partials_delete_{label}")
+        # versão das sources (marca d'água do cache): UPDATE/DELETE nos campos lidos
+        for model in versions.tracked_models():
+            label = model._meta.label_lower
+            post_save.connect(versions.source_saved, sender=model, dispatch_uid=f"reports_version_save_{label}")
+            post_delete.connect(versions.source_deleted, sender=model, dispatch_uid=f"reports_version_delete_{label}")
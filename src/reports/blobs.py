@@ -0,0 +1,257 @@
+# src/reports/blobs.py
+"""
+Blob store endereçado pelo conteúdo (sha256 do conteúdo original) para os arquivos
+gerados (cache de exports, resultados de jobs, resultado colunar).
+
+- arquivos em REPORTS_OUTPUT_DIR/blobs/<ab>/<hash>.<zst|gz|bin>, comprimidos com zstd
+  (pacote zstandard, opcional) ou gzip; formatos já comprimidos (csv.gz, xlsx,
+  parquet) vão sem compressão
+- só dado derivado: o config dos relatórios fica no banco (ReportConfigBlob,
+  src/reports/configs.py). Arquivo que sumiu (outro nó, disco perdido, fora do
+  backup) é gerado de novo: lookup
+  descarta o artifact, download de job responde 410. Com vários nós, aponte
+  REPORTS_OUTPUT_DIR para um volume compartilhado para dividir o cache
+- ReportBlob guarda codec, tamanhos e refcount; mesmo conteúdo -> mesmo blob: arquivo
+  gerado idêntico não ocupa espaço de novo
+- refcount = ReportArtifacts (blob) que apontam para o blob, ajustado pelos signals
+  (conectados em ReportsConfig.ready)
+- refcount 0 só é apagado BLOB_GRACE_SECONDS depois do último put: um put cuja
+  transação ainda não fez commit não perde o arquivo (collect / gc_report_blobs)
+"""
+import gzip
+import hashlib
+import logging
+import os
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from src.reports.models import ReportArtifact, ReportBlob
+
+try:
+    import zstandard as zstd  # opcional: pip install zstandard
+    HAS_ZSTD = True
+except Exception:
+    HAS_ZSTD = False
+    zstd = None
+
+logger = logging.getLogger(__name__)
+
+BLOB_GRACE_SECONDS = 10 * 60
+READ_CHUNK_BYTES = 1 << 16
+# formatos que já saem comprimidos do exportador
+PRECOMPRESSED_FORMATS = {"csv.gz", "xlsx", "parquet"}
+# lidos por memory map (src/reports/results.py): ficam sem compressão
+MMAP_FORMATS = {"columnar"}
+_EXTENSIONS = {"zstd": "zst", "gzip": "gz", "none": "bin"}
+
+
+def blob_dir() -> Path:
+    from src.reports.cache import output_dir
+    return output_dir() / "blobs"
+
+
+def default_codec() -> str:
+    return "zstd" if HAS_ZSTD else "gzip"
+
+
+def codec_for_format(fmt: str) -> str:
+    return "none" if fmt in PRECOMPRESSED_FORMATS or fmt in MMAP_FORMATS else default_codec()
+
+
+def blob_path(blob_hash: str, codec: str) -> Path:
+    return blob_dir() / blob_hash[:2] / f"{blob_hash}.{_EXTENSIONS[codec]}"
+
+
+class _Plain:
+    def __init__(self, fh):
+        self.fh = fh
+
+    def write(self, data):
+        return self.fh.write(data)
+
+    def close(self):
+        pass
+
+
+def _compressor(codec: str, fh):
+    if codec == "zstd":
+        return zstd.ZstdCompressor(level=10).stream_writer(fh, closefd=False)
+    if codec == "gzip":
+        return gzip.GzipFile(fileobj=fh, mode="wb", compresslevel=6, mtime=0)
+    return _Plain(fh)
+
+
+class BlobWriter:
+    """Recebe o conteúdo em pedaços, comprime para um temporário e publica pelo hash no commit()."""
+
+    def __init__(self, codec: Optional[str] = None):
+        self.codec = codec or default_codec()
+        self.size = 0
+        self._hasher = hashlib.sha256()
+        tmp_dir = blob_dir() / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp = tmp_dir / f"{uuid.uuid4().hex}.part"
+        self._fh = open(self.tmp, "wb")
+        self._out = _compressor(self.codec, self._fh)
+
+    def write(self, chunk: bytes) -> None:
+        self._hasher.update(chunk)
+        self.size += len(chunk)
+        self._out.write(chunk)
+
+    def abort(self) -> None:
+        self._fh.close()
+        self.tmp.unlink(missing_ok=True)
+
+    def commit(self) -> str:
+        self._out.close()
+        self._fh.close()
+        blob_hash = self._hasher.hexdigest()
+        existing = ReportBlob.objects.filter(pk=blob_hash).first()
+        if existing is not None and blob_path(blob_hash, existing.codec).is_file():
+            # conteúdo já armazenado: descarta a cópia e marca o uso (carência do collect)
+            self.tmp.unlink(missing_ok=True)
+            ReportBlob.objects.filter(pk=blob_hash).update(updated_at=timezone.now())
+            return blob_hash
+
+        target = blob_path(blob_hash, self.codec)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        stored = self.tmp.stat().st_size
+        os.replace(self.tmp, target)
+        if existing is not None:
+            # registro sem arquivo (apagado à mão): volta a apontar para o arquivo novo
+            ReportBlob.objects.filter(pk=blob_hash).update(
+                codec=self.codec, stored_bytes=stored, updated_at=timezone.now(),
+            )
+            return blob_hash
+        try:
+            with transaction.atomic():
+                ReportBlob.objects.create(hash=blob_hash, codec=self.codec, size_bytes=self.size, stored_bytes=stored)
+        except IntegrityError:
+            # outro processo gravou o mesmo conteúdo ao mesmo tempo
+            ReportBlob.objects.filter(pk=blob_hash).update(updated_at=timezone.now())
+        return blob_hash
+
+
+def put_bytes(data: bytes, codec: Optional[str] = None) -> str:
+    writer = BlobWriter(codec)
+    try:
+        writer.write(data)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.commit()
+
+
+def _open_path(path: Path, codec: str) -> BinaryIO:
+    if codec == "zstd":
+        return zstd.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    if codec == "gzip":
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def open_blob(blob: ReportBlob) -> BinaryIO:
+    """Arquivo (descomprimido, leitura sequencial). FileNotFoundError se o arquivo sumiu."""
+    return _open_path(blob_path(blob.hash, blob.codec), blob.codec)
+
+
+def iter_blob(blob: ReportBlob, chunk_size: int = READ_CHUNK_BYTES) -> Iterator[bytes]:
+    with open_blob(blob) as fh:
+        while True:
+            data = fh.read(chunk_size)
+            if not data:
+                break
+            yield data
+
+
+def exists(blob: Optional[ReportBlob]) -> bool:
+    return blob is not None and blob_path(blob.hash, blob.codec).is_file()
+
+
+def incref(blob_hash: Optional[str], n: int = 1) -> None:
+    if blob_hash and n:
+        ReportBlob.objects.filter(pk=blob_hash).update(refcount=F("refcount") + n)
+
+
+def decref(blob_hash: Optional[str], n: int = 1) -> None:
+    incref(blob_hash, -n)
+
+
+def _unlink_all(paths) -> None:
+    for path in paths:
+        path.unlink(missing_ok=True)
+
+
+def collect(grace_seconds: Optional[int] = None) -> int:
+    """Apaga blobs sem referência (refcount <= 0) parados há mais que a carência. Retorna quantos."""
+    grace = BLOB_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    cutoff = timezone.now() - timedelta(seconds=grace)
+    with transaction.atomic():
+        dead = list(
+            ReportBlob.objects.select_for_update(skip_locked=True)
+            .filter(refcount__lte=0, updated_at__lt=cutoff)
+            # refcount fora de sincronia não apaga blob em uso
+            .exclude(pk__in=ReportArtifact.objects.values("blob"))
+        )
+        paths = [blob_path(b.hash, b.codec) for b in dead]
+        ReportBlob.objects.filter(pk__in=[b.pk for b in dead]).delete()
+        # arquivos só saem depois do commit (rollback mantém tudo)
+        transaction.on_commit(lambda: _unlink_all(paths))
+        removed = len(dead)
+    if removed:
+        logger.info("Blob store: %d blob(s) sem referência removido(s)", removed)
+    return removed
+
+
+def rebuild_refcounts() -> int:
+    """Recalcula refcount a partir de ReportArtifact. Retorna quantos blobs mudaram."""
+    refs = dict(
+        ReportArtifact.objects.order_by().values("blob").annotate(n=Count("pk")).values_list("blob", "n")
+    )
+    changed = 0
+    with transaction.atomic():
+        for blob_hash, refcount in ReportBlob.objects.select_for_update().values_list("hash", "refcount"):
+            actual = refs.get(blob_hash, 0)
+            if actual != refcount:
+                ReportBlob.objects.filter(pk=blob_hash).update(refcount=actual)
+                changed += 1
+    return changed
+
+
+def remove_orphan_files(grace_seconds: Optional[int] = None) -> int:
+    """Arquivos no disco sem ReportBlob (put interrompido, registro apagado). Retorna quantos."""
+    grace = BLOB_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    cutoff = timezone.now().timestamp() - grace
+    known = {(h, _EXTENSIONS[c]) for h, c in ReportBlob.objects.values_list("hash", "codec")}
+    removed = 0
+    root = blob_dir()
+    if not root.is_dir():
+        return 0
+    for path in root.glob("*/*"):
+        if not path.is_file() or path.stat().st_mtime > cutoff:
+            continue
+        stem, _, ext = path.name.partition(".")
+        if path.parent.name == "tmp" or (stem, ext) not in known:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+# ---------------------------------------------------------------------
+# Signals (conectados em ReportsConfig.ready)
+# ---------------------------------------------------------------------
+
+def artifact_saved(sender, instance: ReportArtifact, created: bool, **kwargs):
+    if created:
+        incref(instance.blob_id)
+
+
+def artifact_deleted(sender, instance: ReportArtifact, **kwargs):
+    decref(instance.blob_id)
@@ -0,0 +1,208 @@
+# src/reports/cache.py
+"""
+Cache de resultados de relatório endereçado pelo conteúdo.
+
+key = sha256(config normalizado + formato + marca d'água dos dados da source)
+- mesmo relatório/config exportado de novo sem dado novo -> serve o arquivo pronto
+- dado novo (maior data/pk mudou, novo sync de planilha) ou alterado (versão da source,
+  src/reports/versions.py) -> key nova, gera de novo
+- arquivos no blob store (src/reports/blobs.py), registrados em ReportArtifact; keys
+  diferentes com o mesmo arquivo (ex.: marca d'água mudou sem mudar o resultado) dividem o blob
+- LRU por last_used_at até os blobs caberem em REPORTS_CACHE_MAX_BYTES (bytes em disco)
+"""
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Any, Iterator, List, Mapping, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from src.reports import blobs
+from src.reports.engine import compile_report, data_watermark, normalize_config
+from src.reports.export import EXPORTERS, resolve_format
+from src.reports.incremental import incremental_rows, refresh_for, supports_incremental
+from src.reports.parallel import parallel_rows
+from src.reports.planner import statement_timeout
+from src.reports.models import ReportArtifact, ReportBlob
+
+logger = logging.getLogger(__name__)
+
+
+def output_dir() -> Path:
+    return Path(getattr(settings, "REPORTS_OUTPUT_DIR", Path(settings.BASE_DIR) / "var" / "reports"))
+
+
+def content_key(config: Optional[Mapping[str, Any]], tag: str) -> str:
+    """sha256(config normalizado + tag + marca d'água); tag = formato do arquivo."""
+    normalized = normalize_config(config)
+    payload = json.dumps(
+        [normalized, tag, data_watermark(normalized)],
+        sort_keys=True, default=str, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def artifact_key(config: Optional[Mapping[str, Any]], fmt: str) -> str:
+    return content_key(config, resolve_format(fmt))
+
+
+def lookup(key: str) -> Optional[ReportArtifact]:
+    """Artifact pronto para a key (e marca o uso para o LRU), ou None."""
+    artifact = ReportArtifact.objects.select_related("blob").filter(key=key).first()
+    if artifact is None:
+        return None
+    if not blobs.exists(artifact.blob):
+        artifact.delete()
+        return None
+    ReportArtifact.objects.filter(pk=artifact.pk).update(last_used_at=timezone.now(), hits=F("hits") + 1)
+    return artifact
+
+
+class ArtifactWriter:
+    """Grava os pedaços no blob store (comprimindo) e registra o artifact no fim."""
+
+    def __init__(self, key: str, fmt: str):
+        self.key, self.fmt = key, fmt
+        self.blob = blobs.BlobWriter(blobs.codec_for_format(fmt))
+
+    def write(self, chunk: bytes) -> None:
+        self.blob.write(chunk)
+
+    def abort(self) -> None:
+        self.blob.abort()
+
+    def publish(self, rows: int) -> ReportArtifact:
+        blob_hash = self.blob.commit()
+        try:
+            with transaction.atomic():
+                artifact = ReportArtifact.objects.create(
+                    key=self.key, format=self.fmt, blob_id=blob_hash,
+                    rows=rows, size_bytes=self.blob.size,
+                )
+        except IntegrityError:
+            # outro worker gerou a mesma key ao mesmo tempo (arquivo idêntico)
+            artifact = ReportArtifact.objects.get(key=self.key)
+        evict()
+        return artifact
+
+
+def source_rows(config, parallel: bool = False, refresh: bool = True) -> Tuple[List[str], Iterator[tuple]]:
+    """
+    (colunas, linhas) do relatório pelo caminho mais barato disponível.
+    refresh=False: o parcial já foi atualizado (refresh_for) fora da transação corrente.
+    """
+    normalized = normalize_config(config)
+    result = None
+    if supports_incremental(normalized):
+        # source append-only: parciais + só as linhas novas (src/reports/incremental.py)
+        result = incremental_rows(normalized, refresh=refresh)
+    elif parallel:
+        # partições em um pool de processos (src/reports/parallel.py); None -> não particiona
+        result = parallel_rows(normalized)
+    if result is None:
+        compiled = compile_report(normalized)
+        result = compiled.columns, compiled.iter_rows()
+    return result
+
+
+def _rows_and_chunks(config, fmt, parallel: bool = False, tee=None, refresh: bool = True) -> Tuple[list, Iterator[bytes]]:
+    columns, rows_iter = source_rows(config, parallel, refresh=refresh)
+    counter = [0]
+    if tee is not None:
+        tee.start(columns)
+
+    def rows():
+        for row in rows_iter:
+            counter[0] += 1
+            if tee is not None:
+                tee.add(row)
+            yield row
+
+    return counter, EXPORTERS[fmt](columns, rows())
+
+
+def get_or_build(
+    config: Optional[Mapping[str, Any]], fmt: str = "csv", parallel: bool = False, tee=None,
+    timeout_ms: Optional[int] = None,
+) -> Tuple[ReportArtifact, bool]:
+    """
+    (artifact, veio_do_cache). Gera e registra o arquivo se ainda não existir.
+    tee (start/add/publish/abort) recebe as mesmas linhas na mesma passada
+    (ex.: o resultado colunar de src/reports/results.py).
+    timeout_ms: statement_timeout só da leitura das linhas; o registro do blob e
+    do artifact vem depois, fora dessa transação.
+    """
+    fmt = resolve_format(fmt)
+    key = artifact_key(config, fmt)
+    artifact = lookup(key)
+    if artifact is not None:
+        return artifact, True
+
+    # parcial atualizado e commitado antes: a trava dele não fica na transação longa
+    refresh_for(config)
+    writer = ArtifactWriter(key, fmt)
+    try:
+        with statement_timeout(timeout_ms):
+            counter, chunks = _rows_and_chunks(config, fmt, parallel=parallel, tee=tee, refresh=False)
+            for chunk in chunks:
+                writer.write(chunk)
+    except BaseException:
+        writer.abort()
+        if tee is not None:
+            tee.abort()
+        raise
+    artifact = writer.publish(counter[0])
+    if tee is not None:
+        tee.publish()
+    return artifact, False
+
+
+def stream_and_cache(
+    config: Optional[Mapping[str, Any]], fmt: str, key: str, refresh: bool = True,
+) -> Iterator[bytes]:
+    """
+    Gera o relatório em streaming para a resposta HTTP e grava o mesmo conteúdo
+    no cache; só publica se o stream chegar ao fim (cliente desconectou -> descarta).
+    Dentro de uma transação longa: refresh_for antes e refresh=False.
+    """
+    counter, chunks = _rows_and_chunks(config, fmt, refresh=refresh)
+    writer = ArtifactWriter(key, fmt)
+    try:
+        for chunk in chunks:
+            writer.write(chunk)
+            yield chunk
+    except BaseException:
+        writer.abort()
+        raise
+    writer.publish(counter[0])
+
+
+def evict(max_bytes: Optional[int] = None) -> int:
+    """
+    Remove os artifacts menos usados até os blobs deles caberem no orçamento.
+    O arquivo sai do disco quando o blob fica sem referência (blobs.collect).
+    Retorna quantos artifacts removeu.
+    """
+    if max_bytes is None:
+        max_bytes = getattr(settings, "REPORTS_CACHE_MAX_BYTES", 2 * 1024 ** 3)
+    in_use = ReportBlob.objects.filter(pk__in=ReportArtifact.objects.values("blob"))
+    total = in_use.aggregate(total=Sum("stored_bytes"))["total"] or 0
+    removed = 0
+    if total <= max_bytes:
+        return 0
+    for artifact in ReportArtifact.objects.select_related("blob").order_by("last_used_at").iterator():
+        if total <= max_bytes:
+            break
+        artifact.delete()
+        removed += 1
+        # o mesmo blob pode continuar em uso por outro artifact/config
+        if not ReportBlob.objects.filter(pk=artifact.blob_id, refcount__gt=0).exists():
+            total -= artifact.blob.stored_bytes
+    if removed:
+        logger.info("Cache de relatórios: %d artifact(s) removido(s) (LRU)", removed)
+        blobs.collect()
+    return removed
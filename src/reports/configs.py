@@ -0,0 +1,145 @@
+# src/reports/configs.py
+"""
+Configs de relatório deduplicados no banco (ReportConfigBlob).
+
+- Report.config é uma propriedade: o JSON canônico (chaves ordenadas, sem espaços)
+  vai comprimido (zstd, ou gzip sem o pacote zstandard) para ReportConfigBlob,
+  endereçado pelo sha256; Report.config_blob aponta para ele
+- no banco, não no disco: entra no backup e é visto por todos os nós (o blob store
+  de arquivos, src/reports/blobs.py, fica só com o que pode ser gerado de novo)
+- configs iguais (ex.: duplicate_reports no admin) dividem a mesma linha; refcount =
+  Reports que apontam para ela, ajustado pelos signals (conectados em ReportsConfig.ready)
+- refcount 0 só é apagado CONFIG_GRACE_SECONDS depois do último put (collect): um
+  Report ainda sem commit que acabou de apontar para o config não perde a linha
+- listagem com config: select_related("config_blob") evita uma query por relatório
+"""
+import gzip
+import hashlib
+import json
+from datetime import timedelta
+from typing import Any, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from src.reports.blobs import HAS_ZSTD, default_codec, zstd
+from src.reports.models import Report, ReportConfigBlob
+
+CONFIG_GRACE_SECONDS = 10 * 60
+
+
+def canonical_json(value: Any) -> bytes:
+    """Mesmo conteúdo JSON -> mesmos bytes (chaves ordenadas, sem espaços)."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def config_hash(value: Any) -> str:
+    return hashlib.sha256(canonical_json(value)).hexdigest()
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstd.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if not HAS_ZSTD:
+            raise RuntimeError("Report config is zstd-compressed; install the zstandard package.")
+        return zstd.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def put_config(value: Any) -> str:
+    """Grava o config (se ainda não existe) e devolve o hash."""
+    data = canonical_json(value)
+    blob_hash = hashlib.sha256(data).hexdigest()
+    # marca o uso: collect não apaga um config recém-apontado
+    if ReportConfigBlob.objects.filter(pk=blob_hash).update(updated_at=timezone.now()):
+        return blob_hash
+    codec = default_codec()
+    try:
+        with transaction.atomic():
+            ReportConfigBlob.objects.create(
+                hash=blob_hash, codec=codec, data=_compress(data, codec), size_bytes=len(data),
+            )
+    except IntegrityError:
+        # outro processo gravou o mesmo config ao mesmo tempo
+        ReportConfigBlob.objects.filter(pk=blob_hash).update(updated_at=timezone.now())
+    return blob_hash
+
+
+def decode(blob: Optional[ReportConfigBlob]) -> Any:
+    if blob is None:
+        return None
+    return json.loads(_decompress(bytes(blob.data), blob.codec))
+
+
+def get_config(blob_hash: Optional[str]) -> Any:
+    if not blob_hash:
+        return None
+    return decode(ReportConfigBlob.objects.get(pk=blob_hash))
+
+
+def incref(blob_hash: Optional[str], n: int = 1) -> None:
+    if blob_hash and n:
+        ReportConfigBlob.objects.filter(pk=blob_hash).update(refcount=F("refcount") + n)
+
+
+def decref(blob_hash: Optional[str], n: int = 1) -> None:
+    incref(blob_hash, -n)
+
+
+def collect(grace_seconds: Optional[int] = None) -> int:
+    """Apaga configs sem referência parados há mais que a carência. Retorna quantos."""
+    grace = CONFIG_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    cutoff = timezone.now() - timedelta(seconds=grace)
+    return (
+        ReportConfigBlob.objects
+        .filter(refcount__lte=0, updated_at__lt=cutoff)
+        # refcount fora de sincronia não apaga config em uso
+        .exclude(pk__in=Report.objects.filter(config_blob__isnull=False).values("config_blob"))
+        .delete()[0]
+    )
+
+
+def rebuild_refcounts() -> int:
+    """Recalcula refcount a partir de Report. Retorna quantos configs mudaram."""
+    refs = dict(
+        Report.objects.filter(config_blob__isnull=False).order_by()
+        .values("config_blob").annotate(n=Count("pk")).values_list("config_blob", "n")
+    )
+    changed = 0
+    with transaction.atomic():
+        for blob_hash, refcount in ReportConfigBlob.objects.select_for_update().values_list("hash", "refcount"):
+            actual = refs.get(blob_hash, 0)
+            if actual != refcount:
+                ReportConfigBlob.objects.filter(pk=blob_hash).update(refcount=actual)
+                changed += 1
+    return changed
+
+
+# ---------------------------------------------------------------------
+# Signals (conectados em ReportsConfig.ready)
+# ---------------------------------------------------------------------
+
+def report_saved(sender, instance: Report, created: bool, **kwargs):
+    new = instance.__dict__.get("config_blob_id")
+    if created:
+        incref(new)
+    elif "_loaded_config_hash" in instance.__dict__:
+        old = instance._loaded_config_hash
+        if old != new:
+            incref(new)
+            decref(old)
+    else:
+        # config_blob não foi carregado (only/defer): o save não o alterou
+        return
+    instance._loaded_config_hash = new
+
+
+def report_deleted(sender, instance: Report, **kwargs):
+    # pre_delete: a linha ainda existe, config_blob adiado é carregado aqui
+    decref(instance.config_blob_id)
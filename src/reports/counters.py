@@ -0,0 +1,117 @@
+# src/reports/counters.py
+"""
+Contadores de relatórios por (status, type) em ReportStatusCounter.
+
+- create/save/delete de Report: signals ajustam os contadores na mesma transação do
+  write; o pre_save/pre_delete trava a linha e lê (status, type) do banco, então o
+  delta sai do que está gravado mesmo se um set_status concorrente mudou o status
+  depois que a instância foi carregada (ex.: PATCH)
+- updates em lote (ações do admin, worker, scheduler): use set_status(), que trava
+  as linhas, atualiza e ajusta os contadores de uma vez
+- rebuild_counters() recalcula tudo a partir da tabela (reconciliação/migração)
+"""
+from collections import Counter
+from typing import Dict, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from src.reports.models import Report, ReportStatusCounter
+
+
+def _bump(status: str, rtype: str, delta: int) -> None:
+    if not delta:
+        return
+    updated = ReportStatusCounter.objects.filter(status=status, type=rtype).update(count=F("count") + delta)
+    if not updated:
+        try:
+            with transaction.atomic():
+                ReportStatusCounter.objects.create(status=status, type=rtype, count=delta)
+        except IntegrityError:
+            ReportStatusCounter.objects.filter(status=status, type=rtype).update(count=F("count") + delta)
+
+
+def apply_deltas(deltas: Dict[Tuple[str, str], int]) -> None:
+    # ordem fixa das chaves: transações concorrentes travam os contadores na mesma ordem
+    for (status, rtype), delta in sorted(deltas.items()):
+        _bump(status, rtype, delta)
+
+
+def set_status(queryset, new_status: str, **extra) -> int:
+    """queryset.update(status=new_status, ...) mantendo os contadores. Retorna o nº de linhas."""
+    with transaction.atomic():
+        rows = list(queryset.select_for_update().order_by().values_list("pk", "status", "type"))
+        if not rows:
+            return 0
+        extra.setdefault("updated_at", timezone.now())
+        updated = Report.objects.filter(pk__in=[pk for pk, _, _ in rows]).update(status=new_status, **extra)
+        deltas = Counter()
+        for _, old_status, rtype in rows:
+            if old_status != new_status:
+                deltas[(old_status, rtype)] -= 1
+                deltas[(new_status, rtype)] += 1
+        apply_deltas(deltas)
+    return updated
+
+
+def totals_by_status() -> Dict[str, int]:
+    """Totais por status (todos os types), direto dos contadores."""
+    out = Counter()
+    for status, count in ReportStatusCounter.objects.values_list("status", "count"):
+        out[status] += count
+    return dict(out)
+
+
+def rebuild_counters() -> int:
+    """Recalcula os contadores a partir de Report. Retorna quantas combinações existem."""
+    with transaction.atomic():
+        ReportStatusCounter.objects.all().delete()
+        rows = (
+            Report.objects.order_by()
+            .values("status", "type")
+            .annotate(n=Count("pk"))
+        )
+        objs = [ReportStatusCounter(status=r["status"], type=r["type"], count=r["n"]) for r in rows]
+        ReportStatusCounter.objects.bulk_create(objs)
+    return len(objs)
+
+
+# ---------------------------------------------------------------------
+# Signals (conectados em ReportsConfig.ready)
+# ---------------------------------------------------------------------
+
+def _lock_status_type(instance: Report):
+    # FOR UPDATE até o fim da transação do write (Report.save e o delete são atomic)
+    return Report.objects.select_for_update().filter(pk=instance.pk).values_list("status", "type").first()
+
+
+def report_pre_save(sender, instance: Report, raw: bool = False, **kwargs):
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._db_status_type = _lock_status_type(instance)
+
+
+def report_saved(sender, instance: Report, created: bool, update_fields=None, **kwargs):
+    old = instance.__dict__.pop("_db_status_type", None)
+    new = (instance.status, instance.type)
+    if created:
+        _bump(*new, 1)
+    elif old is not None:
+        if update_fields is not None:
+            # campo fora do update_fields: fica o valor do banco
+            new = (
+                new[0] if "status" in update_fields else old[0],
+                new[1] if "type" in update_fields else old[1],
+            )
+        if old != new:
+            apply_deltas({old: -1, new: 1})
+
+
+def report_pre_delete(sender, instance: Report, **kwargs):
+    instance._db_status_type = _lock_status_type(instance)
+
+
+def report_deleted(sender, instance: Report, **kwargs):
+    old = instance.__dict__.pop("_db_status_type", None) or (instance.status, instance.type)
+    _bump(*old, -1)
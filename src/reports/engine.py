@@ -0,0 +1,464 @@
+# src/reports/engine.py
+"""
+Motor de relatórios: Report.config -> uma query agregada no ORM.
+
+Formato do config (tudo opcional exceto "source"):
+    {
+      "source": "form_submissions",              # ver _SOURCE_FACTORIES
+      "dimensions": ["formType", "date:month"],  # GROUP BY (date:<day|week|month|quarter|year>)
+      "measures": ["count", "count_distinct:email"],
+      "filters": {"formType": "referral", "state": ["FL", "TX"]},   # escalar -> =, lista de escalares -> __in
+      "date_range": {"from": "2025-01-01", "to": "2025-03-31"} | {"last_days": 30},  # dias inteiros
+      "limit": 1000
+    }
+
+Só campos da whitelist de cada source são aceitos (nada do config vira SQL cru).
+As linhas saem por .iterator() (cursor server-side no Postgres): memória constante
+independente do tamanho do export.
+"""
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Set, Tuple
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Count, F, Max, Q, QuerySet, Value
+from django.db.models.functions import Mod, TruncDay, TruncMonth, TruncQuarter, TruncWeek, TruncYear
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from src.activity.models import ActivityLog
+from src.forms.models import FormSubmission
+from src.reports.models import ReportSourceVersion
+from src.sheets.models import SheetData, SheetSyncState
+
+STREAM_CHUNK_SIZE = 2000
+MAX_LIMIT = 1_000_000
+
+DATE_TRUNCS = {
+    "day": TruncDay,
+    "week": TruncWeek,
+    "month": TruncMonth,
+    "quarter": TruncQuarter,
+    "year": TruncYear,
+}
+
+
+class ReportConfigError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Source:
+    model: Any
+    date_field: str
+    # nome no config -> caminho no ORM
+    dimensions: Mapping[str, str]
+    # campos aceitos em count_distinct:<campo>
+    distinct_fields: Mapping[str, str]
+    # campos aceitos em filters (mesmos nomes das dimensões)
+    filters: Mapping[str, str]
+    # marca d'água extra (além de max(date_field)/max(pk)), ver data_watermark
+    watermark: Optional[Callable[[], Any]] = None
+    # linhas novas chegam por INSERT com pk crescente: permite refresh incremental
+    # (src/reports/incremental.py; UPDATE/DELETE invalidam os parciais)
+    append_only: bool = False
+
+
+def _user_source():
+    dims = {
+        "company": "profile__company__name",
+        "user_type": "profile__user_type__user_type",
+        "user_role": "profile__user_role__user_role",
+        "is_active": "is_active",
+        "is_staff": "is_staff",
+    }
+    return Source(
+        model=get_user_model(),
+        date_field="date_joined",
+        dimensions=dims,
+        distinct_fields={"email": "email", "company": "profile__company_id"},
+        filters=dims,
+    )
+
+
+def _form_submission_source():
+    dims = {
+        "company": "company__name",
+        "formType": "formType",
+        "coverageType": "coverageType",
+        "insuranceCoverage": "insuranceCoverage",
+        "householdIncome": "householdIncome",
+        "state": "state",
+        "city": "city",
+        "zipCode": "zipCode",
+    }
+    return Source(
+        model=FormSubmission,
+        date_field="created_at",
+        dimensions=dims,
+        distinct_fields={"email": "email", "phone": "phone", "profile": "profile_id", "company": "company_id"},
+        filters=dims,
+        append_only=True,
+    )
+
+
+def _sheet_sync_watermark():
+    return SheetSyncState.objects.aggregate(last=Max("synced_at"))["last"]
+
+
+def _sheet_data_source():
+    dims = {
+        "company": "company__name",
+        "formType": "formType",
+        "coverageType": "coverageType",
+        "insuranceCoverage": "insuranceCoverage",
+        "householdIncome": "householdIncome",
+        "state": "state",
+        "city": "city",
+        "zipCode": "zipCode",
+    }
+    return Source(
+        model=SheetData,
+        date_field="datetime",
+        dimensions=dims,
+        distinct_fields={"email": "email", "phone": "phone", "company": "company_id"},
+        filters=dims,
+        # o sync de planilha atualiza linhas existentes sem mexer em datetime/pk
+        watermark=_sheet_sync_watermark,
+    )
+
+
+def _activity_source():
+    dims = {
+        "action": "action",
+        "company": "company__name",
+        "actor": "actor__username",
+        "target_user": "target_user__username",
+    }
+    return Source(
+        model=ActivityLog,
+        date_field="created_at",
+        dimensions=dims,
+        distinct_fields={"actor": "actor_id", "target_user": "target_user_id", "company": "company_id"},
+        filters=dims,
+        append_only=True,
+    )
+
+
+_SOURCE_FACTORIES = {
+    "users": _user_source,
+    "form_submissions": _form_submission_source,
+    "sheet_data": _sheet_data_source,
+    "activity": _activity_source,
+}
+# apelidos aceitos no config (nomes usados pelo builder do front)
+SOURCE_ALIASES = {
+    "user": "users", "profiles": "users", "profile": "users",
+    "forms": "form_submissions", "formsubmission": "form_submissions", "leads": "form_submissions",
+    "sheets": "sheet_data", "sheetdata": "sheet_data",
+    "activitylog": "activity", "activity_log": "activity",
+}
+
+
+def append_only_sources() -> Dict[str, Source]:
+    """Sources com refresh incremental, por nome."""
+    sources = {key: factory() for key, factory in _SOURCE_FACTORIES.items()}
+    return {key: source for key, source in sources.items() if source.append_only}
+
+
+def source_keys() -> List[str]:
+    return list(_SOURCE_FACTORIES)
+
+
+def source_fields(source: Source, distinct: bool = True) -> Dict[Any, Set[str]]:
+    """
+    model -> campos (name e attname) que a source lê: data, dimensões, filtros e,
+    com distinct, os de count_distinct; inclusive nos models ligados (ex.: Company.name).
+    """
+    paths = {*source.dimensions.values(), *source.filters.values()}
+    if distinct:
+        paths.update(source.distinct_fields.values())
+    by_model = {source.model: {source.date_field}}
+    for path in paths:
+        model = source.model
+        for name in path.split("__"):
+            field = model._meta.get_field(name)
+            by_model.setdefault(model, set()).update({field.name, getattr(field, "attname", field.name)})
+            if not field.is_relation:
+                break
+            model = field.related_model
+    return by_model
+
+
+def get_source(name: str) -> Source:
+    key = (name or "").strip().lower()
+    key = SOURCE_ALIASES.get(key, key)
+    factory = _SOURCE_FACTORIES.get(key)
+    if factory is None:
+        raise ReportConfigError(f"Unknown report source '{name}'. Use one of: {', '.join(_SOURCE_FACTORIES)}.")
+    return factory()
+
+
+@dataclass
+class CompiledReport:
+    columns: List[str]
+    queryset: QuerySet
+    # sem dimensões: uma linha só via aggregate(), não um GROUP BY
+    aggregates: Optional[Dict[str, Any]] = None
+
+    def iter_rows(self, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[tuple]:
+        if self.aggregates is not None:
+            result = self.queryset.aggregate(**self.aggregates)
+            yield tuple(result[k] for k in self.aggregates)
+            return
+        yield from self.queryset.iterator(chunk_size=chunk_size)
+
+    def as_queryset(self) -> QuerySet:
+        """values_list com as mesmas linhas de iter_rows (para EXPLAIN/SQL cru)."""
+        if self.aggregates is None:
+            return self.queryset
+        # mesma query do aggregate(): Value constante não entra no GROUP BY
+        return (
+            self.queryset.annotate(_all=Value(1)).values("_all")
+            .annotate(**self.aggregates).values_list(*self.aggregates)
+        )
+
+
+def _parse_dimension(source: Source, dim: str) -> Tuple[str, Any]:
+    """'formType' -> ('formType', 'formType'); 'date:month' -> ('date_month', TruncMonth(...))."""
+    if not isinstance(dim, str):
+        raise ReportConfigError("Dimensions must be strings.")
+    if dim == "date" or dim.startswith("date:"):
+        _, _, grain = dim.partition(":")
+        trunc = DATE_TRUNCS.get(grain or "day")
+        if trunc is None:
+            raise ReportConfigError(f"Invalid date granularity '{grain}'. Use one of: {', '.join(DATE_TRUNCS)}.")
+        return f"date_{grain or 'day'}", trunc(source.date_field)
+    path = source.dimensions.get(dim)
+    if path is None:
+        raise ReportConfigError(f"Unknown dimension '{dim}'.")
+    return dim, path
+
+
+def _parse_measure(source: Source, measure: str) -> Tuple[str, Any]:
+    if measure == "count":
+        return "count", Count("pk")
+    kind, _, field = (measure or "").partition(":")
+    if kind == "count_distinct" and field in source.distinct_fields:
+        return f"distinct_{field}", Count(source.distinct_fields[field], distinct=True)
+    raise ReportConfigError(f"Unknown measure '{measure}'.")
+
+
+def _iso_date(value: Any, label: str) -> str:
+    d = parse_date(str(value or ""))
+    if not d:
+        raise ReportConfigError(f"Invalid date_range.{label} (use YYYY-MM-DD).")
+    return d.isoformat()
+
+
+def _normalize_date_range(date_range: Any) -> Dict[str, Optional[str]]:
+    """{"from": "YYYY-MM-DD"|None, "to": ...}; last_days vira datas absolutas (dia local)."""
+    if not date_range:
+        return {"from": None, "to": None}
+    if not isinstance(date_range, Mapping):
+        raise ReportConfigError("date_range must be an object.")
+    if date_range.get("last_days") is not None:
+        try:
+            days = int(date_range["last_days"])
+        except (TypeError, ValueError):
+            raise ReportConfigError("date_range.last_days must be an integer.")
+        return {"from": (timezone.localdate() - timedelta(days=days)).isoformat(), "to": None}
+    return {
+        "from": _iso_date(date_range["from"], "from") if date_range.get("from") else None,
+        "to": _iso_date(date_range["to"], "to") if date_range.get("to") else None,
+    }
+
+
+_SCALAR_TYPES = (str, int, float, bool)
+
+
+def _filter_field(source: Source, path: str):
+    """Campo do model no fim do caminho do filtro (None se não der para resolver)."""
+    model = source.model
+    *relations, last = path.split("__")
+    try:
+        for name in relations:
+            model = model._meta.get_field(name).related_model
+        return model._meta.get_field(last)
+    except (FieldDoesNotExist, AttributeError):
+        return None
+
+
+def _check_filter_value(source: Source, name: str, value: Any) -> None:
+    """Escalar (lookup exato, None = IS NULL) ou lista de escalares (__in); o tipo tem que servir ao campo."""
+    if isinstance(value, (list, tuple)):
+        values = list(value)
+        if any(v is None or not isinstance(v, _SCALAR_TYPES) for v in values):
+            raise ReportConfigError(f"Filter '{name}' list must contain only strings or numbers.")
+    elif value is None or isinstance(value, _SCALAR_TYPES):
+        values = [] if value is None else [value]
+    else:
+        raise ReportConfigError(f"Filter '{name}' must be a string, number, boolean or a list of them.")
+
+    field = _filter_field(source, source.filters[name])
+    if field is None:
+        return
+    for v in values:
+        try:
+            field.get_prep_value(field.to_python(v))
+        except (ValidationError, TypeError, ValueError):
+            raise ReportConfigError(f"Invalid value {v!r} for filter '{name}'.")
+
+
+def _day_start(iso: str) -> datetime:
+    return timezone.make_aware(datetime.combine(parse_date(iso), time.min))
+
+
+def normalize_config(config: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+    """
+    Valida o config e devolve a forma canônica (source sem apelido, medidas padrão,
+    filtros ordenados, datas absolutas). Dois configs equivalentes -> mesmo dict.
+    """
+    if not isinstance(config, Mapping) or not config.get("source"):
+        raise ReportConfigError("Report config must define a 'source'.")
+    source_key = (config["source"] or "").strip().lower()
+    source_key = SOURCE_ALIASES.get(source_key, source_key)
+    source = get_source(source_key)
+
+    dimensions = list(config.get("dimensions") or [])
+    measures = list(config.get("measures") or ["count"])
+    for d in dimensions:
+        _parse_dimension(source, d)
+    for m in measures:
+        _parse_measure(source, m)
+
+    filters = config.get("filters") or {}
+    if not isinstance(filters, Mapping):
+        raise ReportConfigError("filters must be an object.")
+    norm_filters = {}
+    for name in sorted(filters):
+        if name not in source.filters:
+            raise ReportConfigError(f"Unknown filter '{name}'.")
+        value = filters[name]
+        _check_filter_value(source, name, value)
+        if isinstance(value, (list, tuple)):
+            value = sorted(value, key=str)
+        norm_filters[name] = value
+
+    limit = config.get("limit")
+    if limit:
+        try:
+            limit = max(1, min(int(limit), MAX_LIMIT))
+        except (TypeError, ValueError):
+            raise ReportConfigError("limit must be an integer.")
+    else:
+        limit = None
+
+    return {
+        "source": source_key,
+        "dimensions": dimensions,
+        "measures": measures,
+        "filters": norm_filters,
+        "date_range": _normalize_date_range(config.get("date_range")),
+        "limit": limit,
+    }
+
+
+def compile_report(
+    config: Optional[Mapping[str, Any]],
+    *,
+    pk_gt: Optional[int] = None,
+    pk_lte: Optional[int] = None,
+    apply_limit: bool = True,
+    sample_every: Optional[int] = None,
+    where: Optional[Q] = None,
+) -> CompiledReport:
+    """
+    pk_gt/pk_lte restringem a uma faixa de pk (usado pelo refresh incremental);
+    sample_every=k fica só com pk % k == 0 (amostra do preview fora do Postgres);
+    where é uma restrição extra (partição da execução paralela).
+    """
+    config = normalize_config(config)
+    source = get_source(config["source"])
+    dims = [_parse_dimension(source, d) for d in config["dimensions"]]
+    measures = [_parse_measure(source, m) for m in config["measures"]]
+
+    columns = [name for name, _ in dims] + [name for name, _ in measures]
+    if len(set(columns)) != len(columns):
+        raise ReportConfigError("Duplicate dimension/measure in config.")
+
+    qs = source.model._default_manager.all()
+    for name, value in config["filters"].items():
+        path = source.filters[name]
+        if isinstance(value, list):
+            qs = qs.filter(**{f"{path}__in": value})
+        else:
+            qs = qs.filter(**{path: value})
+
+    # intervalo sobre a coluna (>= início, < fim), sem __date: usa o índice
+    date_range = config["date_range"]
+    if date_range["from"]:
+        qs = qs.filter(**{f"{source.date_field}__gte": _day_start(date_range["from"])})
+    if date_range["to"]:
+        qs = qs.filter(**{f"{source.date_field}__lt": _day_start(date_range["to"]) + timedelta(days=1)})
+    if pk_gt is not None:
+        qs = qs.filter(pk__gt=pk_gt)
+    if pk_lte is not None:
+        qs = qs.filter(pk__lte=pk_lte)
+    if sample_every and sample_every > 1:
+        qs = qs.alias(_sample=Mod("pk", sample_every)).filter(_sample=0)
+    if where is not None:
+        qs = qs.filter(where)
+
+    # aliases internos (d0, m0...) evitam conflito com nomes de campos do model
+    measure_exprs = {f"m{i}": expr for i, (_, expr) in enumerate(measures)}
+    if not dims:
+        return CompiledReport(columns=columns, queryset=qs.order_by(), aggregates=measure_exprs)
+
+    dim_exprs = {f"d{i}": (F(expr) if isinstance(expr, str) else expr) for i, (_, expr) in enumerate(dims)}
+    qs = (
+        qs.order_by()
+        .values(**dim_exprs)
+        .annotate(**measure_exprs)
+        .order_by(*[F(n).asc(nulls_last=True) for n in dim_exprs])  # NULL por último em qualquer banco
+        .values_list(*dim_exprs, *measure_exprs)
+    )
+    if apply_limit and config["limit"]:
+        qs = qs[:config["limit"]]
+    return CompiledReport(columns=columns, queryset=qs)
+
+
+def _leads_an_index(model, field_name: str) -> bool:
+    """MAX(coluna) sai do índice (sem varrer a tabela)?"""
+    field = model._meta.get_field(field_name)
+    if field.primary_key or field.unique or field.db_index:
+        return True
+    return any(index.fields and index.fields[0] == field_name for index in model._meta.indexes)
+
+
+def data_watermark(config: Mapping[str, Any]) -> List[Any]:
+    """
+    Marca d'água dos dados da source (config normalizado): maior pk da tabela, maior
+    data quando a coluna é indexada (senão seria um scan completo; ex.: User.date_joined)
+    + marcas extras (ex.: último sync de planilha) + versão da source, que sobe a cada
+    UPDATE/DELETE nos campos lidos por ela (src/reports/versions.py). Mudou -> resultado
+    em cache expira.
+    """
+    source = get_source(config["source"])
+    aggregates = {"last_pk": Max("pk")}
+    if _leads_an_index(source.model, source.date_field):
+        aggregates["last_date"] = Max(source.date_field)
+    agg = source.model._default_manager.order_by().aggregate(**aggregates)
+    marks = [agg.get("last_date"), agg["last_pk"]]
+    if source.watermark is not None:
+        marks.append(source.watermark())
+    version = ReportSourceVersion.objects.filter(source=config["source"]).values_list("version", flat=True).first()
+    marks.append(version or 0)
+    return marks
+
+
+def iter_report_rows(config: Optional[Mapping[str, Any]], chunk_size: int = STREAM_CHUNK_SIZE) -> Tuple[List[str], Iterator[tuple]]:
+    """(colunas, gerador de linhas) para um Report.config."""
+    compiled = compile_report(config)
+    return compiled.columns, compiled.iter_rows(chunk_size)
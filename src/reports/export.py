@@ -0,0 +1,247 @@
+# src/reports/export.py
+"""
+Serialização das linhas do motor de relatórios (src/reports/engine.py) em streaming.
+Cada função recebe (colunas, iterador de linhas) e devolve um gerador de bytes,
+próprio para StreamingHttpResponse (chunked) ou para gravar em arquivo.
+
+Formatos: csv, csv.gz, jsonl, xlsx (openpyxl write_only), arrow (IPC stream) e
+parquet (pyarrow). xlsx/arrow/parquet dependem de pacotes opcionais.
+"""
+import csv
+import io
+import json
+import tempfile
+import zlib
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List
+
+from django.utils import timezone
+
+from src.reports.engine import ReportConfigError
+
+try:
+    from openpyxl import Workbook  # opcional: só para .xlsx
+    HAS_OPENPYXL = True
+except Exception:
+    HAS_OPENPYXL = False
+    Workbook = None
+
+try:
+    import pyarrow as pa  # opcional: arrow/parquet
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except Exception:
+    HAS_PYARROW = False
+    pa = pq = None
+
+CSV_BLOCK_ROWS = 1000
+ARROW_BATCH_ROWS = 10_000
+SPOOL_CHUNK_BYTES = 1 << 16
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def _csv_text(columns: List[str], rows: Iterable[tuple], block_rows: int) -> Iterator[str]:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(columns)
+    pending = 0
+    for row in rows:
+        writer.writerow([_cell(v) for v in row])
+        pending += 1
+        if pending >= block_rows:
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+            pending = 0
+    yield out.getvalue()
+
+
+def iter_csv(columns: List[str], rows: Iterable[tuple], block_rows: int = CSV_BLOCK_ROWS) -> Iterator[bytes]:
+    """Header + linhas em CSV, em blocos de block_rows linhas."""
+    for text in _csv_text(columns, rows, block_rows):
+        yield text.encode("utf-8")
+
+
+def iter_csv_gz(columns: List[str], rows: Iterable[tuple]) -> Iterator[bytes]:
+    """CSV comprimido (gzip) incrementalmente, bloco a bloco."""
+    gz = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> container gzip
+    for text in _csv_text(columns, rows, CSV_BLOCK_ROWS):
+        data = gz.compress(text.encode("utf-8"))
+        if data:
+            yield data
+    yield gz.flush()
+
+
+def _json_default(value):
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def iter_jsonl(columns: List[str], rows: Iterable[tuple], block_rows: int = CSV_BLOCK_ROWS) -> Iterator[bytes]:
+    """Um objeto JSON por linha ({coluna: valor})."""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, row)), default=_json_default, separators=(",", ":")))
+        if len(lines) >= block_rows:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _xlsx_cell(value):
+    # Excel não guarda fuso: datetimes vão no horário local, sem tzinfo
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        return timezone.make_naive(value)
+    return value
+
+
+def _drain_file(fh) -> Iterator[bytes]:
+    fh.seek(0)
+    while True:
+        data = fh.read(SPOOL_CHUNK_BYTES)
+        if not data:
+            break
+        yield data
+
+
+def iter_xlsx(columns: List[str], rows: Iterable[tuple]) -> Iterator[bytes]:
+    """
+    Planilha via openpyxl write_only (linhas vão para disco, não para a memória).
+    O zip do xlsx só fica pronto no save(); o arquivo temporário é então enviado em pedaços.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Report")
+    ws.append(columns)
+    for row in rows:
+        ws.append([_xlsx_cell(v) for v in row])
+    with tempfile.TemporaryFile() as fh:
+        wb.save(fh)
+        yield from _drain_file(fh)
+
+
+class ChunkSink(io.RawIOBase):
+    """File-like de escrita que acumula bytes até serem drenados (para o pyarrow)."""
+
+    def __init__(self):
+        self._chunks = []
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def drain(self) -> bytes:
+        out, self._chunks = b"".join(self._chunks), []
+        return out
+
+
+def arrow_batch(columns: List[str], chunk: List[tuple], schema=None):
+    """
+    Lote de linhas -> (schema, RecordBatch). Sem schema, infere do lote
+    (coluna só com null -> string); com schema, converte para ele.
+    """
+    arrays = [list(col) for col in zip(*chunk)] or [[] for _ in columns]
+    if schema is None:
+        inferred = pa.RecordBatch.from_arrays([pa.array(a) for a in arrays], names=columns).schema
+        schema = pa.schema([
+            pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in inferred
+        ])
+    return schema, pa.RecordBatch.from_arrays(
+        [pa.array(a, type=f.type) for a, f in zip(arrays, schema)], schema=schema,
+    )
+
+
+def _arrow_batches(columns: List[str], rows: Iterable[tuple]):
+    """Linhas -> RecordBatches; schema inferido do primeiro lote."""
+    rows = iter(rows)
+    schema = None
+    while True:
+        chunk = list(islice(rows, ARROW_BATCH_ROWS))
+        if not chunk and schema is not None:
+            return
+        schema, batch = arrow_batch(columns, chunk, schema)
+        yield schema, batch
+        if not chunk:
+            return
+
+
+def iter_arrow(columns: List[str], rows: Iterable[tuple]) -> Iterator[bytes]:
+    """Arrow IPC (streaming format), um RecordBatch a cada ARROW_BATCH_ROWS linhas."""
+    sink = ChunkSink()
+    writer = None
+    for schema, batch in _arrow_batches(columns, rows):
+        if writer is None:
+            writer = pa.ipc.new_stream(sink, schema)
+        if batch.num_rows:
+            writer.write_batch(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def iter_parquet(columns: List[str], rows: Iterable[tuple]) -> Iterator[bytes]:
+    """Parquet com um row group a cada ARROW_BATCH_ROWS linhas."""
+    sink = ChunkSink()
+    writer = None
+    for schema, batch in _arrow_batches(columns, rows):
+        if writer is None:
+            writer = pq.ParquetWriter(sink, schema, compression="snappy")
+        if batch.num_rows:
+            writer.write_batch(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+# formato -> serializador / content-type (só os formatos com dependências instaladas)
+EXPORTERS: Dict[str, Callable[[List[str], Iterable[tuple]], Iterator[bytes]]] = {
+    "csv": iter_csv,
+    "csv.gz": iter_csv_gz,
+    "jsonl": iter_jsonl,
+}
+if HAS_OPENPYXL:
+    EXPORTERS["xlsx"] = iter_xlsx
+if HAS_PYARROW:
+    EXPORTERS["arrow"] = iter_arrow
+    EXPORTERS["parquet"] = iter_parquet
+
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "csv.gz": "application/gzip",
+    "jsonl": "application/x-ndjson",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+FORMAT_ALIASES = {
+    "gz": "csv.gz", "csv_gz": "csv.gz", "csvgz": "csv.gz",
+    "ndjson": "jsonl", "json": "jsonl",
+    "excel": "xlsx",
+    "ipc": "arrow", "arrows": "arrow",
+    "pq": "parquet",
+}
+
+
+def resolve_format(fmt: str) -> str:
+    """Nome canônico do formato (aceita apelidos); ReportConfigError se indisponível."""
+    key = (fmt or "csv").strip().lower()
+    key = FORMAT_ALIASES.get(key, key)
+    if key not in EXPORTERS:
+        raise ReportConfigError(f"Unsupported format '{fmt}'. Use one of: {', '.join(EXPORTERS)}.")
+    return key
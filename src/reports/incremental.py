@@ -0,0 +1,297 @@
+# src/reports/incremental.py
+"""
+Refresh incremental de relatórios sobre sources cujas linhas novas chegam por
+INSERT com pk crescente (form_submissions, activity).
+
+- ReportPartial guarda, por config normalizado SEM date_range, os agregados de
+  todas as linhas com pk <= high_water_id, agrupados também por dia (date:day);
+  o date_range (inclusive last_days) é aplicado na leitura, sobre o dia: a chave
+  não muda de um dia para o outro e configs que só diferem nas datas dividem o parcial
+- refresh: agrega só a faixa (high_water_id, novo_hwm], soma nos parciais e avança
+  o hwm na mesma transação; o custo é o dos dados novos, não o do histórico. Roda
+  numa transação curta própria antes da query do export (refresh_for); a leitura
+  dentro do statement_timeout não trava o parcial
+- hwm só por pk (nenhuma data das linhas entra): cada refresh anota o max(pk) visto
+  (pending_hwm/pending_at) e o hwm só avança até um valor anotado há mais de
+  REPORTS_INCREMENTAL_LAG_SECONDS; INSERTs de transações abertas naquele momento
+  (pk menor, commit depois) já commitaram. Acima do hwm, agregado na hora
+- UPDATE/DELETE em campos usados pelas dimensões/filtros/data (inclusive nos models
+  ligados, ex.: Company.name) apagam os parciais da source: signals ligados em
+  apps.ready; quem grava com .update()/bulk_update chama invalidate_for_update
+- só "count" é somável; count_distinct e sources sem append_only usam o caminho completo
+- as linhas saem com os mesmos tipos do engine (datas como datetime no fuso atual)
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta
+from functools import lru_cache, partial as bind
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from src.reports.engine import (
+    _day_start, append_only_sources, compile_report, get_source, normalize_config, source_fields,
+)
+from src.reports.models import ReportPartial
+from src.reports.versions import bump_for_update
+
+MERGEABLE_MEASURES = {"count"}
+# dimensões que já são o dia (TruncDay); sem nenhuma, o parcial acrescenta "date:day"
+DAY_DIMENSIONS = ("date:day", "date")
+STALE_PARTIAL_DAYS = 30
+
+
+def supports_incremental(config: Mapping[str, Any]) -> bool:
+    """config normalizado -> pode usar parciais?"""
+    return get_source(config["source"]).append_only and set(config["measures"]) <= MERGEABLE_MEASURES
+
+
+def config_hash(config: Mapping[str, Any]) -> str:
+    payload = json.dumps({**config, "limit": None}, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def partial_config(config: Mapping[str, Any]) -> Tuple[Dict[str, Any], int, bool]:
+    """
+    Config que o parcial agrega: sem date_range/limit e com o dia entre as dimensões.
+    Retorna (config, posição do dia, dia foi acrescentado?).
+    """
+    dims = list(config["dimensions"])
+    day = next((i for i, d in enumerate(dims) if d in DAY_DIMENSIONS), None)
+    added = day is None
+    if added:
+        dims.append("date:day")
+        day = len(dims) - 1
+    out = {
+        **config,
+        "dimensions": dims,
+        "date_range": {"from": None, "to": None},
+        "limit": None,
+        # o dia é o dia local: outro fuso, outro parcial
+        "timezone": timezone.get_current_timezone_name(),
+    }
+    return out, day, added
+
+
+def partial_key(config: Mapping[str, Any]) -> str:
+    """config_hash do parcial de um config normalizado."""
+    return config_hash(partial_config(config)[0])
+
+
+def _date_columns(dimensions: List[str]) -> List[int]:
+    return [i for i, d in enumerate(dimensions) if d == "date" or d.startswith("date:")]
+
+
+def _merge(totals: dict, rows: Iterable, n_dims: int) -> None:
+    for row in rows:
+        key = tuple(row[:n_dims])
+        current = totals.get(key)
+        if current is None:
+            totals[key] = list(row[n_dims:])
+        else:
+            for i, v in enumerate(row[n_dims:]):
+                current[i] += v or 0
+
+
+def _dump(totals: dict) -> list:
+    """Chaves com datetime -> ISO (JSONField)."""
+    return [
+        [v.isoformat() if hasattr(v, "isoformat") else v for v in key] + values
+        for key, values in totals.items()
+    ]
+
+
+def _load(rows: list, n_dims: int, date_columns: List[int]) -> dict:
+    """Inverso de _dump: datas voltam a datetime no fuso atual, como o engine devolve."""
+    tz = timezone.get_current_timezone()
+    totals = {}
+    for row in rows:
+        key = list(row[:n_dims])
+        for i in date_columns:
+            if key[i] is not None:
+                key[i] = datetime.fromisoformat(key[i]).astimezone(tz)
+        totals[tuple(key)] = list(row[n_dims:])
+    return totals
+
+
+def _aggregate(config, n_dims: int, pk_gt: Optional[int], pk_lte: Optional[int]) -> dict:
+    totals = {}
+    compiled = compile_report(config, pk_gt=pk_gt, pk_lte=pk_lte, apply_limit=False)
+    _merge(totals, compiled.iter_rows(), n_dims)
+    return totals
+
+
+def _locked_partial(key: str, source_key: str) -> Optional[ReportPartial]:
+    """
+    Parcial travado (FOR UPDATE) na transação corrente; cria se não existir (ou foi
+    invalidado). None se outro refresh já está com ele travado (não espera).
+    """
+    found = ReportPartial.objects.select_for_update(skip_locked=True).filter(config_hash=key).first()
+    if found is not None:
+        return found
+    if ReportPartial.objects.filter(config_hash=key).exists():
+        return None
+    try:
+        with transaction.atomic():
+            return ReportPartial.objects.create(config_hash=key, source=source_key)
+    except IntegrityError:
+        return ReportPartial.objects.select_for_update(skip_locked=True).filter(config_hash=key).first()
+
+
+def refresh_partial(pconfig: Mapping[str, Any]) -> Tuple[ReportPartial, int]:
+    """
+    Leva o parcial (config de partial_config) até o hwm seguro, numa transação
+    própria: chame fora da transação longa do export (refresh_for), senão a trava
+    fica até o commit dela. Outro refresh do mesmo config em andamento -> devolve o
+    parcial já commitado sem esperar (a cauda acima do hwm é agregada na leitura).
+    Retorna (parcial, linhas agregadas da faixa nova).
+    """
+    source = get_source(pconfig["source"])
+    n_dims = len(pconfig["dimensions"])
+    lag = getattr(settings, "REPORTS_INCREMENTAL_LAG_SECONDS", 60)
+    now = timezone.now()
+    added = 0
+
+    with transaction.atomic():
+        # trava o parcial: dois refreshes do mesmo config não somam a mesma faixa
+        key = config_hash(pconfig)
+        partial = _locked_partial(key, pconfig["source"])
+        if partial is None:
+            return ReportPartial.objects.get(config_hash=key), 0
+        fields = []
+        # max(pk) anotado há mais de `lag`: tudo abaixo dele já commitou
+        if partial.pending_at is not None and partial.pending_at <= now - timedelta(seconds=lag):
+            if partial.pending_hwm > partial.high_water_id:
+                totals = _load(partial.rows, n_dims, _date_columns(pconfig["dimensions"]))
+                delta = _aggregate(pconfig, n_dims, partial.high_water_id, partial.pending_hwm)
+                _merge(totals, (k + tuple(v) for k, v in delta.items()), n_dims)
+                partial.rows = _dump(totals)
+                partial.high_water_id = partial.pending_hwm
+                added = sum(v[0] for v in delta.values() if v)
+                fields += ["rows", "high_water_id"]
+            partial.pending_at = None
+            fields.append("pending_at")
+
+        if partial.pending_at is None:
+            seen = source.model._default_manager.aggregate(hwm=Max("pk"))["hwm"] or 0
+            if seen > partial.high_water_id:
+                partial.pending_hwm = seen
+                partial.pending_at = now
+                fields += ["pending_hwm", "pending_at"]
+
+        if fields:
+            partial.save(update_fields=sorted(set(fields)) + ["updated_at"])
+    return partial, added
+
+
+def _sort_key(row_key):
+    # mesma ordem do ORDER BY das dimensões (NULL por último)
+    return tuple((v is None, v if v is not None else 0) for v in row_key)
+
+
+def refresh_for(config: Optional[Mapping[str, Any]]) -> None:
+    """Refresh do parcial do config (se a source usa parciais), antes da query do export."""
+    config = normalize_config(config)
+    if supports_incremental(config):
+        refresh_partial(partial_config(config)[0])
+
+
+def incremental_rows(
+    config: Optional[Mapping[str, Any]], refresh: bool = True,
+) -> Optional[Tuple[List[str], Iterator[tuple]]]:
+    """
+    (colunas, linhas) do relatório usando parciais + cauda recente agregada na hora.
+    refresh=False: só lê o parcial (o chamador já fez refresh_for fora da transação);
+    sem parcial -> None (caminho completo).
+    """
+    config = normalize_config(config)
+    pconfig, day, day_added = partial_config(config)
+    n_partial = len(pconfig["dimensions"])
+    if refresh:
+        partial, _ = refresh_partial(pconfig)
+    else:
+        partial = ReportPartial.objects.filter(config_hash=config_hash(pconfig)).first()
+        if partial is None:
+            return None
+
+    totals = _load(partial.rows, n_partial, _date_columns(pconfig["dimensions"]))
+    tail = _aggregate(pconfig, n_partial, partial.high_water_id, None)
+    _merge(totals, (k + tuple(v) for k, v in tail.items()), n_partial)
+
+    # date_range sobre o dia, com os mesmos limites do engine (dia local)
+    date_range = config["date_range"]
+    start = _day_start(date_range["from"]) if date_range["from"] else None
+    end = _day_start(date_range["to"]) + timedelta(days=1) if date_range["to"] else None
+    n_dims = len(config["dimensions"])
+    result = {}
+    for key, values in totals.items():
+        value = key[day]
+        if (start is not None or end is not None) and value is None:
+            continue
+        if (start is not None and value < start) or (end is not None and value >= end):
+            continue
+        if day_added:
+            key = key[:day] + key[day + 1:]
+        _merge(result, [key + tuple(values)], n_dims)
+
+    columns = compile_report(config).columns
+    if not n_dims and not result:
+        result[()] = [0] * (len(columns))
+    keys = sorted(result, key=_sort_key)
+    if config["limit"]:
+        keys = keys[:config["limit"]]
+    return columns, (tuple(k) + tuple(result[k]) for k in keys)
+
+
+# ---------------------------------------------------------------------
+# Invalidação (UPDATE/DELETE)
+# ---------------------------------------------------------------------
+
+@lru_cache(maxsize=1)
+def _tracked_fields() -> Dict[str, Dict[Any, Set[str]]]:
+    """source -> model -> campos (name e attname) que alteram linhas dos parciais."""
+    # count_distinct não usa parciais: campos dele não invalidam
+    return {key: source_fields(source, distinct=False) for key, source in append_only_sources().items()}
+
+
+def tracked_models() -> Set[Any]:
+    return {model for by_model in _tracked_fields().values() for model in by_model}
+
+
+def invalidate_partials(source_key: str) -> int:
+    """Apaga os parciais da source (o próximo refresh recalcula do zero)."""
+    return ReportPartial.objects.filter(source=source_key).delete()[0]
+
+
+def invalidate_for_update(model, fields: Optional[Iterable[str]] = None) -> None:
+    """
+    Linhas de `model` mudaram nesses campos (None = qualquer um): apaga, no commit,
+    os parciais das sources que dependem deles e sobe a versão delas (cache de
+    resultados). Para .update()/bulk_update, que não disparam signals.
+    """
+    bump_for_update(model, fields)
+    fields = None if fields is None else set(fields)
+    for source_key, by_model in _tracked_fields().items():
+        used = by_model.get(model)
+        if used and (fields is None or fields & used):
+            transaction.on_commit(bind(invalidate_partials, source_key))
+
+
+def tracked_saved(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    # INSERT não muda linhas já agregadas
+    if created or raw:
+        return
+    invalidate_for_update(sender, update_fields)
+
+
+def tracked_deleted(sender, instance, **kwargs):
+    invalidate_for_update(sender)
+
+
+def remove_stale_partials(days: int = STALE_PARTIAL_DAYS) -> int:
+    """Parciais sem refresh há mais de `days` dias (config que ninguém mais pede)."""
+    cutoff = timezone.now() - timedelta(days=days)
+    return ReportPartial.objects.filter(updated_at__lt=cutoff).delete()[0]
@@ -0,0 +1,189 @@
+# src/reports/jobs.py
+"""
+Fila de geração de relatórios no banco (ReportJob).
+
+- enqueue_report: cria o job (ou devolve o que já está na fila) e marca o Report
+  como Processing
+- claim_jobs: pega jobs Queued com SELECT ... FOR UPDATE SKIP LOCKED; vários
+  workers/processos podem rodar ao mesmo tempo sem pegar o mesmo job
+- enqueue_report recusa configs acima do orçamento de custo (src/reports/planner.py)
+- run_job: pega o arquivo do cache de resultados ou gera (src/reports/cache.py) com
+  statement_timeout de REPORTS_JOB_STATEMENT_TIMEOUT_MS só nas queries (query cara:
+  particionada em processos, src/reports/parallel.py); blobs/artifacts são registrados
+  fora dessa transação; na mesma passada grava o resultado colunar
+  para paginação (src/reports/results.py); atualiza o job (tempos,
+  linhas, tamanho) e o Report.status (Ready/Failed + status_reason)
+- touch_jobs: o worker renova heartbeat_at dos jobs que está rodando (a cada
+  REPORT_JOB_HEARTBEAT_SECONDS), independente de quanto o job demora
+- requeue_stale_jobs: jobs Running sem heartbeat (worker morreu) voltam para a fila
+"""
+import logging
+import os
+import socket
+import time
+from datetime import timedelta
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from src.reports.cache import get_or_build
+from src.reports.counters import set_status
+from src.reports.engine import ReportConfigError
+from src.reports.export import resolve_format
+from src.reports.models import Report, ReportJob
+from src.reports.parallel import should_parallelize
+from src.reports.planner import ReportPlan, ReportTimeoutError, check_budget
+from src.reports.results import get_or_build_result, result_writer
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = (ReportJob.Status.QUEUED, ReportJob.Status.RUNNING)
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_report(report: Report, fmt: str = "csv", user=None, plan: Optional[ReportPlan] = None) -> ReportJob:
+    """plan: o do chamador (ex.: export que acabou de rodar plan_report), sem EXPLAIN de novo."""
+    fmt = resolve_format(fmt)
+    check_budget(report.config, plan)
+    with transaction.atomic():
+        # mesmo relatório/formato já na fila: não gera duas vezes
+        job = (
+            ReportJob.objects
+            .filter(report=report, format=fmt, status__in=ACTIVE_STATUSES)
+            .order_by("created_at")
+            .first()
+        )
+        if job is None:
+            job = ReportJob.objects.create(report=report, format=fmt, requested_by=user)
+        set_status(Report.objects.filter(pk=report.pk), Report.Status.PROCESSING, status_reason="")
+    return job
+
+
+def claim_jobs(limit: int = 1, worker: str = "") -> List[int]:
+    """Marca até `limit` jobs Queued como Running e devolve os ids."""
+    with transaction.atomic():
+        ids = list(
+            ReportJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=ReportJob.Status.QUEUED)
+            .order_by("created_at")
+            .values_list("id", flat=True)[:limit]
+        )
+        if ids:
+            now = timezone.now()
+            ReportJob.objects.filter(id__in=ids).update(
+                status=ReportJob.Status.RUNNING,
+                started_at=now,
+                heartbeat_at=now,
+                worker=worker or worker_name(),
+            )
+    return ids
+
+
+def touch_jobs(job_ids) -> int:
+    """Heartbeat: os jobs ainda estão rodando neste worker."""
+    job_ids = list(job_ids)
+    if not job_ids:
+        return 0
+    return ReportJob.objects.filter(id__in=job_ids, status=ReportJob.Status.RUNNING).update(
+        heartbeat_at=timezone.now()
+    )
+
+
+def requeue_stale_jobs() -> int:
+    """
+    Jobs Running sem heartbeat há mais de REPORT_JOB_TIMEOUT_SECONDS voltam para
+    Queued (ou Failed). Conta do último heartbeat, não do início: um job longo
+    (export + colunar, cada um até o statement_timeout) não é pego enquanto o
+    worker estiver vivo.
+    """
+    timeout = getattr(settings, "REPORT_JOB_TIMEOUT_SECONDS", 5 * 60)
+    max_attempts = getattr(settings, "REPORT_JOB_MAX_ATTEMPTS", 3)
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    stale = ReportJob.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+        status=ReportJob.Status.RUNNING,
+    )
+
+    failed = list(stale.filter(attempts__gte=max_attempts).values_list("id", flat=True))
+    for job_id in failed:
+        _finish_failed(job_id, "Timed out (worker did not finish).")
+    return stale.filter(attempts__lt=max_attempts).update(status=ReportJob.Status.QUEUED, worker="")
+
+
+def release_job(job_id: int) -> None:
+    """Devolve para a fila um job Running cujo processo morreu antes de terminar."""
+    ReportJob.objects.filter(pk=job_id, status=ReportJob.Status.RUNNING).update(
+        status=ReportJob.Status.QUEUED, worker=""
+    )
+
+
+def _finish_failed(job_id: int, error: str, started: Optional[float] = None) -> None:
+    now = timezone.now()
+    with transaction.atomic():
+        job = ReportJob.objects.select_for_update().get(pk=job_id)
+        job.status = ReportJob.Status.FAILED
+        job.error = error[:5000]
+        job.finished_at = now
+        if started is not None:
+            job.duration_ms = int((time.monotonic() - started) * 1000)
+        job.save(update_fields=["status", "error", "finished_at", "duration_ms"])
+        set_status(
+            Report.objects.filter(pk=job.report_id), Report.Status.FAILED,
+            updated_at=now, status_reason=job.error,
+        )
+
+
+def run_job(job_id: int) -> ReportJob:
+    """Gera (ou reaproveita do cache) o arquivo de um job já reivindicado (Running)."""
+    started = time.monotonic()
+    job = ReportJob.objects.select_related("report").get(pk=job_id)
+    ReportJob.objects.filter(pk=job_id).update(attempts=job.attempts + 1)
+
+    timeout_ms = getattr(settings, "REPORTS_JOB_STATEMENT_TIMEOUT_MS", 10 * 60 * 1000)
+    try:
+        # o timeout (e a transação dele) cobre só as queries; blobs e artifacts são
+        # registrados depois, cada um na sua transação curta
+        parallel = should_parallelize(job.report.config)
+        tee = result_writer(job.report.config)
+        artifact, cached = get_or_build(
+            job.report.config, job.format, parallel=parallel, tee=tee, timeout_ms=timeout_ms,
+        )
+        result = get_or_build_result(job.report.config, parallel=parallel, timeout_ms=timeout_ms)
+    except ReportTimeoutError as e:
+        logger.warning("Relatório %s (job %s): %s", job.report_id, job_id, e)
+        _finish_failed(job_id, str(e), started)
+        return ReportJob.objects.get(pk=job_id)
+    except Exception as e:
+        if isinstance(e, ReportConfigError):
+            logger.warning("Config inválido no relatório %s (job %s): %s", job.report_id, job_id, e)
+        else:
+            logger.exception("Falha ao gerar o relatório (job %s)", job_id)
+        _finish_failed(job_id, f"{type(e).__name__}: {e}", started)
+        return ReportJob.objects.get(pk=job_id)
+
+    now = timezone.now()
+    job.status = ReportJob.Status.DONE
+    job.finished_at = now
+    job.duration_ms = int((time.monotonic() - started) * 1000)
+    job.blob_id = artifact.blob_id
+    job.result_blob_id = result.blob_id if result is not None else None
+    job.rows = artifact.rows
+    job.size_bytes = artifact.size_bytes
+    job.error = ""
+    with transaction.atomic():
+        job.save(update_fields=["status", "finished_at", "duration_ms", "blob", "result_blob", "rows", "size_bytes", "error"])
+        # agendado continua Scheduled (próxima execução em next_run_at)
+        done_status = Report.Status.SCHEDULED if job.report.next_run_at else Report.Status.READY
+        set_status(Report.objects.filter(pk=job.report_id), done_status, updated_at=now, status_reason="")
+    logger.info(
+        "Relatório %s %s: %d linha(s) em %d ms",
+        job.report_id, "servido do cache" if cached else "gerado", job.rows, job.duration_ms,
+    )
+    return job
@@ -0,0 +1,34 @@
+# src/reports/management/commands/gc_report_blobs.py
+from django.core.management.base import BaseCommand
+
+from src.reports import blobs, configs, incremental, results
+
+
+class Command(BaseCommand):
+    help = (
+        "Blob store de relatórios: recalcula o refcount a partir de ReportArtifact/Report, "
+        "apaga blobs e configs sem referência, arquivos órfãos no disco e índices de ordenação "
+        "de resultados que já saíram e parciais do refresh incremental sem uso."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace", type=int, default=blobs.BLOB_GRACE_SECONDS,
+            help="só apaga o que está sem uso há mais que isso (s)",
+        )
+        parser.add_argument("--no-rebuild", action="store_true", help="não recalcula o refcount")
+
+    def handle(self, *args, **opts):
+        if not opts["no_rebuild"]:
+            changed = blobs.rebuild_refcounts()
+            changed_configs = configs.rebuild_refcounts()
+            self.stdout.write(f"refcount corrigido em {changed} blob(s) e {changed_configs} config(s)")
+        removed = blobs.collect(opts["grace"])
+        removed_configs = configs.collect(opts["grace"])
+        orphans = blobs.remove_orphan_files(opts["grace"])
+        orphans += results.remove_stale_indexes()
+        partials = incremental.remove_stale_partials()
+        self.stdout.write(self.style.SUCCESS(
+            f"{removed} blob(s), {removed_configs} config(s), {orphans} arquivo(s) órfão(s) "
+            f"e {partials} parcial(is) removido(s)."
+        ))
@@ -0,0 +1,12 @@
+# src/reports/management/commands/rebuild_report_counters.py
+from django.core.management.base import BaseCommand
+
+from src.reports.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = "Recalcula ReportStatusCounter a partir da tabela de relatórios (reconciliação)."
+
+    def handle(self, *args, **opts):
+        n = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f"{n} contador(es) status/type recalculado(s)."))
@@ -0,0 +1,30 @@
+# src/reports/management/commands/run_report_scheduler.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from src.reports.schedule import run_due_reports
+
+
+class Command(BaseCommand):
+    help = (
+        "Enfileira os relatórios agendados vencidos (Report.next_run_at). "
+        "Pode rodar em mais de um nó: cada execução é enfileirada uma única vez."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="fica rodando em background")
+        parser.add_argument("--interval", type=float, default=30.0, help="intervalo (s) entre verificações")
+        parser.add_argument("--batch-size", type=int, default=50)
+
+    def handle(self, *args, **opts):
+        while True:
+            queued = run_due_reports(batch_size=opts["batch_size"])
+            # lote cheio: pode haver mais vencidos, verifica de novo sem esperar
+            while queued >= opts["batch_size"]:
+                queued = run_due_reports(batch_size=opts["batch_size"])
+            if queued:
+                self.stdout.write(f"{queued} relatório(s) enfileirado(s)")
+            if not opts["loop"]:
+                break
+            time.sleep(opts["interval"])
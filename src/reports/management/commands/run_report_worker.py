@@ -0,0 +1,77 @@
+# src/reports/management/commands/run_report_worker.py
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand, CommandError
+
+from django.conf import settings
+
+from src.reports.jobs import claim_jobs, release_job, requeue_stale_jobs, touch_jobs, worker_name
+from src.reports.worker import init_process, run_job_in_process
+
+STALE_CHECK_SECONDS = 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker da fila de relatórios (ReportJob): pega jobs com FOR UPDATE SKIP LOCKED "
+        "e gera os arquivos em um pool de processos. Pode rodar em várias máquinas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=2)
+        parser.add_argument("--poll", type=float, default=2.0, help="pausa (s) quando a fila está vazia")
+        parser.add_argument("--once", action="store_true", help="processa o que houver na fila e sai")
+
+    def handle(self, *args, **opts):
+        processes = max(1, opts["processes"])
+        name = worker_name()
+        # spawn: o filho não herda a conexão do banco do processo pai
+        ctx = multiprocessing.get_context("spawn")
+        running = {}  # future -> job_id
+        last_stale_check = 0.0
+        heartbeat = getattr(settings, "REPORT_JOB_HEARTBEAT_SECONDS", 30)
+        last_heartbeat = time.monotonic()
+
+        with ProcessPoolExecutor(max_workers=processes, mp_context=ctx, initializer=init_process) as pool:
+            while True:
+                if time.monotonic() - last_stale_check > STALE_CHECK_SECONDS:
+                    requeued = requeue_stale_jobs()
+                    if requeued:
+                        self.stdout.write(f"{requeued} job(s) preso(s) de volta na fila")
+                    last_stale_check = time.monotonic()
+
+                if running and time.monotonic() - last_heartbeat > heartbeat:
+                    touch_jobs(running.values())
+                    last_heartbeat = time.monotonic()
+
+                free = processes - len(running)
+                if free > 0:
+                    for job_id in claim_jobs(limit=free, worker=name):
+                        running[pool.submit(run_job_in_process, job_id)] = job_id
+
+                if not running:
+                    if opts["once"]:
+                        break
+                    time.sleep(opts["poll"])
+                    continue
+
+                done, _ = wait(running, timeout=opts["poll"], return_when=FIRST_COMPLETED)
+                broken = False
+                for fut in done:
+                    job_id = running.pop(fut)
+                    try:
+                        _, status, rows, ms = fut.result()
+                        self.stdout.write(f"job {job_id}: {status} ({rows} linha(s), {ms} ms)")
+                    except BrokenProcessPool:
+                        release_job(job_id)
+                        broken = True
+                    except Exception as e:
+                        release_job(job_id)
+                        self.stderr.write(f"job {job_id}: falha no processo ({e})")
+                if broken:
+                    for job_id in running.values():
+                        release_job(job_id)
+                    raise CommandError("Pool de processos quebrado; jobs devolvidos para a fila.")
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_reportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='next_run_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0004_reportartifact'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportPartial',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('config_hash', models.CharField(max_length=64, unique=True)),
+                ('high_water_id', models.BigIntegerField(default=0)),
+                ('rows', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
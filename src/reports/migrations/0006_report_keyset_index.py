@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0005_reportpartial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['-updated_at', '-id'], name='reports_updated_id_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:24
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    Report = apps.get_model("reports", "Report")
+    ReportStatusCounter = apps.get_model("reports", "ReportStatusCounter")
+    rows = Report.objects.order_by().values("status", "type").annotate(n=Count("pk"))
+    ReportStatusCounter.objects.bulk_create(
+        [ReportStatusCounter(status=r["status"], type=r["type"], count=r["n"]) for r in rows]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0006_report_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportStatusCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=20)),
+                ('type', models.CharField(max_length=100)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('status', 'type'), name='reports_statuscounter_status_type_uniq')],
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
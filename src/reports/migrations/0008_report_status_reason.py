@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0007_reportstatuscounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='status_reason',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
@@ -0,0 +1,62 @@
+import shutil
+from pathlib import Path
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def drop_file_cache(apps, schema_editor):
+    # cache antigo (arquivos soltos em REPORTS_OUTPUT_DIR/cache): é só gerar de novo.
+    # Caminho calculado aqui (mesma regra de src.reports.cache.output_dir): migração não importa código do app
+    root = Path(getattr(settings, "REPORTS_OUTPUT_DIR", Path(settings.BASE_DIR) / "var" / "reports"))
+    apps.get_model("reports", "ReportArtifact").objects.all().delete()
+    shutil.rmtree(root / "cache", ignore_errors=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0008_report_status_reason"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReportBlob",
+            fields=[
+                ("hash", models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ("codec", models.CharField(max_length=10)),
+                ("size_bytes", models.PositiveBigIntegerField(default=0)),
+                ("stored_bytes", models.PositiveBigIntegerField(default=0)),
+                ("refcount", models.IntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.RunPython(drop_file_cache, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="reportartifact",
+            name="file_path",
+        ),
+        migrations.AddField(
+            model_name="reportartifact",
+            name="blob",
+            field=models.ForeignKey(
+                default="", on_delete=django.db.models.deletion.PROTECT,
+                related_name="artifacts", to="reports.reportblob",
+            ),
+            preserve_default=False,
+        ),
+        migrations.RemoveField(
+            model_name="reportjob",
+            name="file_path",
+        ),
+        migrations.AddField(
+            model_name="reportjob",
+            name="blob",
+            field=models.ForeignKey(
+                blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+", to="reports.reportblob",
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0009_report_blob_store'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='result_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='reports.reportblob'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:01
+
+from django.db import migrations, models
+
+
+def drop_partials(apps, schema_editor):
+    # formato mudou (dia entre as dimensões, chave sem date_range): recalculados no próximo uso
+    apps.get_model("reports", "ReportPartial").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0011_reportjob_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportpartial',
+            name='pending_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reportpartial',
+            name='pending_hwm',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reportpartial',
+            name='source',
+            field=models.CharField(db_index=True, default='', max_length=50),
+        ),
+        migrations.RunPython(drop_partials, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0012_reportpartial_source_pending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportSourceVersion',
+            fields=[
+                ('source', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:25
+
+import gzip
+import hashlib
+import json
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _canonical_json(value):
+    # mesma regra de src.reports.configs.canonical_json: migração não importa código do app
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def move_configs_to_blobs(apps, schema_editor):
+    Report = apps.get_model("reports", "Report")
+    ReportConfigBlob = apps.get_model("reports", "ReportConfigBlob")
+    refs = Counter()
+    for report in Report.objects.filter(config__isnull=False).only("pk", "config").iterator():
+        data = _canonical_json(report.config)
+        blob_hash = hashlib.sha256(data).hexdigest()
+        if blob_hash not in refs:
+            ReportConfigBlob.objects.get_or_create(
+                hash=blob_hash,
+                defaults={"codec": "gzip", "data": gzip.compress(data, compresslevel=6, mtime=0), "size_bytes": len(data)},
+            )
+        refs[blob_hash] += 1
+        Report.objects.filter(pk=report.pk).update(config_blob_id=blob_hash)
+    for blob_hash, n in refs.items():
+        ReportConfigBlob.objects.filter(pk=blob_hash).update(refcount=n)
+
+
+def move_blobs_to_configs(apps, schema_editor):
+    Report = apps.get_model("reports", "Report")
+    for report in Report.objects.filter(config_blob__isnull=False).select_related("config_blob").iterator():
+        blob = report.config_blob
+        if blob.codec != "gzip":
+            import zstandard  # gravado com zstd: precisa do pacote para voltar
+            data = zstandard.ZstdDecompressor().decompress(bytes(blob.data))
+        else:
+            data = gzip.decompress(bytes(blob.data))
+        Report.objects.filter(pk=report.pk).update(config=json.loads(data))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0013_reportsourceversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportConfigBlob',
+            fields=[
+                ('hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('codec', models.CharField(max_length=10)),
+                ('data', models.BinaryField()),
+                ('size_bytes', models.PositiveIntegerField(default=0)),
+                ('refcount', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='config_blob',
+            field=models.ForeignKey(blank=True, db_column='config_hash', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='reports.reportconfigblob'),
+        ),
+        migrations.RunPython(move_configs_to_blobs, move_blobs_to_configs),
+        migrations.RemoveField(
+            model_name='report',
+            name='config',
+        ),
+    ]
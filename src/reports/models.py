@@ -1,7 +1,10 @@
+import json
 import uuid
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 
+from .schedule import get_schedule, next_run_for
+
 class Report(models.Model):
     class Status(models.TextChoices):
         READY = "Ready", "Ready"
@@ -15,6 +18,8 @@ class Report(models.Model):
     name = models.CharField(max_length=255)
     type = models.CharField(max_length=100, db_index=True)      # ex.: Sales, Users, Retention...
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.READY, db_index=True)
+    # motivo do último Failed (orçamento de custo, statement_timeout, erro na geração)
+    status_reason = models.TextField(blank=True, default="")
 
     owner = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -27,11 +32,255 @@ class Report(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
-    # Payload/Config opcional (JSON)
-    config = models.JSONField(null=True, blank=True)
+    # Payload/Config opcional (JSON), comprimido e deduplicado em ReportConfigBlob
+    # (src/reports/configs.py) e lido/gravado pela propriedade `config`
+    config_blob = models.ForeignKey(
+        "ReportConfigBlob",
+        on_delete=models.PROTECT,
+        null=True, blank=True,
+        related_name="+",
+        db_column="config_hash",
+    )
+
+    # Próxima execução agendada (config["schedule"], ver src/reports/schedule.py)
+    next_run_at = models.DateTimeField(null=True, blank=True, db_index=True)
 
     class Meta:
         ordering = ["-updated_at"]
+        indexes = [
+            # keyset da listagem (updated_at, id)
+            models.Index(fields=["-updated_at", "-id"], name="reports_updated_id_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.type})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "config_blob_id" in field_names:
+            # hash original: refcount do config e troca de schedule (src/reports/configs.py)
+            instance._loaded_config_hash = instance.config_blob_id
+        return instance
+
+    @staticmethod
+    def _schedule_key(config):
+        schedule = get_schedule(config)
+        return json.dumps(schedule, sort_keys=True) if schedule else None
+
+    @property
+    def config(self):
+        """Config do ReportConfigBlob (decodificado uma vez). Atribua um dict para alterar."""
+        if getattr(self, "_config_dirty", False):
+            return self._config
+        blob_hash = self.config_blob_id
+        cached = getattr(self, "_config_cache", None)
+        if cached is None or cached[0] != blob_hash:
+            from .configs import decode  # configs importa este módulo
+            cached = self._config_cache = (blob_hash, decode(self.config_blob) if blob_hash else None)
+        return cached[1]
+
+    @config.setter
+    def config(self, value):
+        self._config = value
+        self._config_dirty = True
+
+    def _store_config(self) -> bool:
+        """Grava o config em ReportConfigBlob se o conteúdo mudou. Retorna se config_blob mudou."""
+        from .configs import config_hash, put_config
+
+        # atribuído ou já lido (o dict pode ter sido alterado no lugar)
+        if not (getattr(self, "_config_dirty", False) or getattr(self, "_config_cache", None)):
+            return False
+        if not self._state.adding and "_loaded_config_hash" not in self.__dict__:
+            # config_blob veio adiado: hash original para o refcount
+            self._loaded_config_hash = self.config_blob_id
+        config = self.config
+        new_hash = config_hash(config) if config is not None else None
+        if new_hash != self.config_blob_id:
+            self.config_blob_id = put_config(config) if config is not None else None
+        self._config_dirty = False
+        self._config_cache = (self.config_blob_id, config)
+        return self.config_blob_id != getattr(self, "_loaded_config_hash", None)
+
+    def _schedule_changed(self, config_changed: bool) -> bool:
+        if config_changed:
+            from .configs import get_config
+
+            old_key = self._schedule_key(get_config(getattr(self, "_loaded_config_hash", None)))
+            if self._schedule_key(self.config) != old_key:
+                return True
+        # agendado sem next_run_at
+        return self.next_run_at is None and self._schedule_key(self.config) is not None
+
+    def save(self, *args, **kwargs):
+        extra_fields = set()
+        # atomic: o ajuste dos contadores e do refcount (signals) entra na mesma transação
+        with transaction.atomic():
+            config_changed = self._store_config()
+            if config_changed:
+                extra_fields.add("config_blob")
+            # schedule mudou (ou agendado sem next_run_at): recalcula a próxima execução
+            if self._schedule_changed(config_changed):
+                self.next_run_at = next_run_for(self.config)
+                extra_fields.add("next_run_at")
+            if extra_fields and kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], *extra_fields}
+            super().save(*args, **kwargs)
+
+
+class ReportConfigBlob(models.Model):
+    """
+    Config de relatório (JSON canônico comprimido), endereçado pelo sha256 do JSON
+    (src/reports/configs.py). Configs iguais dividem a linha.
+    refcount = Reports que apontam para ele (0 -> apagado pelo collect).
+    """
+    hash = models.CharField(max_length=64, primary_key=True)
+    codec = models.CharField(max_length=10)                 # zstd | gzip
+    data = models.BinaryField()
+    size_bytes = models.PositiveIntegerField(default=0)     # JSON sem compressão
+    refcount = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now_add=True, db_index=True)  # último put
+
+    def __str__(self):
+        return f"{self.hash[:12]} ({self.codec}, refs={self.refcount})"
+
+
+class ReportJob(models.Model):
+    """
+    Geração de um relatório em background (fila no próprio banco).
+    O worker (run_report_worker) pega jobs Queued com SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    class Status(models.TextChoices):
+        QUEUED = "Queued", "Queued"
+        RUNNING = "Running", "Running"
+        DONE = "Done", "Done"
+        FAILED = "Failed", "Failed"
+
+    report = models.ForeignKey(Report, on_delete=models.CASCADE, related_name="jobs")
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name="report_jobs"
+    )
+    format = models.CharField(max_length=20, default="csv")
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+
+    # Tempos
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_ms = models.PositiveIntegerField(null=True, blank=True)
+
+    # renovado pelo worker enquanto o job roda (touch_jobs); parado há muito -> requeue_stale_jobs
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True, default="")
+    error = models.TextField(blank=True, default="")
+
+    # Resultado no blob store; sem referência própria: saiu do cache (LRU) -> NULL
+    blob = models.ForeignKey("ReportBlob", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    # Resultado colunar (Arrow IPC file) para paginar por memory map (src/reports/results.py)
+    result_blob = models.ForeignKey("ReportBlob", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    rows = models.PositiveIntegerField(null=True, blank=True)
+    size_bytes = models.PositiveBigIntegerField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="reports_job_status_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.report_id} [{self.format}] {self.status}"
+
+
+class ReportBlob(models.Model):
+    """
+    Conteúdo endereçado pelo sha256 (src/reports/blobs.py): arquivos gerados,
+    comprimidos em settings.REPORTS_OUTPUT_DIR/blobs/.
+    refcount = ReportArtifacts que apontam para o blob (0 -> coletado).
+    """
+    hash = models.CharField(max_length=64, primary_key=True)
+    codec = models.CharField(max_length=10)                # zstd | gzip | none
+    size_bytes = models.PositiveBigIntegerField(default=0)   # conteúdo original
+    stored_bytes = models.PositiveBigIntegerField(default=0) # no disco
+    refcount = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now_add=True, db_index=True)  # último put
+
+    def __str__(self):
+        return f"{self.hash[:12]} ({self.codec}, refs={self.refcount})"
+
+
+class ReportArtifact(models.Model):
+    """
+    Resultado de relatório em cache, endereçado pelo conteúdo:
+    key = sha256(config normalizado + formato + marca d'água dos dados).
+    Arquivo no blob store (keys diferentes com o mesmo arquivo dividem o blob);
+    LRU por last_used_at.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    format = models.CharField(max_length=20)
+    blob = models.ForeignKey(ReportBlob, on_delete=models.PROTECT, related_name="artifacts")
+    rows = models.PositiveIntegerField(default=0)
+    size_bytes = models.PositiveBigIntegerField(default=0)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ["-last_used_at"]
+
+    def __str__(self):
+        return f"{self.key[:12]}.{self.format} ({self.size_bytes} bytes)"
+
+
+class ReportPartial(models.Model):
+    """
+    Agregados parciais de um config sobre source append-only (src/reports/incremental.py).
+    rows = [[dim1, dim2, ..., dia, count], ...] de todas as linhas com pk <= high_water_id.
+    pending_hwm = max(pk) visto em pending_at; vira o hwm depois de REPORTS_INCREMENTAL_LAG_SECONDS.
+    """
+    config_hash = models.CharField(max_length=64, unique=True)
+    # nome da source (engine): UPDATE/DELETE nela apaga os parciais
+    source = models.CharField(max_length=50, db_index=True, default="")
+    high_water_id = models.BigIntegerField(default=0)
+    pending_hwm = models.BigIntegerField(default=0)
+    pending_at = models.DateTimeField(null=True, blank=True)
+    rows = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.config_hash[:12]} (pk <= {self.high_water_id})"
+
+
+class ReportStatusCounter(models.Model):
+    """Quantidade de relatórios por (status, type), mantida a cada escrita (src/reports/counters.py)."""
+    status = models.CharField(max_length=20)
+    type = models.CharField(max_length=100)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["status", "type"], name="reports_statuscounter_status_type_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.status}/{self.type}: {self.count}"
+
+
+class ReportSourceVersion(models.Model):
+    """
+    Versão dos dados de uma source do engine (src/reports/versions.py): sobe a cada
+    UPDATE/DELETE nos campos que ela lê; entra na marca d'água do cache de resultados.
+    """
+    source = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} v{self.version}"
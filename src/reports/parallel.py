@@ -0,0 +1,207 @@
+# src/reports/parallel.py
+"""
+Execução particionada de relatórios em um pool de processos (run_job no worker).
+
+- a query do config é dividida em partições disjuntas: por mês (date_field) e por
+  empresa (nome, o mesmo valor da dimensão "company"); cada partição é um Q extra
+  em compile_report(where=...)
+- cada partição roda em um processo "spawn" do pool (uma conexão de banco por
+  processo, com o mesmo statement_timeout do job); os agregados voltam ao pai e
+  são somados por chave de dimensão, depois ordenados e cortados pelo limit
+- o pool é do processo (_pool) e fica aberto entre jobs: cada filho spawn importa o
+  Django de novo, caro demais para pagar a cada relatório. Quebrou -> recriado no próximo
+- count soma em qualquer partição; count_distinct só quando o eixo da partição
+  separa os grupos: mês com dimensão date:day/date:month, empresa com a dimensão
+  company. Sem eixo possível -> execução normal (um processo)
+- só vale a pena para queries caras: REPORTS_PARALLEL_MIN_COST (custo do EXPLAIN)
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import Any, Iterator, List, Mapping, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from src.company.models import Company
+from src.reports.engine import _day_start, compile_report, get_source, normalize_config
+from src.reports.planner import plan_report
+
+PARTITIONS_PER_PROCESS = 4
+# dimensões de data cujos grupos não atravessam a fronteira de um mês
+_MONTH_ALIGNED = {"date", "date:day", "date:month"}
+
+_POOL: Optional[Tuple[int, ProcessPoolExecutor]] = None  # (processos, pool) deste processo
+
+
+def _processes() -> int:
+    return max(1, int(getattr(settings, "REPORTS_PARALLEL_PROCESSES", 1)))
+
+
+def _pool(processes: int) -> ProcessPoolExecutor:
+    """Pool de partições do processo atual, aberto no primeiro uso e reaproveitado."""
+    global _POOL
+    if _POOL is not None and _POOL[0] != processes:
+        _reset_pool()
+    if _POOL is None:
+        from src.reports.worker import init_process
+
+        ctx = multiprocessing.get_context("spawn")
+        _POOL = (processes, ProcessPoolExecutor(max_workers=processes, mp_context=ctx, initializer=init_process))
+    return _POOL[1]
+
+
+def _reset_pool() -> None:
+    global _POOL
+    if _POOL is not None:
+        _POOL[1].shutdown(wait=False, cancel_futures=True)
+        _POOL = None
+
+
+def _month_start(d: datetime) -> datetime:
+    return timezone.make_aware(datetime(d.year, d.month, 1))
+
+
+def _next_month(d: datetime) -> datetime:
+    return _month_start(d.replace(day=1) + timedelta(days=32))
+
+
+def _month_partitions(config: Mapping[str, Any], max_parts: int) -> List[Q]:
+    source = get_source(config["source"])
+    field = source.date_field
+    date_range = config["date_range"]
+    if date_range["from"] and date_range["to"]:
+        first, last = _day_start(date_range["from"]), _day_start(date_range["to"])
+    else:
+        agg = source.model._default_manager.aggregate(lo=Min(field), hi=Max(field))
+        if agg["lo"] is None:
+            return []
+        first = _day_start(date_range["from"]) if date_range["from"] else agg["lo"]
+        last = _day_start(date_range["to"]) if date_range["to"] else agg["hi"]
+
+    first, last = timezone.localtime(first), timezone.localtime(last)
+    bounds = []  # início de cada mês depois do primeiro
+    cursor = _next_month(first)
+    while cursor <= last:
+        bounds.append(cursor)
+        cursor = _next_month(cursor)
+    if not bounds:
+        return []
+    # junta meses vizinhos até caber em max_parts
+    step = -(-(len(bounds) + 1) // max_parts)
+    bounds = bounds[step - 1::step]
+
+    # primeira e última ficam abertas: o intervalo do config já vem do compile_report
+    parts = [Q(**{f"{field}__lt": bounds[0]})]
+    for lo, hi in zip(bounds, bounds[1:]):
+        parts.append(Q(**{f"{field}__gte": lo, f"{field}__lt": hi}))
+    parts.append(Q(**{f"{field}__gte": bounds[-1]}))
+    if source.model._meta.get_field(field).null:
+        parts.append(Q(**{f"{field}__isnull": True}))
+    return parts
+
+
+def _company_partitions(config: Mapping[str, Any], groups: int) -> List[Q]:
+    path = get_source(config["source"]).dimensions.get("company")
+    if not path:
+        return []
+    names = sorted(set(Company.objects.values_list("name", flat=True)))
+    if len(names) < 2:
+        return []
+    size = -(-len(names) // groups)
+    parts = [Q(**{f"{path}__in": names[i:i + size]}) for i in range(0, len(names), size)]
+    parts.append(Q(**{f"{path}__isnull": True}))
+    return parts
+
+
+def plan_partitions(config: Optional[Mapping[str, Any]], processes: Optional[int] = None) -> List[Q]:
+    """Partições disjuntas do config (lista vazia: não dá para paralelizar)."""
+    config = normalize_config(config)
+    processes = processes or _processes()
+    only_counts = set(config["measures"]) == {"count"}
+    dims = set(config["dimensions"])
+
+    by_company = []
+    if only_counts or "company" in dims:
+        by_company = _company_partitions(config, processes)
+    by_month = []
+    if only_counts or dims & _MONTH_ALIGNED:
+        max_months = max(1, processes * PARTITIONS_PER_PROCESS // max(1, len(by_company)))
+        by_month = _month_partitions(config, max_months)
+
+    if by_month and by_company:
+        return [m & c for m in by_month for c in by_company]
+    return by_month or by_company
+
+
+def should_parallelize(config: Optional[Mapping[str, Any]]) -> bool:
+    if _processes() < 2:
+        return False
+    min_cost = getattr(settings, "REPORTS_PARALLEL_MIN_COST", 5_000_000)
+    if not min_cost:
+        return True
+    cost = plan_report(config).cost
+    return cost is not None and cost >= min_cost
+
+
+def run_partition(config: Mapping[str, Any], where: Q, timeout_ms: Optional[int] = None) -> List[tuple]:
+    """Agregados de uma partição (roda no processo do pool)."""
+    from src.reports.planner import statement_timeout
+
+    with statement_timeout(timeout_ms):
+        compiled = compile_report(config, where=where, apply_limit=False)
+        return [tuple(row) for row in compiled.iter_rows()]
+
+
+def _sort_key(row_key):
+    # mesma ordem do ORDER BY das dimensões (NULL por último)
+    return tuple((v is None, v if v is not None else 0) for v in row_key)
+
+
+def parallel_rows(
+    config: Optional[Mapping[str, Any]],
+    processes: Optional[int] = None,
+    timeout_ms: Optional[int] = None,
+) -> Optional[Tuple[List[str], Iterator[tuple]]]:
+    """(colunas, linhas) executando as partições no pool; None se não houver partições."""
+    from src.reports.worker import run_partition_in_process
+
+    config = normalize_config(config)
+    processes = processes or _processes()
+    if timeout_ms is None:
+        timeout_ms = getattr(settings, "REPORTS_JOB_STATEMENT_TIMEOUT_MS", None)
+    partitions = plan_partitions(config, processes)
+    if len(partitions) < 2:
+        return None
+
+    n_dims = len(config["dimensions"])
+    totals = {}
+    pool = _pool(processes)
+    futures = [pool.submit(run_partition_in_process, config, where, timeout_ms) for where in partitions]
+    try:
+        for fut in futures:
+            for row in fut.result():
+                key = row[:n_dims]
+                current = totals.get(key)
+                if current is None:
+                    totals[key] = list(row[n_dims:])
+                else:
+                    for i, v in enumerate(row[n_dims:]):
+                        current[i] += v or 0
+    except BrokenProcessPool:
+        _reset_pool()
+        raise
+    except BaseException:
+        for fut in futures:
+            fut.cancel()
+        raise
+
+    columns = compile_report(config).columns
+    if not n_dims and not totals:
+        totals[()] = [0] * len(columns)
+    keys = sorted(totals, key=_sort_key)
+    if config["limit"]:
+        keys = keys[:config["limit"]]
+    return columns, (tuple(k) + tuple(totals[k]) for k in keys)
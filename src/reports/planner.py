@@ -0,0 +1,136 @@
+# src/reports/planner.py
+"""
+Planejamento de relatórios: custo estimado (EXPLAIN) e statement_timeout.
+
+- plan_report(config): compila o config (engine.compile_report), roda EXPLAIN
+  (FORMAT JSON no Postgres) e devolve custo total e linhas estimadas
+- modo pelo custo: <= REPORTS_MAX_SYNC_COST -> "sync" (export em streaming);
+  <= REPORTS_MAX_COST -> "async" (só pela fila/worker); acima -> "reject"
+- statement_timeout(ms): SET LOCAL statement_timeout numa transação; estourou ->
+  ReportTimeoutError (o chamador marca o Report como Failed com o motivo)
+- sem Postgres (dev/SQLite) o EXPLAIN não tem custo: o plano passa como "sync"
+"""
+import json
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+from src.reports.engine import ReportConfigError, compile_report, normalize_config
+from src.reports.incremental import partial_key, supports_incremental
+from src.reports.models import ReportPartial
+
+SYNC, ASYNC, REJECT = "sync", "async", "reject"
+# SQLSTATE query_canceled (statement_timeout)
+QUERY_CANCELED = "57014"
+
+
+class ReportBudgetError(ReportConfigError):
+    """Custo estimado acima de REPORTS_MAX_COST."""
+
+
+class ReportTimeoutError(Exception):
+    """Query do relatório passou do statement_timeout."""
+
+
+@dataclass
+class ReportPlan:
+    cost: Optional[float]
+    rows: Optional[float]
+    mode: str
+    reason: str = ""
+    sql: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "cost": self.cost,
+            "estimated_rows": self.rows,
+            "mode": self.mode,
+            "reason": self.reason or None,
+            "max_sync_cost": _max_sync_cost(),
+            "max_cost": _max_cost(),
+        }
+
+
+def _max_sync_cost() -> float:
+    return getattr(settings, "REPORTS_MAX_SYNC_COST", 1_000_000)
+
+
+def _max_cost() -> float:
+    return getattr(settings, "REPORTS_MAX_COST", 50_000_000)
+
+
+def _explain_queryset(config: Mapping[str, Any]):
+    # source append-only com parciais: o custo real é só o da faixa nova (pk > hwm)
+    pk_gt = None
+    if supports_incremental(config):
+        pk_gt = (
+            ReportPartial.objects.filter(config_hash=partial_key(config))
+            .values_list("high_water_id", flat=True).first()
+        )
+    return compile_report(config, pk_gt=pk_gt).as_queryset()
+
+
+def _mode_for(cost: Optional[float]):
+    if cost is None or cost <= _max_sync_cost():
+        return SYNC, ""
+    if cost <= _max_cost():
+        return ASYNC, f"Estimated cost {cost:,.0f} is above the synchronous budget ({_max_sync_cost():,.0f})."
+    return REJECT, (
+        f"Estimated cost {cost:,.0f} exceeds the report budget ({_max_cost():,.0f}); "
+        "narrow the date range or filters, or use fewer dimensions."
+    )
+
+
+def plan_report(config: Optional[Mapping[str, Any]]) -> ReportPlan:
+    """EXPLAIN da query do config. ReportConfigError se o config for inválido."""
+    config = normalize_config(config)
+    qs = _explain_queryset(config)
+    cost = rows = None
+    if connections[qs.db].vendor == "postgresql":
+        plan = json.loads(qs.explain(format="json"))[0]["Plan"]
+        cost, rows = plan["Total Cost"], plan["Plan Rows"]
+    mode, reason = _mode_for(cost)
+    return ReportPlan(cost=cost, rows=rows, mode=mode, reason=reason, sql=str(qs.query))
+
+
+def check_budget(config: Optional[Mapping[str, Any]], plan: Optional[ReportPlan] = None) -> ReportPlan:
+    """
+    plan_report + ReportBudgetError se o custo passar de REPORTS_MAX_COST.
+    plan: já calculado pelo chamador (não roda o EXPLAIN de novo).
+    """
+    if plan is None:
+        plan = plan_report(config)
+    if plan.mode == REJECT:
+        raise ReportBudgetError(plan.reason)
+    return plan
+
+
+def _is_timeout(exc: BaseException) -> bool:
+    cause = exc.__cause__
+    code = getattr(cause, "pgcode", None) or getattr(cause, "sqlstate", None)
+    return code == QUERY_CANCELED
+
+
+@contextmanager
+def statement_timeout(ms: Optional[int], using: str = DEFAULT_DB_ALIAS):
+    """
+    Transação com statement_timeout local (vale para cada query dentro do bloco).
+    ms vazio/0 ou fora do Postgres -> sem limite e sem transação extra.
+    Timeout -> ReportTimeoutError (a transação é desfeita).
+    """
+    conn = connections[using]
+    if not ms or conn.vendor != "postgresql":
+        yield
+        return
+    try:
+        with transaction.atomic(using=using):
+            with conn.cursor() as cur:
+                cur.execute("SELECT set_config('statement_timeout', %s, true)", [str(int(ms))])
+            yield
+    except OperationalError as e:
+        if _is_timeout(e):
+            raise ReportTimeoutError(f"Report query exceeded the statement timeout ({int(ms)} ms).") from e
+        raise
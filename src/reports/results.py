@@ -0,0 +1,223 @@
+# src/reports/results.py
+"""
+Resultado colunar dos relatórios para paginar na UI sem refazer a query.
+
+- o job (run_job) grava, na mesma passada do export, o resultado em Arrow IPC
+  formato *file* (com footer: acesso aleatório por RecordBatch), sem compressão,
+  no blob store; registrado como ReportArtifact de formato "columnar" (mesmo LRU
+  e refcount dos outros arquivos) e apontado por ReportJob.result_blob
+- leitura por memory map (pa.memory_map + read_all é zero-copy): uma página é
+  um slice da tabela; só as páginas tocadas do arquivo entram na memória
+- ordenação: sort_indices da coluna uma vez por (blob, coluna, direção), gravado
+  ao lado em REPORTS_OUTPUT_DIR/results_index/ (Arrow, também lido por mmap);
+  as próximas páginas são um take() dos índices, sem ordenar de novo
+- nada disso toca o Postgres depois do job; sem pyarrow o recurso fica desligado
+"""
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional
+
+from src.reports import blobs
+from src.reports.cache import ArtifactWriter, content_key, lookup, output_dir, source_rows
+from src.reports.export import HAS_PYARROW, ChunkSink, arrow_batch, pa
+from src.reports.incremental import refresh_for
+from src.reports.models import ReportArtifact, ReportBlob
+from src.reports.planner import statement_timeout
+
+try:
+    import pyarrow.compute as pc  # opcional: vem com o pyarrow
+except Exception:
+    pc = None
+
+logger = logging.getLogger(__name__)
+
+COLUMNAR_FORMAT = "columnar"
+RESULT_BATCH_ROWS = 64 * 1024
+MAX_PAGE_ROWS = 1000
+
+
+def enabled() -> bool:
+    return HAS_PYARROW
+
+
+def result_key(config: Optional[Mapping[str, Any]]) -> str:
+    return content_key(config, COLUMNAR_FORMAT)
+
+
+class ColumnarWriter:
+    """
+    Recebe as linhas (start/add/publish/abort, o "tee" de cache.get_or_build) e grava o
+    Arrow IPC file no blob store. Erro ao converter não derruba o export: o resultado
+    colunar só deixa de existir.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.columns: List[str] = []
+        self.rows = 0
+        self.failed = False
+        self._pending: List[tuple] = []
+        self._schema = None
+        self._ipc = None
+        self._sink = ChunkSink()
+        self._out = None
+
+    def start(self, columns: List[str]) -> None:
+        # arquivo temporário só quando as linhas começam (export do cache nem chama)
+        self.columns = list(columns)
+        self._out = ArtifactWriter(self.key, COLUMNAR_FORMAT)
+
+    def add(self, row: tuple) -> None:
+        if self.failed:
+            return
+        self._pending.append(tuple(row))
+        if len(self._pending) >= RESULT_BATCH_ROWS:
+            self._flush()
+
+    def _flush(self) -> None:
+        try:
+            self._schema, batch = arrow_batch(self.columns, self._pending, self._schema)
+            if self._ipc is None:
+                self._ipc = pa.ipc.new_file(self._sink, self._schema)
+            if batch.num_rows:
+                self._ipc.write_batch(batch)
+            self._out.write(self._sink.drain())
+        except Exception:
+            logger.exception("Resultado colunar %s descartado", self.key)
+            self.abort()
+        self.rows += len(self._pending)
+        self._pending = []
+
+    def abort(self) -> None:
+        if not self.failed:
+            self.failed = True
+            if self._out is not None:
+                self._out.abort()
+
+    def publish(self) -> Optional[ReportArtifact]:
+        if self.failed or self._out is None:
+            return None
+        if self._pending or self._ipc is None:
+            self._flush()
+            if self.failed:
+                return None
+        self._ipc.close()
+        self._out.write(self._sink.drain())
+        return self._out.publish(self.rows)
+
+
+def result_writer(config: Optional[Mapping[str, Any]]) -> Optional[ColumnarWriter]:
+    """Writer para o tee do export; None se desligado ou o resultado já existe."""
+    if not enabled():
+        return None
+    key = result_key(config)
+    if ReportArtifact.objects.filter(key=key).exists():
+        return None
+    return ColumnarWriter(key)
+
+
+def get_or_build_result(
+    config: Optional[Mapping[str, Any]], parallel: bool = False, timeout_ms: Optional[int] = None,
+) -> Optional[ReportArtifact]:
+    """
+    Resultado colunar do config (gera sozinho se o export veio do cache sem ele).
+    timeout_ms vale só para a query, como em cache.get_or_build.
+    """
+    if not enabled():
+        return None
+    key = result_key(config)
+    artifact = lookup(key)
+    if artifact is not None:
+        return artifact
+    refresh_for(config)
+    writer = ColumnarWriter(key)
+    try:
+        with statement_timeout(timeout_ms):
+            columns, rows = source_rows(config, parallel, refresh=False)
+            writer.start(columns)
+            for row in rows:
+                writer.add(row)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.publish()
+
+
+# ---------------------------------------------------------------------
+# Leitura (memory map)
+# ---------------------------------------------------------------------
+
+def _read_mapped(path: Path):
+    return pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+
+
+def open_table(blob: ReportBlob):
+    """Tabela Arrow do resultado, mapeada do arquivo. FileNotFoundError se o blob sumiu."""
+    return _read_mapped(blobs.blob_path(blob.hash, blob.codec))
+
+
+def index_dir() -> Path:
+    return output_dir() / "results_index"
+
+
+def _index_path(blob_hash: str, column: int, descending: bool) -> Path:
+    return index_dir() / blob_hash[:2] / f"{blob_hash}.{column}.{'desc' if descending else 'asc'}.arrow"
+
+
+def _sort_index(table, blob_hash: str, column: str, descending: bool):
+    path = _index_path(blob_hash, table.column_names.index(column), descending)
+    if not path.is_file():
+        order = "descending" if descending else "ascending"
+        indices = pc.sort_indices(table, sort_keys=[(column, order)])  # null por último (padrão)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.part")
+        index_table = pa.table({"i": indices})
+        with pa.OSFile(str(tmp), "wb") as fh, pa.ipc.new_file(fh, index_table.schema) as writer:
+            writer.write_table(index_table)
+        os.replace(tmp, path)
+    return _read_mapped(path).column(0)
+
+
+def read_page(
+    blob: ReportBlob, offset: int = 0, limit: int = 100,
+    sort: Optional[str] = None, descending: bool = False,
+) -> Dict[str, Any]:
+    """Página do resultado. ValueError se a coluna de ordenação não existir."""
+    table = open_table(blob)
+    if sort and sort not in table.column_names:
+        raise ValueError(f"Unknown sort column: {sort}.")
+    total = table.num_rows
+    offset = min(max(0, offset), total)
+    limit = max(1, min(limit, MAX_PAGE_ROWS))
+
+    if sort:
+        page = table.take(_sort_index(table, blob.hash, sort, descending).slice(offset, limit))
+    else:
+        page = table.slice(offset, limit)
+    columns = [page.column(i).to_pylist() for i in range(page.num_columns)]
+    end = offset + page.num_rows
+    return {
+        "columns": table.column_names,
+        "rows": [list(row) for row in zip(*columns)],
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "sort": (f"-{sort}" if descending else sort) if sort else None,
+        "next_offset": end if end < total else None,
+    }
+
+
+def remove_stale_indexes() -> int:
+    """Índices de ordenação de blobs que já saíram do blob store. Retorna quantos."""
+    root = index_dir()
+    if not root.is_dir():
+        return 0
+    known = set(ReportBlob.objects.values_list("hash", flat=True))
+    removed = 0
+    for path in root.glob("*/*"):
+        if path.name.partition(".")[0] not in known:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
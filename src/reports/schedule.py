@@ -0,0 +1,189 @@
+# src/reports/schedule.py
+"""
+Agendamento de relatórios.
+
+Report.config["schedule"] = {"cron": "0 3 * * 1-5", "format": "csv", "timezone": "America/New_York"}
+(cron de 5 campos: minuto hora dia mês dia-da-semana; aceita * , - / e @hourly/@daily/@weekly/@monthly)
+
+- Report.next_run_at (indexado) guarda a próxima execução
+- run_due_reports: pega os vencidos com FOR UPDATE SKIP LOCKED, enfileira o ReportJob
+  e avança next_run_at na mesma transação -> vários nós rodando o scheduler
+  nunca enfileiram a mesma execução duas vezes
+- execuções perdidas (scheduler parado) viram UMA execução de recuperação; a
+  próxima é calculada a partir de agora
+- erro ao enfileirar um relatório (qualquer exceção) fica nele: savepoint próprio,
+  Report Failed com o motivo e next_run_at avança do mesmo jeito
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Mapping, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+    "@yearly": "0 0 1 1 *",
+}
+# (mínimo, máximo) de cada campo; dia da semana aceita 0-7 (0 e 7 = domingo)
+_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+_ALL_DAYS = frozenset(range(1, 32))
+_ALL_WEEKDAYS = frozenset(range(0, 7))
+MAX_SEARCH_DAYS = 366 * 5
+
+
+class CronError(ValueError):
+    pass
+
+
+def _parse_field(expr: str, lo: int, hi: int) -> frozenset:
+    values = set()
+    for part in expr.split(","):
+        step = 1
+        if "/" in part:
+            part, _, step_s = part.partition("/")
+            if not step_s.isdigit() or int(step_s) < 1:
+                raise CronError(f"Invalid step in '{expr}'.")
+            step = int(step_s)
+        if part == "*":
+            start, end = lo, hi
+        elif "-" in part:
+            a, _, b = part.partition("-")
+            if not (a.isdigit() and b.isdigit()):
+                raise CronError(f"Invalid range in '{expr}'.")
+            start, end = int(a), int(b)
+        elif part.isdigit():
+            start = int(part)
+            end = hi if step > 1 else start
+        else:
+            raise CronError(f"Invalid cron field '{expr}'.")
+        if start < lo or end > hi or start > end:
+            raise CronError(f"Value out of range in '{expr}'.")
+        values.update(range(start, end + 1, step))
+    if hi == 7 and 7 in values:  # domingo também pode ser 7
+        values.discard(7)
+        values.add(0)
+    return frozenset(values)
+
+
+class Cron:
+    def __init__(self, expr: str):
+        expr = ALIASES.get((expr or "").strip().lower(), (expr or "").strip())
+        fields = expr.split()
+        if len(fields) != 5:
+            raise CronError("Cron expression must have 5 fields (minute hour day month weekday).")
+        self.expr = expr
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            _parse_field(f, lo, hi) for f, (lo, hi) in zip(fields, _RANGES)
+        )
+        # semântica do cron: dia do mês e dia da semana restritos -> vale qualquer um dos dois;
+        # "irrestrito" é cobrir o intervalo todo (*, */1, 1-31, 0-7...), não só o "*" literal
+        self._dom_any = self.days == _ALL_DAYS
+        self._dow_any = self.weekdays == _ALL_WEEKDAYS
+
+    def _day_matches(self, d: datetime) -> bool:
+        dom = d.day in self.days
+        dow = (d.isoweekday() % 7) in self.weekdays
+        if self._dom_any or self._dow_any:
+            return dom and dow
+        return dom or dow
+
+    def next_after(self, after: datetime) -> datetime:
+        """Próximo horário (> after) que casa com a expressão, no fuso de `after`."""
+        t = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = after + timedelta(days=MAX_SEARCH_DAYS)
+        while t <= limit:
+            if t.month not in self.months:
+                year, month = (t.year + 1, 1) if t.month == 12 else (t.year, t.month + 1)
+                t = t.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(t):
+                t = (t + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if t.hour not in self.hours:
+                t = (t + timedelta(hours=1)).replace(minute=0)
+                continue
+            if t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+                continue
+            return t
+        raise CronError(f"Cron expression '{self.expr}' never matches.")
+
+
+def get_schedule(config: Optional[Mapping[str, Any]]) -> Optional[Mapping[str, Any]]:
+    schedule = (config or {}).get("schedule") if isinstance(config, Mapping) else None
+    if isinstance(schedule, str):
+        schedule = {"cron": schedule}
+    if not isinstance(schedule, Mapping) or not schedule.get("cron") or schedule.get("enabled") is False:
+        return None
+    return schedule
+
+
+def next_run_for(config: Optional[Mapping[str, Any]], after: Optional[datetime] = None) -> Optional[datetime]:
+    """Próxima execução do schedule do config (None se não houver / inválido)."""
+    schedule = get_schedule(config)
+    if schedule is None:
+        return None
+    try:
+        tz = ZoneInfo(schedule.get("timezone") or timezone.get_default_timezone_name())
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning("Timezone inválido no schedule: %s", schedule.get("timezone"))
+        return None
+    try:
+        cron = Cron(schedule["cron"])
+    except CronError as e:
+        logger.warning("Cron inválido no schedule (%s): %s", schedule.get("cron"), e)
+        return None
+    local = (after or timezone.now()).astimezone(tz)
+    return cron.next_after(local)
+
+
+def run_due_reports(now: Optional[datetime] = None, batch_size: int = 50) -> int:
+    """Enfileira os relatórios vencidos. Retorna quantos foram enfileirados."""
+    from src.reports.counters import set_status
+    from src.reports.jobs import enqueue_report
+    from src.reports.models import Report
+
+    now = now or timezone.now()
+    queued = 0
+    with transaction.atomic():
+        due = list(
+            Report.objects
+            # of=self: não trava os ReportConfigBlob (divididos entre relatórios) do select_related
+            .select_for_update(skip_locked=True, of=("self",))
+            .filter(next_run_at__lte=now)
+            .order_by("next_run_at")
+            .select_related("config_blob")
+            .only("id", "next_run_at", "config_blob__codec", "config_blob__data")[:batch_size]
+        )
+        for report in due:
+            next_run = None
+            try:
+                # savepoint por relatório: um erro não desfaz os outros do lote
+                with transaction.atomic():
+                    next_run = next_run_for(report.config, now)
+                    if next_run is not None and next_run_for(report.config, report.next_run_at) <= now:
+                        logger.info(
+                            "Relatório %s: execuções perdidas desde %s, rodando uma vez", report.pk, report.next_run_at,
+                        )
+                    if next_run is not None:
+                        enqueue_report(report, get_schedule(report.config).get("format") or "csv")
+                        queued += 1
+            except Exception as e:
+                if isinstance(e, ValueError):
+                    # config inválido / acima do orçamento
+                    logger.warning("Relatório agendado %s não enfileirado: %s", report.pk, e)
+                    reason = str(e)
+                else:
+                    logger.exception("Falha ao enfileirar o relatório agendado %s", report.pk)
+                    reason = f"{type(e).__name__}: {e}"
+                set_status(Report.objects.filter(pk=report.pk), Report.Status.FAILED, status_reason=reason[:5000])
+            Report.objects.filter(pk=report.pk).update(next_run_at=next_run)
+    return queued
@@ -1,3 +1,673 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import tempfile
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock, skipUnless
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connections
+from django.db.models.signals import post_save
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from src.company.models import Company
+from src.forms.models import FormSubmission
+from src.reports.cache import content_key
+from src.reports.export import EXPORTERS, HAS_OPENPYXL, HAS_PYARROW
+from src.reports.counters import rebuild_counters, set_status, totals_by_status
+from src.reports.engine import ReportConfigError, compile_report, data_watermark, normalize_config
+from src.reports.incremental import incremental_rows
+from src.reports.jobs import claim_jobs, requeue_stale_jobs, run_job, touch_jobs
+from src.reports import blobs, configs, parallel, planner, results
+from src.reports.admin import ReportAdmin
+from src.reports.models import (
+    Report, ReportArtifact, ReportBlob, ReportConfigBlob, ReportJob, ReportPartial, ReportSourceVersion,
+)
+from src.reports.parallel import parallel_rows, plan_partitions
+from src.reports.planner import ReportPlan, ReportTimeoutError
+from src.reports.results import MAX_PAGE_ROWS, read_page
+from src.reports.schedule import Cron, CronError, run_due_reports
+from src.users.models import Profile
+
+
+class ReportConfigCompilerTests(TestCase):
+    def test_scalar_and_list_filters_compile(self):
+        compiled = compile_report({
+            "source": "forms",
+            "dimensions": ["formType", "date:month"],
+            "measures": ["count", "count_distinct:email"],
+            "filters": {"state": ["TX", "FL"], "formType": "referral"},
+        })
+        self.assertEqual(compiled.columns, ["formType", "date_month", "count", "distinct_email"])
+        self.assertEqual(list(compiled.iter_rows()), [])
+        self.assertEqual(compile_report({"source": "users", "filters": {"is_active": True}}).columns, ["count"])
+
+    def test_equivalent_configs_normalize_the_same(self):
+        a = normalize_config({"source": "leads", "filters": {"state": ["TX", "FL"]}})
+        b = normalize_config({"source": "form_submissions", "filters": {"state": ["FL", "TX"]}, "measures": ["count"]})
+        self.assertEqual(a, b)
+
+    def test_invalid_configs_raise_config_error(self):
+        bad = [
+            {"source": "nope"},
+            {"source": "forms", "dimensions": ["password"]},
+            {"source": "forms", "measures": ["sum:email"]},
+            {"source": "forms", "dimensions": ["date:hour"]},
+            {"source": "forms", "filters": {"email": "a@example.com"}},
+            {"source": "forms", "filters": {"state": {"$ne": "TX"}}},
+            {"source": "forms", "filters": {"state": [["TX"]]}},
+            {"source": "forms", "filters": {"state": [None]}},
+            {"source": "users", "filters": {"is_active": "maybe"}},
+            {"source": "forms", "date_range": {"from": "yesterday"}},
+            {"source": "forms", "limit": "all"},
+        ]
+        for config in bad:
+            with self.subTest(config=config), self.assertRaises(ReportConfigError):
+                compile_report(config)
+
+    def test_watermark_skips_unindexed_date_columns(self):
+        user = get_user_model().objects.create_user("u1", password="x")
+        self.assertEqual(data_watermark(normalize_config({"source": "users"})), [None, user.pk, 0])
+        last_date, _, _ = data_watermark(normalize_config({"source": "activity"}))
+        self.assertIsNone(last_date)
+
+
+class SourceVersionTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("u1", password="x")
+        self.key = lambda: content_key({"source": "users", "dimensions": ["company"]}, "csv")
+
+    def test_related_profile_change_expires_the_cache_key(self):
+        before = self.key()
+        profile = Profile.objects.get_or_create(user=self.user)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.company = Company.objects.create(name="Acme")
+            profile.save()
+        self.assertNotEqual(self.key(), before)
+
+    def test_user_flags_expire_the_cache_key(self):
+        before = self.key()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_staff = True
+            self.user.save(update_fields=["is_staff"])
+        self.assertNotEqual(self.key(), before)
+
+    def test_unrelated_update_keeps_the_cache_key(self):
+        before = self.key()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.last_login = timezone.now()
+            self.user.save(update_fields=["last_login"])
+        self.assertEqual(self.key(), before)
+
+    def test_insert_into_the_source_table_does_not_bump_the_version(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            FormSubmission.objects.create(formType="homepage", state="TX")
+        self.assertFalse(ReportSourceVersion.objects.filter(source="form_submissions").exists())
+
+
+class StaleJobTests(TestCase):
+    def setUp(self):
+        owner = get_user_model().objects.create_user("owner", password="x")
+        self.report = Report.objects.create(name="r", owner=owner, config={"source": "forms"})
+
+    def test_long_running_job_with_heartbeat_is_not_requeued(self):
+        job = ReportJob.objects.create(report=self.report)
+        claim_jobs(worker="w")
+        # começou há uma hora, mas o worker continua renovando o heartbeat
+        ReportJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        touch_jobs([job.pk])
+        self.assertEqual(requeue_stale_jobs(), 0)
+
+        ReportJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale_jobs(), 1)
+        self.assertEqual(ReportJob.objects.get(pk=job.pk).status, ReportJob.Status.QUEUED)
+
+
+@override_settings(REPORTS_JOB_STATEMENT_TIMEOUT_MS=1234)
+class RunJobTransactionTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.enterContext(override_settings(REPORTS_OUTPUT_DIR=tmp.name))
+        owner = get_user_model().objects.create_user("owner", password="x")
+        report = Report.objects.create(name="r", owner=owner, config={"source": "forms", "dimensions": ["state"]})
+        FormSubmission.objects.create(formType="homepage", state="TX")
+        self.job = ReportJob.objects.create(report=report)
+        claim_jobs(worker="w")
+
+    def _run_recording_writes(self, models):
+        """run_job com statement_timeout falso; devolve (job, timeouts, [(model, dentro do timeout?)])."""
+        inside, timeouts, writes = [False], [], []
+
+        @contextmanager
+        def fake_timeout(ms, using="default"):
+            timeouts.append(ms)
+            inside[0] = True
+            try:
+                yield
+            finally:
+                inside[0] = False
+
+        def record(sender, **kwargs):
+            writes.append((sender.__name__, inside[0]))
+
+        for model in models:
+            post_save.connect(record, sender=model)
+            self.addCleanup(post_save.disconnect, record, sender=model)
+        with mock.patch("src.reports.cache.statement_timeout", fake_timeout), \
+                mock.patch("src.reports.results.statement_timeout", fake_timeout):
+            job = run_job(self.job.pk)
+        return job, timeouts, writes
+
+    def test_blobs_and_artifacts_are_recorded_outside_the_timeout(self):
+        job, timeouts, writes = self._run_recording_writes((ReportArtifact, ReportBlob))
+        self.assertEqual(job.status, ReportJob.Status.DONE)
+        self.assertTrue(timeouts)
+        self.assertEqual(set(timeouts), {1234})
+        self.assertTrue(writes)
+        self.assertFalse([name for name, in_timeout in writes if in_timeout])
+
+    @override_settings(REPORTS_INCREMENTAL_LAG_SECONDS=0)
+    def test_partial_is_refreshed_before_the_timeout_transaction(self):
+        job, _, writes = self._run_recording_writes((ReportPartial,))
+        self.assertEqual(job.status, ReportJob.Status.DONE)
+        self.assertTrue(writes)
+        self.assertFalse([name for name, in_timeout in writes if in_timeout])
+
+
+class CronTests(TestCase):
+    start = datetime(2025, 1, 1, 12, 0, tzinfo=ZoneInfo("UTC"))  # quarta-feira
+
+    def test_sunday_as_7(self):
+        self.assertEqual(Cron("0 0 * * 7").weekdays, frozenset({0}))
+        self.assertEqual(Cron("0 0 * * 5-7").weekdays, frozenset({5, 6, 0}))
+        self.assertEqual(Cron("0 0 * * 7").next_after(self.start), datetime(2025, 1, 5, tzinfo=ZoneInfo("UTC")))
+
+    def test_steps(self):
+        self.assertEqual(Cron("*/15 * * * *").minutes, frozenset({0, 15, 30, 45}))
+        self.assertEqual(Cron("0 8-18/5 * * *").hours, frozenset({8, 13, 18}))
+        self.assertEqual(Cron("*/20 * * * *").next_after(self.start), self.start + timedelta(minutes=20))
+
+    def test_day_of_month_or_day_of_week(self):
+        # os dois restritos: dia 10 OU segunda-feira
+        self.assertEqual(Cron("0 0 10 * 1").next_after(self.start), datetime(2025, 1, 6, tzinfo=ZoneInfo("UTC")))
+        # */1 no dia do mês é irrestrito: só a segunda-feira vale
+        self.assertEqual(Cron("0 0 */1 * 1").next_after(self.start), datetime(2025, 1, 6, tzinfo=ZoneInfo("UTC")))
+        self.assertEqual(Cron("0 0 10 * */1").next_after(self.start), datetime(2025, 1, 10, tzinfo=ZoneInfo("UTC")))
+
+    def test_invalid_expressions(self):
+        for expr in ("* * * *", "60 * * * *", "0 0 * * 8", "0 0 0 * *", "*/0 * * * *", "a * * * *"):
+            with self.subTest(expr=expr), self.assertRaises(CronError):
+                Cron(expr)
+
+
+class RunDueReportsTests(TestCase):
+    def test_failing_report_is_marked_and_advanced(self):
+        owner = get_user_model().objects.create_user("owner", password="x")
+        config = {"source": "forms", "schedule": {"cron": "@daily", "timezone": "UTC"}}
+        broken = Report.objects.create(name="broken", owner=owner, config=config)
+        fine = Report.objects.create(name="fine", owner=owner, config=config)
+        due = timezone.now() - timedelta(minutes=1)
+        Report.objects.update(next_run_at=due)
+
+        from src.reports import jobs
+        real_enqueue = jobs.enqueue_report
+
+        def enqueue(report, fmt="csv", user=None):
+            if report.pk == broken.pk:
+                raise RuntimeError("boom")
+            return real_enqueue(report, fmt, user)
+
+        with mock.patch("src.reports.jobs.enqueue_report", side_effect=enqueue), \
+                self.assertLogs("src.reports.schedule", "ERROR"):
+            self.assertEqual(run_due_reports(), 1)
+
+        broken.refresh_from_db()
+        self.assertEqual(broken.status, Report.Status.FAILED)
+        self.assertIn("boom", broken.status_reason)
+        self.assertGreater(broken.next_run_at, timezone.now())
+        self.assertTrue(ReportJob.objects.filter(report=fine).exists())
+
+
+@override_settings(REPORTS_INCREMENTAL_LAG_SECONDS=0)
+class IncrementalReportTests(TestCase):
+    configs = [
+        {"source": "forms", "dimensions": ["state"]},
+        {"source": "forms", "dimensions": ["formType", "date:month"], "filters": {"state": ["TX", "FL"]}},
+        {"source": "forms", "dimensions": ["date:day"], "date_range": {"last_days": 3}},
+        {"source": "forms", "dimensions": ["state", "formType"], "limit": 2},
+        {"source": "forms"},
+    ]
+
+    def _add(self, days_ago, state, form_type="homepage"):
+        sub = FormSubmission.objects.create(formType=form_type, state=state)
+        FormSubmission.objects.filter(pk=sub.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        return sub
+
+    def assertMatchesFullRecompute(self):
+        for config in self.configs:
+            with self.subTest(config=config):
+                full = compile_report(config)
+                columns, rows = incremental_rows(config)
+                self.assertEqual(columns, full.columns)
+                self.assertEqual(list(rows), list(full.iter_rows()))
+
+    def test_partials_match_a_full_recompute(self):
+        for i, state in enumerate(["TX", "FL", "TX", "NY", None, "FL"]):
+            self._add(i, state, "referral" if i % 2 else "homepage")
+        # 1ª passada só anota o hwm pendente; 2ª promove para os parciais
+        self.assertMatchesFullRecompute()
+        self.assertMatchesFullRecompute()
+        self.assertTrue(ReportPartial.objects.filter(source="form_submissions", high_water_id__gt=0).exists())
+
+        self._add(0, "TX")
+        self._add(10, "CA")
+        self.assertMatchesFullRecompute()
+
+    def test_dates_come_back_as_datetimes(self):
+        self._add(1, "TX")
+        for _ in range(2):
+            _, rows = incremental_rows({"source": "forms", "dimensions": ["date:day"]})
+            self.assertIsInstance(next(rows)[0], datetime)
+
+    def test_relative_window_uses_one_partial(self):
+        self._add(1, "TX")
+        incremental_rows({"source": "forms", "dimensions": ["state"], "date_range": {"last_days": 7}})
+        incremental_rows({"source": "forms", "dimensions": ["state"], "date_range": {"last_days": 30}})
+        incremental_rows({"source": "forms", "dimensions": ["state"]})
+        self.assertEqual(ReportPartial.objects.count(), 1)
+
+    def test_updates_and_deletes_invalidate_partials(self):
+        subs = [self._add(i, "TX") for i in range(3)]
+        self.assertMatchesFullRecompute()
+        self.assertMatchesFullRecompute()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            subs[0].state = "FL"
+            subs[0].save()
+        self.assertFalse(ReportPartial.objects.exists())
+        self.assertMatchesFullRecompute()
+        self.assertMatchesFullRecompute()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            subs[1].delete()
+        self.assertMatchesFullRecompute()
+
+        # PATCH da API usa .update()
+        admin = get_user_model().objects.create_superuser("admin", password="x")
+        self.client.force_login(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/forms/{subs[2].pk}/", {"state": "NY"}, content_type="application/json")
+        self.assertEqual(FormSubmission.objects.get(pk=subs[2].pk).state, "NY")
+        self.assertMatchesFullRecompute()
+
+
+class _InlinePool:
+    """Executor que roda a partição na hora (o banco de teste não é visível em processos spawn)."""
+
+    def submit(self, fn, *args):
+        fut = Future()
+        fut.set_result(fn(*args))
+        return fut
+
+
+@override_settings(REPORTS_PARALLEL_PROCESSES=2)
+class ParallelReportTests(TestCase):
+    configs = [
+        {"source": "forms", "dimensions": ["state"]},
+        {"source": "forms", "dimensions": ["company", "date:month"], "measures": ["count", "count_distinct:email"]},
+        {"source": "forms", "dimensions": ["date:day"], "measures": ["count_distinct:email"]},
+        {"source": "forms", "measures": ["count"]},
+        {"source": "forms", "dimensions": ["state"], "limit": 1},
+    ]
+
+    def setUp(self):
+        acme, globex = Company.objects.create(name="Acme"), Company.objects.create(name="Globex")
+        tz = timezone.get_current_timezone()
+        rows = [
+            (acme, "TX", "a@x.com", datetime(2025, 1, 5, 10, tzinfo=tz)),
+            (acme, "FL", "b@x.com", datetime(2025, 1, 31, 23, tzinfo=tz)),
+            (globex, "TX", "a@x.com", datetime(2025, 2, 1, 0, tzinfo=tz)),
+            (globex, "TX", "c@x.com", datetime(2025, 3, 15, 12, tzinfo=tz)),
+            (None, "NY", "a@x.com", datetime(2025, 3, 15, 13, tzinfo=tz)),
+        ]
+        for company, state, email, created in rows:
+            FormSubmission.objects.create(
+                formType="homepage", company=company, state=state, email=email, created_at=created,
+            )
+
+    def test_partitioned_merge_matches_the_serial_query(self):
+        with mock.patch("src.reports.parallel._pool", return_value=_InlinePool()):
+            for config in self.configs:
+                with self.subTest(config=config):
+                    self.assertGreaterEqual(len(plan_partitions(config)), 2)
+                    columns, rows = parallel_rows(config)
+                    compiled = compile_report(config)
+                    self.assertEqual(columns, compiled.columns)
+                    self.assertEqual(list(rows), [tuple(r) for r in compiled.iter_rows()])
+
+    def test_pool_is_reused_between_reports(self):
+        self.addCleanup(parallel._reset_pool)
+        pool = parallel._pool(2)
+        self.assertIs(parallel._pool(2), pool)
+        self.assertIsNot(parallel._pool(3), pool)
+
+
+class ExporterRoundTripTests(TestCase):
+    columns = ["state", "day", "count"]
+    rows = [
+        ("TX", datetime(2025, 1, 2, tzinfo=ZoneInfo("UTC")), 3),
+        (None, datetime(2025, 1, 3, tzinfo=ZoneInfo("UTC")), 1),
+        ("FL", None, 0),
+    ]
+
+    def _read(self, fmt, data):
+        """Arquivo exportado -> (colunas, linhas) em texto, para comparar formatos."""
+        if fmt in ("csv", "csv.gz"):
+            text = (gzip.decompress(data) if fmt == "csv.gz" else data).decode()
+            header, *body = list(csv.reader(io.StringIO(text)))
+            return header, [[v or None for v in r[:2]] + [int(r[2])] for r in body]
+        if fmt == "jsonl":
+            objs = [json.loads(line) for line in data.decode().splitlines()]
+            return list(objs[0]), [list(o.values()) for o in objs]
+        if fmt == "xlsx":
+            from openpyxl import load_workbook
+            header, *body = load_workbook(io.BytesIO(data), read_only=True).active.iter_rows(values_only=True)
+            return list(header), [[r[0], r[1].isoformat() if r[1] else None, r[2]] for r in body]
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.ipc.open_stream(data).read_all() if fmt == "arrow" else pq.read_table(io.BytesIO(data))
+        return table.column_names, [
+            [r["state"], r["day"].isoformat() if r["day"] else None, r["count"]] for r in table.to_pylist()
+        ]
+
+    def test_each_exporter_round_trips(self):
+        expected = [
+            [s, d.isoformat() if d else None, c] for s, d, c in self.rows
+        ]
+        with override_settings(TIME_ZONE="UTC"):
+            for fmt, exporter in EXPORTERS.items():
+                with self.subTest(fmt=fmt):
+                    data = b"".join(exporter(self.columns, iter(self.rows)))
+                    columns, rows = self._read(fmt, data)
+                    self.assertEqual(columns, self.columns)
+                    if fmt == "xlsx":  # Excel não guarda fuso
+                        rows = [[s, d and d.replace("T00:00:00", "T00:00:00+00:00"), c] for s, d, c in rows]
+                    self.assertEqual(rows, expected)
+        self.assertEqual({"xlsx", "arrow", "parquet"} <= set(EXPORTERS), HAS_OPENPYXL and HAS_PYARROW)
+
+
+@override_settings(ROOT_URLCONF="ehgdashback.urls_asgi")
+class AsgiExportStreamingTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser("admin", password="x")
+        self.report = Report.objects.create(
+            name="by state", owner=self.user, config={"source": "forms", "dimensions": ["state"]},
+        )
+        for state in ("TX", "FL", "TX"):
+            FormSubmission.objects.create(formType="homepage", state=state)
+
+    async def test_export_streams_with_an_async_iterator(self):
+        await self.async_client.aforce_login(self.user)
+        url = f"/api/reports/{self.report.pk}/export/?format=csv"
+        for _ in range(2):  # gerado na hora, depois servido do cache
+            resp = await self.async_client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            self.assertTrue(resp.is_async)
+            body = b"".join([chunk async for chunk in resp.streaming_content])
+            self.assertEqual(body.decode().splitlines(), ["state,count", "FL,1", "TX,2"])
+
+
+class ExportRoutingTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.enterContext(override_settings(REPORTS_OUTPUT_DIR=tmp.name))
+        self.user = get_user_model().objects.create_user("viewer", password="x")
+        self.client.force_login(self.user)
+        self.report = Report.objects.create(
+            name="by state", owner=self.user, config={"source": "forms", "dimensions": ["state"]},
+        )
+        FormSubmission.objects.create(formType="homepage", state="TX")
+        self.url = f"/api/reports/{self.report.pk}/export/?format=csv"
+
+    def export(self, cost):
+        plan = ReportPlan(cost=cost, rows=1, mode=planner._mode_for(cost)[0], reason=planner._mode_for(cost)[1])
+        with mock.patch("src.reports.api.views.plan_report", return_value=plan) as explain, \
+                mock.patch("src.reports.planner.plan_report", side_effect=AssertionError("EXPLAIN ran twice")):
+            resp = self.client.get(self.url)
+        self.assertEqual(explain.call_count, 1)
+        return resp
+
+    @override_settings(REPORTS_MAX_SYNC_COST=100, REPORTS_MAX_COST=1000)
+    def test_cheap_report_streams(self):
+        resp = self.export(10)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(b"".join(resp.streaming_content).decode().splitlines(), ["state,count", "TX,1"])
+        self.assertFalse(ReportJob.objects.exists())
+
+    @override_settings(REPORTS_MAX_SYNC_COST=100, REPORTS_MAX_COST=1000)
+    def test_expensive_report_is_queued_with_the_same_plan(self):
+        resp = self.export(500)
+        self.assertEqual(resp.status_code, 202)
+        self.assertEqual(resp.json()["plan"]["mode"], "async")
+        job = ReportJob.objects.get()
+        self.assertEqual(resp.json()["job"]["id"], job.pk)
+        self.assertEqual(Report.objects.get(pk=self.report.pk).status, Report.Status.PROCESSING)
+
+    @override_settings(REPORTS_MAX_SYNC_COST=100, REPORTS_MAX_COST=1000)
+    def test_report_over_budget_is_rejected(self):
+        resp = self.export(5000)
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json()["plan"]["mode"], "reject")
+        self.assertFalse(ReportJob.objects.exists())
+
+
+class StatementTimeoutTests(TestCase):
+    def setUp(self):
+        self.conn = connections["default"]
+        self.enterContext(mock.patch.object(self.conn, "vendor", "postgresql"))
+        self.cursor = mock.MagicMock()
+        self.enterContext(mock.patch.object(self.conn, "cursor", return_value=self.cursor))
+
+    def test_timeout_is_local_to_its_transaction(self):
+        depth = len(self.conn.savepoint_ids)
+        with planner.statement_timeout(1500):
+            # SET LOCAL (is_local=true) dentro de um atomic próprio: some no commit/rollback
+            self.assertTrue(self.conn.in_atomic_block)
+            self.assertEqual(len(self.conn.savepoint_ids), depth + 1)
+        self.assertEqual(len(self.conn.savepoint_ids), depth)
+        calls = self.cursor.__enter__.return_value.execute.call_args_list
+        self.assertEqual([c.args[0].split(" ")[0] for c in calls], ["SAVEPOINT", "SELECT", "RELEASE"])
+        self.assertEqual(calls[1], mock.call("SELECT set_config('statement_timeout', %s, true)", ["1500"]))
+
+    def test_no_limit_means_no_transaction(self):
+        depth = len(self.conn.savepoint_ids)
+        with planner.statement_timeout(0):
+            self.assertEqual(len(self.conn.savepoint_ids), depth)
+        self.cursor.__enter__.return_value.execute.assert_not_called()
+
+    def test_query_canceled_becomes_report_timeout(self):
+        canceled = Exception("canceling statement due to statement timeout")
+        canceled.pgcode = planner.QUERY_CANCELED
+        with self.assertRaises(ReportTimeoutError):
+            with planner.statement_timeout(1500):
+                raise OperationalError("timeout") from canceled
+        with self.assertRaises(OperationalError):
+            with planner.statement_timeout(1500):
+                raise OperationalError("other")
+
+
+class ReportPreviewPermissionTests(TestCase):
+    url = "/api/reports/preview/"
+    body = {"config": {"source": "users", "dimensions": ["is_staff"]}}
+
+    def test_non_admin_is_forbidden(self):
+        self.client.force_login(get_user_model().objects.create_user("viewer", password="x"))
+        resp = self.client.post(self.url, self.body, content_type="application/json")
+        self.assertEqual(resp.status_code, 403)
+
+    def test_admin_gets_the_preview(self):
+        self.client.force_login(get_user_model().objects.create_superuser("admin", password="x"))
+        resp = self.client.post(self.url, self.body, content_type="application/json")
+        self.assertEqual(resp.status_code, 200)
+
+
+@skipUnless(HAS_PYARROW, "resultado colunar precisa do pyarrow")
+class ReportResultsTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.enterContext(override_settings(REPORTS_OUTPUT_DIR=tmp.name))
+        user = get_user_model().objects.create_user("viewer", password="x")
+        self.client.force_login(user)
+        self.report = Report.objects.create(
+            name="by state", owner=user, config={"source": "forms", "dimensions": ["state"]},
+        )
+        for state in ("TX", "TX", "TX", "FL", "NY", "NY", "CA"):
+            FormSubmission.objects.create(formType="homepage", state=state)
+        job = ReportJob.objects.create(report=self.report)
+        claim_jobs(worker="w")
+        self.job = run_job(job.pk)
+        self.url = f"/api/reports/{self.report.pk}/results/"
+
+    def get(self, **params):
+        return self.client.get(self.url, params)
+
+    def test_offset_and_limit(self):
+        data = self.get(offset=1, limit=2).json()
+        self.assertEqual(data["columns"], ["state", "count"])
+        self.assertEqual(data["rows"], [["FL", 1], ["NY", 2]])
+        self.assertEqual((data["total"], data["offset"], data["limit"], data["next_offset"]), (4, 1, 2, 3))
+        self.assertEqual(data["job"], self.job.pk)
+        last = self.get(offset=3, limit=2).json()
+        self.assertEqual((last["rows"], last["next_offset"]), ([["TX", 3]], None))
+        past_end = self.get(offset=99).json()
+        self.assertEqual((past_end["rows"], past_end["offset"]), ([], 4))
+
+    def test_limit_is_clamped(self):
+        page = read_page(self.job.result_blob, limit=10 ** 6)
+        self.assertEqual(page["limit"], MAX_PAGE_ROWS)
+        self.assertEqual(read_page(self.job.result_blob, limit=0)["limit"], 1)
+
+    def test_sort_both_ways(self):
+        asc = self.get(sort="state").json()
+        self.assertEqual([r[0] for r in asc["rows"]], ["CA", "FL", "NY", "TX"])
+        self.assertEqual(asc["sort"], "state")
+        desc = self.get(sort="-count", limit=2).json()
+        self.assertEqual(desc["rows"], [["TX", 3], ["NY", 2]])
+        self.assertEqual(desc["sort"], "-count")
+        # página seguinte sai do índice gravado, na mesma ordem
+        self.assertEqual(self.get(sort="-count", offset=2).json()["rows"][0][1], 1)
+        self.assertEqual(len(list(Path(results.index_dir()).glob("*/*.arrow"))), 2)
+
+    def test_unknown_sort_column_is_rejected(self):
+        resp = self.get(sort="-nope")
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("nope", resp.json()["detail"])
+
+    def test_expired_result_is_gone(self):
+        blob = self.job.result_blob
+        blobs.blob_path(blob.hash, blob.codec).unlink()
+        self.assertEqual(self.get().status_code, 410)
+        self.assertEqual(self.client.get(f"/api/reports/{self.report.pk}/jobs/{self.job.pk}/results/").status_code, 410)
+
+
+class ReportListPaginationTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("viewer", password="x")
+        self.client.force_login(self.user)
+        for i in range(3):
+            Report.objects.create(name=f"r{i}", owner=self.user)
+
+    def test_legacy_page_shape_by_default(self):
+        data = self.client.get("/api/reports/", {"page": 2, "page_size": 2}).json()
+        self.assertEqual(set(data), {"results", "count", "page", "page_size"})
+        self.assertEqual((data["count"], data["page"], len(data["results"])), (3, 2, 1))
+
+    def test_cursor_opts_into_keyset(self):
+        first = self.client.get("/api/reports/", {"cursor": "", "page_size": 2}).json()
+        self.assertEqual(set(first), {"results", "next_cursor", "page_size"})
+        second = self.client.get("/api/reports/", {"cursor": first["next_cursor"], "page_size": 2}).json()
+        self.assertIsNone(second["next_cursor"])
+        names = [r["name"] for r in first["results"] + second["results"]]
+        self.assertEqual(sorted(names), ["r0", "r1", "r2"])
+
+
+class StatusCounterTests(TestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser("admin", password="x")
+        self.report = Report.objects.create(name="r", owner=self.admin, status=Report.Status.READY)
+
+    def assertCountersMatchTable(self):
+        counted = totals_by_status()
+        rebuild_counters()
+        self.assertEqual({k: v for k, v in counted.items() if v}, totals_by_status())
+
+    def test_patch_after_concurrent_set_status(self):
+        self.client.force_login(self.admin)
+        stale = Report.objects.get(pk=self.report.pk)
+        set_status(Report.objects.filter(pk=self.report.pk), Report.Status.FAILED)
+        resp = self.client.patch(f"/api/reports/{self.report.pk}/", {"name": "renamed"}, content_type="application/json")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(Report.objects.get(pk=self.report.pk).status, Report.Status.FAILED)
+        self.assertCountersMatchTable()
+        # save() completo com status carregado antes da mudança: delta a partir do banco
+        stale.save()
+        self.assertCountersMatchTable()
+
+    def test_delete_after_concurrent_set_status(self):
+        stale = Report.objects.get(pk=self.report.pk)
+        set_status(Report.objects.filter(pk=self.report.pk), Report.Status.FAILED)
+        stale.delete()
+        self.assertCountersMatchTable()
+        self.assertFalse(any(totals_by_status().values()))
+
+
+class ReportConfigStorageTests(TestCase):
+    config = {"source": "forms", "dimensions": ["state"], "filters": {"state": ["TX", "FL"]}}
+
+    def refcount(self, report):
+        return ReportConfigBlob.objects.get(pk=Report.objects.get(pk=report.pk).config_blob_id).refcount
+
+    def test_config_is_compressed_in_the_database(self):
+        report = Report.objects.create(name="r", config=self.config)
+        blob = ReportConfigBlob.objects.get()
+        self.assertEqual(report.config_blob_id, blob.hash)
+        self.assertNotIn(b'"source"', bytes(blob.data))
+        self.assertEqual(Report.objects.get(pk=report.pk).config, self.config)
+        # listagem com config: um SELECT só
+        with self.assertNumQueries(1):
+            self.assertEqual([r.config for r in Report.objects.select_related("config_blob")], [self.config])
+
+    def test_duplicates_share_the_blob(self):
+        original = Report.objects.create(name="r", config=self.config)
+        ReportAdmin(Report, admin.site).duplicate_reports(mock.Mock(), Report.objects.all())
+        copy = Report.objects.exclude(pk=original.pk).get()
+        self.assertEqual(copy.config_blob_id, original.config_blob_id)
+        self.assertEqual(ReportConfigBlob.objects.count(), 1)
+        self.assertEqual(self.refcount(original), 2)
+
+        copy.delete()
+        self.assertEqual(self.refcount(original), 1)
+
+    def test_changing_the_config_moves_the_reference(self):
+        report = Report.objects.create(name="r", config=self.config)
+        old_hash = report.config_blob_id
+        loaded = Report.objects.only("id").get(pk=report.pk)
+        loaded.config = {**self.config, "limit": 10}
+        loaded.save(update_fields=["updated_at"])
+        self.assertNotEqual(Report.objects.get(pk=report.pk).config_blob_id, old_hash)
+        self.assertEqual(ReportConfigBlob.objects.get(pk=old_hash).refcount, 0)
+        self.assertEqual(self.refcount(report), 1)
+
+        self.assertEqual(configs.rebuild_refcounts(), 0)
+        self.assertEqual(configs.collect(grace_seconds=0), 1)
+        self.assertFalse(ReportConfigBlob.objects.filter(pk=old_hash).exists())
@@ -0,0 +1,78 @@
+# src/reports/versions.py
+"""
+Versão por source dos dados dos relatórios (ReportSourceVersion), parte da marca
+d'água do cache de resultados (engine.data_watermark).
+
+- max(pk)/max(data) só enxergam INSERT; UPDATE/DELETE em campos lidos pela source
+  (data, dimensões, filtros, count_distinct; inclusive nos models ligados, ex.:
+  Profile.company/user_type/user_role dos usuários) sobem a versão no commit:
+  signals ligados em apps.ready
+- INSERT na tabela da própria source não sobe a versão (o max(pk) já muda); nos
+  models ligados sobe (ex.: Profile novo de um usuário que já existia)
+- save() com update_fields fora dos campos lidos (ex.: last_login) não sobe
+- .update()/bulk_update não disparam signals: quem grava assim chama
+  incremental.invalidate_for_update, que também sobe a versão
+"""
+from functools import lru_cache, partial as bind
+from typing import Any, Dict, Iterable, Optional, Set
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from src.reports.engine import get_source, source_fields, source_keys
+from src.reports.models import ReportSourceVersion
+
+
+@lru_cache(maxsize=1)
+def _tracked_fields() -> Dict[str, Dict[Any, Set[str]]]:
+    """source -> model -> campos (name e attname) lidos pela source."""
+    return {key: source_fields(get_source(key)) for key in source_keys()}
+
+
+@lru_cache(maxsize=1)
+def _source_models() -> Dict[str, Any]:
+    return {key: get_source(key).model for key in source_keys()}
+
+
+def tracked_models() -> Set[Any]:
+    return {model for by_model in _tracked_fields().values() for model in by_model}
+
+
+def bump(source_key: str) -> None:
+    updated = ReportSourceVersion.objects.filter(source=source_key).update(
+        version=F("version") + 1, updated_at=timezone.now(),
+    )
+    if not updated:
+        try:
+            with transaction.atomic():
+                ReportSourceVersion.objects.create(source=source_key, version=1)
+        except IntegrityError:
+            ReportSourceVersion.objects.filter(source=source_key).update(
+                version=F("version") + 1, updated_at=timezone.now(),
+            )
+
+
+def bump_for_update(model, fields: Optional[Iterable[str]] = None, created: bool = False) -> None:
+    """
+    Linhas de `model` mudaram nesses campos (None = qualquer um): sobe, no commit, a
+    versão das sources que leem algum deles. created: INSERT (ignorado na própria source).
+    """
+    fields = None if fields is None else set(fields)
+    own = _source_models()
+    for source_key, by_model in _tracked_fields().items():
+        used = by_model.get(model)
+        if not used or (created and own[source_key] is model):
+            continue
+        if fields is None or fields & used:
+            transaction.on_commit(bind(bump, source_key))
+
+
+def source_saved(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    bump_for_update(sender, None if created else update_fields, created=created)
+
+
+def source_deleted(sender, instance, **kwargs):
+    bump_for_update(sender)
@@ -0,0 +1,22 @@
+# src/reports/worker.py
+"""
+Pontos de entrada dos processos do pool do run_report_worker.
+Sem imports de models no topo: o processo filho ("spawn") importa este módulo
+antes de rodar o initializer, quando o Django ainda não foi carregado.
+"""
+
+
+def init_process():
+    import django
+    django.setup()
+
+
+def run_job_in_process(job_id):
+    from src.reports.jobs import run_job
+    job = run_job(job_id)
+    return job.id, job.status, job.rows, job.duration_ms
+
+
+def run_partition_in_process(config, where, timeout_ms=None):
+    from src.reports.parallel import run_partition
+    return run_partition(config, where, timeout_ms)
@@ -1,6 +1,6 @@
 # src/sheets/admin.py
 from django.contrib import admin
-from .models import SheetData
+from .models import SheetData, SheetSyncState
 
 @admin.register(SheetData)
 class SheetDataAdmin(admin.ModelAdmin):
@@ -43,4 +43,10 @@ class SheetDataAdmin(admin.ModelAdmin):
         # ('Appointment Details', {
         #     'fields': ('appointment_date', 'appointment_time', 'appointment_method', 'contact_preference', 'user_suggestions')
         # }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(SheetSyncState)
+class SheetSyncStateAdmin(admin.ModelAdmin):
+    list_display = ('spreadsheet_id', 'range_name', 'rows', 'synced_at', 'content_hash')
+    readonly_fields = ('content_hash', 'rows', 'synced_at')
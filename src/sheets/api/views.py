@@ -1,41 +1,116 @@
 # src/sheets/api/views.py
+from datetime import datetime, time, timedelta
+
 from django.db.models import F, Q
 from django.forms import model_to_dict
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import status
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from src.common.ratelimit import check_form_type
+from src.common.zipcodes import enrich_location
 from src.company.models import Company
+from src.sheets.importer import ImportFormatError, import_sheet_file
 from src.sheets.models import SheetData
+from src.sheets.stats import get_sheet_stats
+from src.users.api.views import _is_admin, _safe_int
+
+
+SHEET_DATA_FIELDS = (
+    'id', 'zipCode', 'coverageType', 'insuranceCoverage',
+    'householdIncome', 'firstName', 'lastName', 'dob', 'address',
+    'datetime', 'city', 'state', 'email', 'phone', 'company',
+    'formType', 'referrerFirstName', 'referrerEmail',
+)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def _day_start(value):
+    d = parse_date(value or '')
+    if not d:
+        return None
+    return timezone.make_aware(datetime.combine(d, time.min))
 
 
 class SheetDataListAPIView(APIView):
     def get(self, request):
-        company_param = request.query_params.get('company')
+        """
+        Sem paginação (formato antigo): lista com todas as linhas.
+        Paginada por keyset (id decrescente) só quando pedida com ?cursor= ou ?page_size=:
+          {results, next_cursor, page_size}
+        Filtros: company (id ou nome), formType, insuranceCoverage,
+                 from/to (YYYY-MM-DD, sobre datetime)
+        """
+        params = request.query_params
+        paginated = 'cursor' in params or 'page_size' in params
+        qs = SheetData.objects.all()
 
+        # company por id ou nome, via join (sem buscar a Company antes)
+        company_param = (params.get('company') or '').strip()
         if company_param:
-            try:
-                if company_param.isdigit():
-                    company_obj = Company.objects.get(id=int(company_param))
-                else:
-                    company_obj = Company.objects.get(name__iexact=company_param)
-
-                sheetsdata = SheetData.objects.filter(company=company_obj.id)
-            except Company.DoesNotExist:
+            if company_param.isdigit():
+                company_q = Q(id=int(company_param))
+                qs = qs.filter(company_id=int(company_param))
+            else:
+                company_q = Q(name__iexact=company_param)
+                qs = qs.filter(company__name__iexact=company_param)
+            # empresa inexistente é 404 (paginado ou não)
+            if not Company.objects.filter(company_q).exists():
                 return Response({'error': 'Empresa não encontrada.'}, status=404)
-        else:
-            sheetsdata = SheetData.objects.all()
-
-        data = sheetsdata.values(
-            'id', 'zipCode', 'coverageType', 'insuranceCoverage',
-            'householdIncome', 'firstName', 'lastName', 'dob', 'address',
-            'datetime', 'city', 'state', 'email', 'phone', 'company',
-            'formType', 'referrerFirstName', 'referrerEmail',
-            company_name=F('company__name')
+
+        form_type = (params.get('formType') or '').strip()
+        if form_type:
+            qs = qs.filter(formType=form_type)
+
+        coverage = (params.get('insuranceCoverage') or '').strip()
+        if coverage:
+            qs = qs.filter(insuranceCoverage__iexact=coverage)
+
+        date_from = _day_start(params.get('from'))
+        if date_from:
+            qs = qs.filter(datetime__gte=date_from)
+        date_to = _day_start(params.get('to'))
+        if date_to:
+            qs = qs.filter(datetime__lt=date_to + timedelta(days=1))
+
+        if not paginated:
+            return Response(list(qs.values(*SHEET_DATA_FIELDS, company_name=F('company__name'))))
+
+        cursor = _safe_int(params.get('cursor'))
+        if cursor:
+            qs = qs.filter(id__lt=cursor)
+
+        page_size = _safe_int(params.get('page_size'), DEFAULT_PAGE_SIZE) or DEFAULT_PAGE_SIZE
+        page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+
+        # busca page_size + 1 para saber se existe próxima página
+        rows = list(
+            qs.order_by('-id')
+            .values(*SHEET_DATA_FIELDS, company_name=F('company__name'))[:page_size + 1]
         )
-        return Response(list(data))  # garante lista no retorno
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+
+        return Response({
+            'results': rows,
+            'next_cursor': rows[-1]['id'] if has_next else None,
+            'page_size': page_size,
+        })
 
     def post(self, request):
         form_type = request.data.get('formType', 'homepage')
+        throttled = check_form_type(request, form_type)
+        if throttled is not None:
+            return throttled
+        city, state = enrich_location(
+            request.data.get('zipCode'), request.data.get('city'), request.data.get('state')
+        )
         sheet_data = SheetData.objects.create(
             zipCode=request.data.get('zipCode'),
             coverageType=request.data.get('coverageType'),
@@ -46,8 +121,8 @@ class SheetDataListAPIView(APIView):
             dob=request.data.get('dob'),
             address=request.data.get('address'),
             datetime=request.data.get('datetime'),
-            city=request.data.get('city'),
-            state=request.data.get('state'),
+            city=city,
+            state=state,
             email=request.data.get('email'),
             phone=request.data.get('phone'),
             company_id=request.data.get('company'),
@@ -66,22 +141,43 @@ class SheetDataListAPIView(APIView):
 
 class SheetStatsAPIView(APIView):
     def get(self, request):
-        total_users = SheetData.objects.count()
+        # uma query agrupada por empresa, em cache até o próximo write em SheetData
+        return Response(get_sheet_stats())
 
-        h4h_users = SheetData.objects.filter(
-            Q(company__name__iexact='H4hInsurance') |
-            Q(company__name__iexact='h4hinsurance') |
-            Q(company__name__iexact='H4HInsurance')
-        ).count()
 
-        qol_users = SheetData.objects.filter(
-            Q(company__name__iexact='qolinsurance') |
-            Q(company__name__iexact='QoLInsurance') |
-            Q(company__name__iexact='QoL')
-        ).count()
+class SheetImportAPIView(APIView):
+    """
+    POST /sheets/import/ (multipart: file=<.csv|.xlsx>, formType?, company?)
+    Importa o arquivo em streaming para SheetData (COPY no Postgres).
+    Resposta: imported, method, rejected (total) e rejected_rows (linha + motivo).
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
 
-        return Response({
-            'total_users': total_users,
-            'h4h_users': h4h_users,
-            'qol_users': qol_users,
-        })
+    def post(self, request):
+        if not _is_admin(request):
+            return Response({"detail": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
+
+        upload = request.FILES.get("file")
+        if not upload:
+            return Response({"detail": "file is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            imported, method, rejected = import_sheet_file(
+                upload.file,
+                upload.name,
+                form_type=request.data.get("formType") or "homepage",
+                company_id=_safe_int(request.data.get("company")),
+            )
+        except ImportFormatError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(
+            {
+                "imported": imported,
+                "method": method,
+                "rejected": rejected.count,
+                "rejected_rows": rejected.rows,
+            },
+            status=status.HTTP_201_CREATED,
+        )
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class SheetsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "src.sheets"
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+
+        from .models import SheetData
+        from .stats import invalidate_sheet_stats
+
+        post_save.connect(invalidate_sheet_stats, sender=SheetData, dispatch_uid="sheets_stats_save")
+        post_delete.connect(invalidate_sheet_stats, sender=SheetData, dispatch_uid="sheets_stats_delete")
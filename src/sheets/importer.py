@@ -0,0 +1,252 @@
+# src/sheets/importer.py
+"""
+Import de arquivos CSV/XLSX locais para SheetData, sem passar pela API do Google.
+
+- o arquivo é lido em streaming (csv.reader / openpyxl read_only), linha a linha
+- cada linha passa pela mesma normalização do sync (row_to_fields); linhas que não
+  cabem nas colunas são rejeitadas uma a uma e voltam no relatório (RejectedRows)
+- no Postgres as linhas vão direto para um COPY ... FROM STDIN alimentado por um
+  gerador (memória constante); em outros bancos, bulk_create em chunks
+"""
+import csv
+import io
+import logging
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Iterable, Iterator, List, Optional
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from src.company.models import Company
+from .models import SheetData
+from .stats import invalidate_sheet_stats
+from .utils import row_to_fields
+
+try:
+    from openpyxl import load_workbook  # opcional: só para .xlsx
+    HAS_OPENPYXL = True
+except Exception:
+    HAS_OPENPYXL = False
+    load_workbook = None
+
+logger = logging.getLogger(__name__)
+
+BULK_CHUNK_SIZE = 5000
+# detalhe das linhas rejeitadas devolvido ao chamador (a contagem é sempre total)
+MAX_REJECTED_DETAILS = 100
+
+# Colunas na ordem que row_to_fields espera + apelidos aceitos no header do arquivo
+CANONICAL_COLUMNS = [
+    ("zip", {"zip", "zipcode", "zip_code", "postal_code"}),
+    ("plan", {"plan", "coveragetype", "coverage_type"}),
+    ("type", {"type", "insurancecoverage", "insurance_coverage", "insurance"}),
+    ("income", {"income", "householdincome", "household_income"}),
+    ("firstname", {"firstname", "first_name", "first name"}),
+    ("lastname", {"lastname", "last_name", "last name"}),
+    ("birth", {"birth", "dob", "date_of_birth", "birthdate"}),
+    ("address", {"address"}),
+    ("state", {"state"}),
+    ("email", {"email", "e-mail"}),
+    ("phone", {"phone", "phone_number", "telephone"}),
+]
+
+# Colunas do COPY: as que vêm de cada linha + as fixas do import inteiro
+RECORD_FIELDS = [
+    "zipCode", "coverageType", "insuranceCoverage", "householdIncome",
+    "firstName", "lastName", "dob", "address", "city", "state", "email", "phone",
+]
+FIXED_FIELDS = ["formType", "datetime", "company"]
+COPY_FIELDS = RECORD_FIELDS + FIXED_FIELDS
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+@dataclass
+class RejectedRows:
+    """Linhas ignoradas no import: total + as primeiras (linha do arquivo, motivo)."""
+    count: int = 0
+    rows: List[dict] = field(default_factory=list)
+
+    def add(self, line: int, error: Exception) -> None:
+        self.count += 1
+        if len(self.rows) < MAX_REJECTED_DETAILS:
+            self.rows.append({"line": line, "error": str(error)})
+
+
+def _cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _column_positions(header: List[str]) -> Optional[List[Optional[int]]]:
+    """
+    Posição de cada coluna canônica no arquivo, pelo nome do header.
+    None se o header não for reconhecido (usa a ordem da planilha original).
+    """
+    names = [(h or "").strip().lower() for h in header]
+    positions = []
+    for _, aliases in CANONICAL_COLUMNS:
+        positions.append(next((i for i, n in enumerate(names) if n in aliases), None))
+    return positions if any(p is not None for p in positions) else None
+
+
+def iter_file_rows(fileobj, filename: str) -> Iterator[List[str]]:
+    """Linhas do arquivo (header incluído) como listas de str, em streaming."""
+    name = (filename or "").lower()
+    if name.endswith(".xlsx"):
+        if not HAS_OPENPYXL:
+            raise ImportFormatError("XLSX import requires openpyxl (pip install openpyxl).")
+        wb = load_workbook(fileobj, read_only=True, data_only=True)
+        try:
+            for row in wb.active.iter_rows(values_only=True):
+                yield [_cell(v) for v in row]
+        finally:
+            wb.close()
+    elif name.endswith(".csv"):
+        text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+        try:
+            yield from csv.reader(text)
+        finally:
+            text.detach()  # não fecha o arquivo do chamador
+    else:
+        raise ImportFormatError("Unsupported file type (use .csv or .xlsx).")
+
+
+def iter_sheet_records(rows: Iterable[List[str]], rejected: Optional[RejectedRows] = None) -> Iterator[dict]:
+    """
+    Header -> mapeamento de colunas; cada linha -> campos normalizados do SheetData.
+    Linhas que row_to_fields recusa vão para `rejected` (número da linha no arquivo).
+    """
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        return
+    positions = _column_positions(header)
+    for line, row in enumerate(rows, start=2):
+        if not any(c.strip() for c in row if c):
+            continue
+        if positions is not None:
+            row = [row[p] if p is not None and p < len(row) else "" for p in positions]
+        try:
+            yield row_to_fields(row)
+        except Exception as e:
+            logger.warning("Linha %d ignorada no import: %s", line, e)
+            if rejected is not None:
+                rejected.add(line, e)
+
+
+class _CopyStream:
+    """File-like (read) que serializa os registros em CSV sob demanda para o COPY."""
+
+    def __init__(self, lines: Iterator[str]):
+        self._lines = lines
+        self._buf = ""
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buf) < size:
+            try:
+                self._buf += next(self._lines)
+            except StopIteration:
+                break
+        if size < 0:
+            out, self._buf = self._buf, ""
+        else:
+            out, self._buf = self._buf[:size], self._buf[size:]
+        return out
+
+
+def _csv_lines(records: Iterator[dict], extra: dict, counter: list, batch: int = 1000) -> Iterator[str]:
+    """Registros -> blocos de CSV (batch linhas por bloco) no formato do COPY."""
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    # valores fixos (formType, datetime, company) serializados uma vez só
+    tail = []
+    for f in FIXED_FIELDS:
+        v = extra[f]
+        tail.append("\\N" if v is None else (v.isoformat() if hasattr(v, "isoformat") else v))
+
+    pending = 0
+    for rec in records:
+        values = []
+        for f in RECORD_FIELDS:
+            v = rec[f]
+            values.append("\\N" if v is None else (v.isoformat() if f == "dob" else v))
+        writer.writerow(values + tail)
+        pending += 1
+        if pending >= batch:
+            counter[0] += pending
+            pending = 0
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+    if pending:
+        counter[0] += pending
+        yield out.getvalue()
+
+
+def _copy(records, extra) -> int:
+    table = connection.ops.quote_name(SheetData._meta.db_table)
+    columns = ", ".join(connection.ops.quote_name(SheetData._meta.get_field(f).column) for f in COPY_FIELDS)
+    sql = f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    counter = [0]
+    lines = _csv_lines(records, extra, counter)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, "copy_expert"):      # psycopg2
+            raw.copy_expert(sql, _CopyStream(lines), size=1 << 16)
+        else:                                # psycopg 3
+            with raw.copy(sql) as copy:
+                for line in lines:
+                    copy.write(line)
+    return counter[0]
+
+
+@transaction.atomic
+def _bulk_create(records, extra) -> int:
+    total = 0
+    chunk = []
+    for rec in records:
+        chunk.append(SheetData(**{**rec, **extra}))
+        if len(chunk) >= BULK_CHUNK_SIZE:
+            SheetData.objects.bulk_create(chunk)
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        SheetData.objects.bulk_create(chunk)
+        total += len(chunk)
+    return total
+
+
+def import_sheet_file(fileobj, filename: str, *, form_type: str = "homepage",
+                      company_id: Optional[int] = None, use_copy: Optional[bool] = None):
+    """
+    Importa um CSV/XLSX para SheetData. Retorna (linhas_importadas, método, RejectedRows).
+    use_copy=None -> COPY quando o banco for Postgres.
+    """
+    if company_id is not None and not Company.objects.filter(pk=company_id).exists():
+        raise ImportFormatError("Company not found.")
+    rejected = RejectedRows()
+    records = iter_sheet_records(iter_file_rows(fileobj, filename), rejected)
+    extra = {"formType": form_type or "homepage", "datetime": timezone.now()}
+
+    if use_copy is None:
+        use_copy = connection.vendor == "postgresql"
+    if use_copy:
+        extra["company"] = company_id
+        result = _copy(records, extra), "copy", rejected
+    else:
+        extra["company_id"] = company_id
+        result = _bulk_create(records, extra), "bulk_create", rejected
+    invalidate_sheet_stats()
+    return result
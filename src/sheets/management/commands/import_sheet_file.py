@@ -0,0 +1,38 @@
+# src/sheets/management/commands/import_sheet_file.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from src.sheets.importer import ImportFormatError, import_sheet_file
+
+
+class Command(BaseCommand):
+    help = "Importa um arquivo CSV/XLSX local para SheetData (streaming + COPY no Postgres)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--form-type", default="homepage")
+        parser.add_argument("--company", type=int, default=None, help="id da Company")
+        parser.add_argument("--no-copy", action="store_true", help="força bulk_create em chunks")
+
+    def handle(self, *args, **opts):
+        t0 = time.monotonic()
+        try:
+            with open(opts["path"], "rb") as fh:
+                imported, method, rejected = import_sheet_file(
+                    fh,
+                    opts["path"],
+                    form_type=opts["form_type"],
+                    company_id=opts["company"],
+                    use_copy=False if opts["no_copy"] else None,
+                )
+        except (OSError, ImportFormatError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{imported} linha(s) importada(s) via {method} em {time.monotonic() - t0:.1f}s"
+        ))
+        if rejected.count:
+            self.stdout.write(self.style.WARNING(f"{rejected.count} linha(s) rejeitada(s):"))
+            for item in rejected.rows:
+                self.stdout.write(f"  linha {item['line']}: {item['error']}")
@@ -0,0 +1,21 @@
+# src/sheets/management/commands/sync_sheets.py
+from django.core.management.base import BaseCommand, CommandError
+
+from src.sheets.utils import RANGE_ONE, RANGE_TWO, SPREADSHEET_ONE_ID, SPREADSHEET_TWO_ID, SheetFetchError, sync_sheet
+
+
+class Command(BaseCommand):
+    help = "Sincroniza as planilhas do Google com SheetData (só linhas novas/alteradas)."
+
+    def handle(self, *args, **opts):
+        failed = 0
+        for spreadsheet_id, range_name in ((SPREADSHEET_ONE_ID, RANGE_ONE), (SPREADSHEET_TWO_ID, RANGE_TWO)):
+            try:
+                changed, unchanged = sync_sheet(spreadsheet_id, range_name)
+            except SheetFetchError as e:
+                failed += 1
+                self.stderr.write(f"Falha ao ler {e}; checkpoint mantido")
+                continue
+            self.stdout.write(f"{spreadsheet_id} ({range_name}): {changed} gravada(s), {unchanged} inalterada(s)")
+        if failed:
+            raise CommandError(f"{failed} planilha(s) não sincronizada(s)")
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sheets', '0011_sheetdata_referreremail_sheetdata_referrerfirstname'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sheetdata',
+            name='row_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40, null=True),
+        ),
+        migrations.AddField(
+            model_name='sheetdata',
+            name='source_key',
+            field=models.CharField(blank=True, editable=False, max_length=255, null=True, unique=True),
+        ),
+        migrations.CreateModel(
+            name='SheetSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('spreadsheet_id', models.CharField(max_length=100)),
+                ('range_name', models.CharField(max_length=100)),
+                ('content_hash', models.CharField(blank=True, default='', max_length=40)),
+                ('rows', models.PositiveIntegerField(default=0)),
+                ('synced_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Sheet Sync State',
+                'verbose_name_plural': 'Sheet Sync States',
+                'constraints': [models.UniqueConstraint(fields=('spreadsheet_id', 'range_name'), name='sheets_syncstate_sheet_range_uniq')],
+            },
+        ),
+    ]
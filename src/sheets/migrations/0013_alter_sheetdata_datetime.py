@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sheets', '0012_sheetdata_source_key_row_hash_sheetsyncstate'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sheetdata',
+            name='datetime',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -41,7 +41,7 @@ class SheetData(models.Model):
     lastName = models.CharField(max_length=255, blank=True, null=True)
     dob = models.DateField(null=True, blank=True)
     address = models.CharField(max_length=100, blank=True, null=True)
-    datetime = models.DateTimeField(auto_now_add=True)
+    datetime = models.DateTimeField(auto_now_add=True, db_index=True)
     city = models.CharField(max_length=100, blank=True, null=True)
     state = models.CharField(max_length=100, blank=True, null=True)
     email = models.EmailField()
@@ -50,9 +50,34 @@ class SheetData(models.Model):
     # NOVOS CAMPOS PARA O INDICADOR (REFERRER)
     referrerFirstName=models.CharField(max_length=255, blank=True, null=True)
     referrerEmail=models.EmailField(blank=True, null=True)
+    # Linhas vindas da sincronização de planilhas: "<spreadsheet_id>:<email>" + hash do conteúdo
+    source_key = models.CharField(max_length=255, unique=True, null=True, blank=True, editable=False)
+    row_hash = models.CharField(max_length=40, blank=True, null=True, editable=False)
     def __str__(self):
         return f"{self.firstName} {self.lastName} ({self.formType})"
 
     class Meta:
         verbose_name = "Sheet Data"
         verbose_name_plural = "Sheet Data"
+
+
+class SheetSyncState(models.Model):
+    """
+    Checkpoint da sincronização de cada planilha/range: se o conteúdo não mudou
+    (mesmo content_hash), o próximo sync não grava nada.
+    """
+    spreadsheet_id = models.CharField(max_length=100)
+    range_name = models.CharField(max_length=100)
+    content_hash = models.CharField(max_length=40, blank=True, default="")
+    rows = models.PositiveIntegerField(default=0)
+    synced_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Sheet Sync State"
+        verbose_name_plural = "Sheet Sync States"
+        constraints = [
+            models.UniqueConstraint(fields=["spreadsheet_id", "range_name"], name="sheets_syncstate_sheet_range_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.spreadsheet_id} ({self.range_name})"
@@ -0,0 +1,84 @@
+# src/sheets/stats.py
+"""
+Estatísticas do SheetData para o dashboard.
+
+- uma única query: GROUP BY company, formType, insuranceCoverage com Count; os
+  totais/breakdowns são somados em Python
+- breakdowns pelos valores reais das colunas (a planilha, o POST e o import gravam
+  valores fora das choices): as choices sempre aparecem (0 se não houver), os
+  demais valores entram com o próprio nome e vazio/NULL em OTHER; cada breakdown
+  soma total_users
+- resultado em cache (settings.CACHES); invalidado quando SheetData é gravado:
+  signals para save/delete e chamada explícita nos caminhos em lote
+  (sync da planilha, import de arquivo), que não disparam signals
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import FORM_TYPE_CHOICES, TYPE_CHOICES, SheetData
+
+CACHE_KEY = "sheets:stats:v2"
+CACHE_SECONDS = getattr(settings, "SHEETS_STATS_CACHE_SECONDS", 300)
+OTHER = "other"
+
+# Nomes (lowercase) de cada empresa nos contadores legados do dashboard
+H4H_NAMES = frozenset({"h4hinsurance"})
+QOL_NAMES = frozenset({"qolinsurance", "qol"})
+
+_FORM_TYPES = [v for v, _ in FORM_TYPE_CHOICES]
+_COVERAGES = [v for v, _ in TYPE_CHOICES]
+
+
+def compute_sheet_stats():
+    rows = (
+        SheetData.objects
+        .values("company_id", "company__name", "formType", "insuranceCoverage")
+        .annotate(n=Count("id"))
+        .order_by("company_id")
+    )
+
+    total = h4h = qol = 0
+    by_form_type = dict.fromkeys(_FORM_TYPES, 0)
+    by_coverage = dict.fromkeys(_COVERAGES, 0)
+    by_company = {}
+    for row in rows:
+        n = row["n"]
+        name = row["company__name"]
+        total += n
+        lname = (name or "").lower()
+        if lname in H4H_NAMES:
+            h4h += n
+        elif lname in QOL_NAMES:
+            qol += n
+        form_type = row["formType"] or OTHER
+        by_form_type[form_type] = by_form_type.get(form_type, 0) + n
+        coverage = row["insuranceCoverage"] or OTHER
+        by_coverage[coverage] = by_coverage.get(coverage, 0) + n
+        company = by_company.setdefault(
+            row["company_id"], {"company_id": row["company_id"], "company_name": name, "total": 0},
+        )
+        company["total"] += n
+
+    return {
+        "total_users": total,
+        "h4h_users": h4h,
+        "qol_users": qol,
+        "by_form_type": by_form_type,
+        "by_insurance_coverage": by_coverage,
+        "by_company": list(by_company.values()),
+    }
+
+
+def get_sheet_stats():
+    stats = cache.get(CACHE_KEY)
+    if stats is None:
+        stats = compute_sheet_stats()
+        cache.set(CACHE_KEY, stats, timeout=CACHE_SECONDS)
+    return stats
+
+
+def invalidate_sheet_stats(**kwargs):
+    """Descarta o cache depois do commit (aceita os kwargs dos signals)."""
+    transaction.on_commit(lambda: cache.delete(CACHE_KEY))
@@ -1,3 +1,151 @@
+import io
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from src.sheets.importer import import_sheet_file
+from src.company.models import Company
+from src.sheets.models import SheetData, SheetSyncState
+from src.sheets.stats import compute_sheet_stats, get_sheet_stats
+from src.sheets.utils import SheetFetchError, sync_sheet
+
+
+class SheetImportTests(TestCase):
+    def _csv(self, *rows):
+        lines = ["zip,firstname,address,email"] + [",".join(r) for r in rows]
+        return io.BytesIO("\n".join(lines).encode())
+
+    def test_overlong_values_are_truncated_or_rejected_per_row(self):
+        long_email = "a" * 250 + "@example.com"
+        fh = self._csv(
+            ("12345", "Ann", "x" * 300, "ann@example.com"),
+            ("12345", "Bob", "Main St", long_email),
+            ("12345", "Cy", "Side St", "cy@example.com"),
+        )
+        imported, method, rejected = import_sheet_file(fh, "rows.csv", use_copy=False)
+
+        self.assertEqual((imported, method), (2, "bulk_create"))
+        self.assertEqual(rejected.count, 1)
+        self.assertEqual(rejected.rows[0]["line"], 3)
+        self.assertEqual(len(SheetData.objects.get(firstName="Ann").address), 100)
+        self.assertFalse(SheetData.objects.filter(firstName="Bob").exists())
+
+
+class SheetDataListTests(TestCase):
+    def setUp(self):
+        for i in range(3):
+            SheetData.objects.create(
+                coverageType="individual", insuranceCoverage="Health",
+                householdIncome="0k-15k", email=f"row{i}@example.com",
+            )
+
+    def test_plain_get_keeps_the_bare_list(self):
+        resp = self.client.get("/sheets/sheet-data/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertIsInstance(resp.json(), list)
+        self.assertEqual(len(resp.json()), 3)
+        self.assertEqual(self.client.get("/sheets/sheet-data/?company=999").status_code, 404)
+
+    def test_pagination_is_opt_in(self):
+        first = self.client.get("/sheets/sheet-data/?page_size=2").json()
+        self.assertEqual(len(first["results"]), 2)
+        rest = self.client.get(f"/sheets/sheet-data/?cursor={first['next_cursor']}&page_size=2").json()
+        self.assertEqual(len(rest["results"]), 1)
+        self.assertIsNone(rest["next_cursor"])
+
+    def test_unknown_company_is_404_in_both_modes(self):
+        for query in ("company=999", "company=999&page_size=2", "company=Nope&cursor="):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f"/sheets/sheet-data/?{query}").status_code, 404)
+
+
+class SheetSyncTests(TestCase):
+    SHEET, RANGE = "sheet-1", "Sheet1"
+    HEADER = ["zip", "plan", "type", "income", "first", "last", "dob", "address", "state", "email", "phone"]
+
+    def _row(self, email, first="Ann"):
+        return ["33101", "individual", "Health", "0-15k", first, "Lee", "", "Main St", "FL", email, "5551234567"]
+
+    def _state(self):
+        return SheetSyncState.objects.get(spreadsheet_id=self.SHEET, range_name=self.RANGE)
+
+    def test_diff_upsert_and_checkpoint(self):
+        values = [self.HEADER, self._row("a@example.com"), self._row("b@example.com")]
+        self.assertEqual(sync_sheet(self.SHEET, self.RANGE, values), (2, 0))
+        self.assertEqual(self._state().rows, 2)
+        pk_a = SheetData.objects.get(email="a@example.com").pk
+
+        # mesmo conteúdo: só o checkpoint é lido
+        with self.assertNumQueries(1):
+            self.assertEqual(sync_sheet(self.SHEET, self.RANGE, values), (0, 2))
+
+        # uma linha alterada + uma nova: a inalterada não é regravada
+        values = [self.HEADER, self._row("a@example.com", first="Anna"), self._row("b@example.com"), self._row("c@example.com")]
+        self.assertEqual(sync_sheet(self.SHEET, self.RANGE, values), (2, 1))
+        a = SheetData.objects.get(email="a@example.com")
+        self.assertEqual((a.pk, a.firstName), (pk_a, "Anna"))  # upsert pela source_key, mesma linha
+        self.assertEqual(a.source_key, f"{self.SHEET}:a@example.com")
+        self.assertEqual(SheetData.objects.count(), 3)
+        self.assertEqual(self._state().rows, 3)
+
+    def test_fetch_failure_keeps_the_checkpoint(self):
+        values = [self.HEADER, self._row("a@example.com")]
+        sync_sheet(self.SHEET, self.RANGE, values)
+        before = self._state()
+
+        with mock.patch("src.sheets.utils.get_sheets_service", side_effect=OSError("quota")):
+            with self.assertLogs("src.sheets.utils", "ERROR"), self.assertRaises(SheetFetchError):
+                sync_sheet(self.SHEET, self.RANGE)
+
+        after = self._state()
+        self.assertEqual((after.content_hash, after.rows, after.synced_at), (before.content_hash, 1, before.synced_at))
+        self.assertEqual(SheetData.objects.count(), 1)
+
+
+class SheetStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.h4h = Company.objects.create(name="H4HInsurance")
+        for company, form_type, coverage in (
+            (self.h4h, "homepage", "Health"),
+            (self.h4h, "referral", "healthy"),   # valor legado do sync, fora das choices
+            (None, "landing", "Dental"),          # POST aceita qualquer formType
+            (None, "homepage", ""),
+        ):
+            self._add(company, form_type, coverage)
+
+    def _add(self, company, form_type, coverage):
+        return SheetData.objects.create(
+            company=company, formType=form_type, insuranceCoverage=coverage,
+            coverageType="individual", householdIncome="0k-15k", email="x@example.com",
+        )
+
+    def test_one_query_and_breakdowns_add_up(self):
+        with self.assertNumQueries(1):
+            stats = compute_sheet_stats()
+        self.assertEqual((stats["total_users"], stats["h4h_users"]), (4, 2))
+        self.assertEqual(stats["by_form_type"], {"homepage": 2, "referral": 1, "appointment": 0, "landing": 1})
+        self.assertEqual(
+            stats["by_insurance_coverage"],
+            {"Medicare": 0, "Dental": 1, "Life": 0, "Health": 1, "Vision": 0, "healthy": 1, "other": 1},
+        )
+        self.assertEqual(sum(stats["by_form_type"].values()), stats["total_users"])
+        self.assertEqual(sum(stats["by_insurance_coverage"].values()), stats["total_users"])
+        self.assertEqual(
+            sorted((c["company_id"], c["total"]) for c in stats["by_company"] if c["company_id"]),
+            [(self.h4h.pk, 2)],
+        )
+        self.assertEqual(sum(c["total"] for c in stats["by_company"]), 4)
+
+    def test_cache_is_invalidated_on_commit(self):
+        self.assertEqual(get_sheet_stats()["total_users"], 4)
+        with self.assertNumQueries(0):
+            get_sheet_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            self._add(None, "homepage", "Life")
+        self.assertEqual(get_sheet_stats()["total_users"], 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            row = ["33101", "individual", "Health", "0-15k", "Ann", "Lee", "", "Main St", "FL", "n@example.com", ""]
+            sync_sheet("sheet-1", "Sheet1", [SheetSyncTests.HEADER, row])
+        self.assertEqual(get_sheet_stats()["total_users"], 6)
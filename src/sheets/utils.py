@@ -1,86 +1,256 @@
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
-from .models import SheetData
-from datetime import datetime
+import hashlib
+import json
+import logging
+from datetime import date
+
+from django.db import transaction
+from django.utils import timezone
+
+from src.common.zipcodes import enrich_location
+from .models import (
+    INCOME_CHOICES,
+    PLAN_CHOICES,
+    TYPE_CHOICES,
+    SheetData,
+    SheetSyncState,
+)
+from .stats import invalidate_sheet_stats
+
+logger = logging.getLogger(__name__)
+
+SPREADSHEET_ONE_ID = '1hCCNo_o8bk7IXva1KZt16FfTQX8m54FbQCxevjjNSt0'
+SPREADSHEET_TWO_ID = '1y6lTtqhdQOZSjoJViedVWD3hs9-F-jhgYfYAcp43UM0'
+# Ranges específicos para cada planilha, se necessário
+RANGE_ONE = 'Sheet1'  # Ajuste conforme a aba da primeira planilha
+RANGE_TWO = 'Sheet2!A1:Z100'  # Mantido como você definiu
+
+SYNC_CHUNK_SIZE = 1000
+
+INCOME_MAPPING = {
+    '0-15k': '0k-15k',
+    '15-30k': '15k-25k',
+    '30-50k': '30k-50k',
+    '50-75k': '50k-75k',
+    '75-100k': '75k-100k',
+}
+
+# Campos gravados pelo sync (tudo que vem da planilha + o hash da linha)
+SYNC_FIELDS = [
+    'zipCode', 'coverageType', 'insuranceCoverage', 'householdIncome',
+    'firstName', 'lastName', 'dob', 'address', 'city', 'state', 'email', 'phone',
+]
+
 
 def get_sheets_service():
+    # Import tardio: o cliente do Google só é necessário para o sync via API
+    from google.oauth2.service_account import Credentials
+    from googleapiclient.discovery import build
+
     SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly']
     creds = Credentials.from_service_account_file('credentials.json', scopes=SCOPES)
     service = build('sheets', 'v4', credentials=creds)
     return service
 
+
+class SheetFetchError(Exception):
+    """Falha ao ler a planilha: o sync não grava nada (nem o checkpoint)."""
+
+
 def fetch_spreadsheet_data(spreadsheet_id, range_name):
-    service = get_sheets_service()
     try:
-        sheet = service.spreadsheets()
+        sheet = get_sheets_service().spreadsheets()
         result = sheet.values().get(spreadsheetId=spreadsheet_id, range=range_name).execute()
-        values = result.get('values', [])
-        print(f"Dados brutos da planilha {spreadsheet_id} (range {range_name}): {values}")
-        return values
     except Exception as e:
-        print(f"Erro ao buscar dados da planilha {spreadsheet_id} (range {range_name}): {e}")
-        return []
+        # não devolve []: o checkpoint passaria a ser o de uma planilha vazia
+        logger.error("Erro ao buscar dados da planilha %s (range %s): %s", spreadsheet_id, range_name, e)
+        raise SheetFetchError(f"{spreadsheet_id} ({range_name}): {e}") from e
+    values = result.get('values', [])
+    logger.info("Planilha %s (range %s): %d linha(s)", spreadsheet_id, range_name, len(values))
+    return values
+
+
+# ---------------------------------------------------------------------
+# Normalização (compartilhada com o import de arquivos)
+# ---------------------------------------------------------------------
+
+_INCOME_VALUES = frozenset(v for v, _ in INCOME_CHOICES)
+_PLAN_VALUES = frozenset(v for v, _ in PLAN_CHOICES)
+_COVERAGE_BY_LOWER = {v.lower(): v for v, _ in TYPE_CHOICES}
+
+
+def normalize_income(raw):
+    """'15-30k' -> '15k-25k'; valores já válidos passam; resto -> '0k-15k'."""
+    raw = (raw or '').strip()
+    if raw in _INCOME_VALUES:
+        return raw
+    return INCOME_MAPPING.get(raw, '0k-15k')
+
+
+def normalize_plan(raw):
+    raw = (raw or '').strip().lower()
+    return raw if raw in _PLAN_VALUES else 'individual'
+
+
+def normalize_coverage(raw):
+    return _COVERAGE_BY_LOWER.get((raw or '').strip().lower(), 'Health')
+
+
+def _parse_date(raw):
+    try:
+        return date.fromisoformat(raw)  # 'YYYY-MM-DD'
+    except (TypeError, ValueError):
+        return None
+
+
+_ROW_WIDTH = 11
+
+
+class RowError(ValueError):
+    """Linha que não cabe no SheetData (ex.: email maior que a coluna)."""
+
+
+# texto livre é cortado no tamanho da coluna; nos outros (email) a linha é rejeitada
+_TRUNCATE_FIELDS = frozenset({'zipCode', 'firstName', 'lastName', 'address', 'city', 'state', 'phone'})
+_MAX_LENGTH = {
+    f.name: f.max_length
+    for f in SheetData._meta.concrete_fields
+    if f.name in SYNC_FIELDS and getattr(f, 'max_length', None)
+}
+
+
+def _fit_columns(fields):
+    for name, limit in _MAX_LENGTH.items():
+        value = fields[name]
+        if isinstance(value, str) and len(value) > limit:
+            if name not in _TRUNCATE_FIELDS:
+                raise RowError(f"{name} is longer than {limit} characters.")
+            fields[name] = value[:limit]
+    return fields
+
+
+def row_to_fields(row):
+    """
+    Converte uma linha da planilha (ordem das colunas da planilha original)
+    nos campos do SheetData. Valores maiores que a coluna são cortados ou a
+    linha é rejeitada com RowError: uma linha ruim não derruba o COPY/bulk_create.
+    """
+    # NUL não entra em coluna de texto do Postgres
+    row = [(c or '').replace('\x00', '').strip() for c in row[:_ROW_WIDTH]]
+    if len(row) < _ROW_WIDTH:
+        row += [''] * (_ROW_WIDTH - len(row))
+    zipcode, plan, type_, income, firstname, lastname, birth, address, state, email, phone = row
+
+    city, state = enrich_location(zipcode, '', state)
+    return _fit_columns({
+        'zipCode': zipcode if zipcode.isdigit() else '0',
+        'coverageType': normalize_plan(plan),
+        'insuranceCoverage': normalize_coverage(type_),
+        'householdIncome': normalize_income(income or '0k-15k'),
+        'firstName': firstname,
+        'lastName': lastname,
+        'dob': _parse_date(birth),
+        'address': address,
+        'city': city,
+        'state': state,
+        'email': email or 'unknown@example.com',
+        'phone': phone[:15],
+    })
+
+
+def row_hash(fields):
+    payload = json.dumps([fields[f] for f in SYNC_FIELDS], default=str, separators=(',', ':'))
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def content_hash(values):
+    return hashlib.sha1(json.dumps(values, separators=(',', ':')).encode()).hexdigest()
+
+
+# ---------------------------------------------------------------------
+# Sync
+# ---------------------------------------------------------------------
+
+def apply_sheet_rows(spreadsheet_id, data, chunk_size=SYNC_CHUNK_SIZE):
+    """
+    Aplica as linhas da planilha (data[0] é o header) no SheetData:
+      - calcula o hash de cada linha e compara com os hashes já gravados
+      - só linhas novas/alteradas vão para bulk_create(update_conflicts=True), em chunks
+    Retorna (novas_ou_alteradas, inalteradas).
+    """
+    if not data or len(data) <= 1:
+        logger.info("Nenhum dado encontrado na planilha %s", spreadsheet_id)
+        return 0, 0
+
+    # chave = planilha + email (mesma identidade do antigo update_or_create);
+    # email repetido na planilha: a última linha vence
+    incoming = {}
+    for row in data[1:]:
+        try:
+            fields = row_to_fields(row)
+        except Exception as e:
+            logger.warning("Linha ignorada na planilha %s: %s (%s)", spreadsheet_id, row, e)
+            continue
+        key = f"{spreadsheet_id}:{fields['email'].lower()}"
+        fields['row_hash'] = row_hash(fields)
+        incoming[key] = fields
+
+    stored = dict(
+        SheetData.objects.filter(source_key__startswith=f"{spreadsheet_id}:")
+        .values_list('source_key', 'row_hash')
+    )
+    changed = [
+        SheetData(source_key=key, **fields)
+        for key, fields in incoming.items()
+        if stored.get(key) != fields['row_hash']
+    ]
+
+    for start in range(0, len(changed), chunk_size):
+        SheetData.objects.bulk_create(
+            changed[start:start + chunk_size],
+            update_conflicts=True,
+            unique_fields=['source_key'],
+            update_fields=SYNC_FIELDS + ['row_hash'],
+        )
+    if changed:
+        invalidate_sheet_stats()
+
+    return len(changed), len(incoming) - len(changed)
+
+
+def sync_sheet(spreadsheet_id, range_name, values=None):
+    """
+    Sincroniza uma planilha/range com checkpoint: se o conteúdo for idêntico
+    ao último sync aplicado, custa uma leitura (o checkpoint) e zero escritas.
+    SheetFetchError se a leitura falhar (checkpoint e linhas ficam como estão).
+    """
+    if values is None:
+        values = fetch_spreadsheet_data(spreadsheet_id, range_name)
+    digest = content_hash(values)
+
+    state = SheetSyncState.objects.filter(spreadsheet_id=spreadsheet_id, range_name=range_name).first()
+    if state and state.content_hash == digest:
+        logger.info("Planilha %s (range %s) sem alterações", spreadsheet_id, range_name)
+        return 0, state.rows
+
+    with transaction.atomic():
+        changed, unchanged = apply_sheet_rows(spreadsheet_id, values)
+        if state is None:
+            state = SheetSyncState(spreadsheet_id=spreadsheet_id, range_name=range_name)
+        state.content_hash = digest
+        state.rows = changed + unchanged
+        state.synced_at = timezone.now()
+        state.save()
+    logger.info(
+        "Planilha %s (range %s): %d nova(s)/alterada(s), %d inalterada(s)",
+        spreadsheet_id, range_name, changed, unchanged,
+    )
+    return changed, unchanged
+
 
 def sync_spreadsheet_data():
-    SPREADSHEET_ONE_ID = '1hCCNo_o8bk7IXva1KZt16FfTQX8m54FbQCxevjjNSt0'
-    SPREADSHEET_TWO_ID = '1y6lTtqhdQOZSjoJViedVWD3hs9-F-jhgYfYAcp43UM0'
-    # Ranges específicos para cada planilha, se necessário
-    RANGE_ONE = 'Sheet1'  # Ajuste conforme a aba da primeira planilha
-    RANGE_TWO = 'Sheet2!A1:Z100'  # Mantido como você definiu
-
-    def process_data(spreadsheet_id, data):
-        if not data or len(data) <= 1:
-            print(f"Nenhum dado encontrado na planilha {spreadsheet_id}")
-            return
-
-        income_mapping = {
-            '0-15k': '0k-15k',
-            '15-30k': '15k-25k',
-            '30-50k': '30k-50k',
-            '50-75k': '50k-75k',
-            '75-100k': '75k-100k',
-        }
-
-        for row in data[1:]:
-            try:
-                zipcode = int(row[0]) if len(row) > 0 and row[0].isdigit() else 0
-                plan = row[1] if len(row) > 1 and row[1] in dict(SheetData.PLAN_CHOICES) else 'individual'
-                type_ = row[2] if len(row) > 2 and row[2] in dict(SheetData.TYPE_CHOICES) else 'healthy'
-                income_raw = row[3] if len(row) > 3 else '0k-15k'
-                income = income_mapping.get(income_raw, '0k-15k')
-                firstname = row[4] if len(row) > 4 else ''
-                lastname = row[5] if len(row) > 5 else ''
-                birth = datetime.strptime(row[6], '%Y-%m-%d').date() if len(row) > 6 else datetime.now().date()
-                address = row[7] if len(row) > 7 else ''
-                state = row[8] if len(row) > 8 else ''
-                email = row[9] if len(row) > 9 else 'unknown@example.com'
-                phone = row[10] if len(row) > 10 else ''
-
-                defaults = {
-                    'zipcode': zipcode,
-                    'plan': plan,
-                    'type': type_,
-                    'income': income,
-                    'firstname': firstname,
-                    'lastname': lastname,
-                    'birth': birth,
-                    'address': address,
-                    'city': '',
-                    'state': state,
-                    'email': email,
-                    'phone': phone[:15],
-                }
-                obj, created = SheetData.objects.update_or_create(
-                    spreadsheet_id=spreadsheet_id,
-                    email=defaults['email'],
-                    defaults=defaults
-                )
-                print(f"Registro {'criado' if created else 'atualizado'} na planilha {spreadsheet_id}: {obj}")
-            except Exception as e:
-                print(f"Erro ao processar linha {row} na planilha {spreadsheet_id}: {e}")
-
-    data_one = fetch_spreadsheet_data(SPREADSHEET_ONE_ID, RANGE_ONE)
-    process_data(SPREADSHEET_ONE_ID, data_one)
-
-    data_two = fetch_spreadsheet_data(SPREADSHEET_TWO_ID, RANGE_TWO)
-    process_data(SPREADSHEET_TWO_ID, data_two)
\ No newline at end of file
+    # uma planilha fora do ar não impede o sync da outra
+    for spreadsheet_id, range_name in ((SPREADSHEET_ONE_ID, RANGE_ONE), (SPREADSHEET_TWO_ID, RANGE_TWO)):
+        try:
+            sync_sheet(spreadsheet_id, range_name)
+        except SheetFetchError:
+            pass  # já logado em fetch_spreadsheet_data
@@ -0,0 +1,30 @@
+# src/users/api/async_views.py
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from src.common.async_api import async_login_required
+from src.users.models import Profile
+
+
+@require_GET
+@async_login_required
+async def auth_session_async_view(request):
+    """
+    Versão async de auth_session_api (servida pelo ASGI).
+    JWT prevalece sobre o cookie de sessão, igual à view DRF.
+    """
+    user = request.user
+    profile_id = await (
+        Profile.objects.filter(user_id=user.id)
+        .values_list("id", flat=True)
+        .afirst()
+    )
+    return JsonResponse({
+        "user": {
+            "id": user.id,
+            "email": user.email,
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+        },
+        "profile_id": profile_id,
+    })
@@ -1,6 +1,12 @@
-from typing import Optional, Tuple
+from functools import reduce
+from operator import or_
+from typing import Dict, Iterable, List, Optional, Tuple
 import re
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
 from django.utils.text import slugify
 
 from src.users.models import Profile, UserType
@@ -51,6 +57,55 @@ def find_profile_by_contact(email: Optional[str], phone_norm: Optional[str]) ->
             return prof
     return None
 
+def _fill_from_form(
+    user: Optional[User],
+    prof: Profile,
+    *,
+    first_name: str,
+    last_name: str,
+    email: str,
+    phone_norm: str,
+    company_id: Optional[int],
+    customer_ut: UserType,
+) -> Tuple[set, set]:
+    """
+    Regra de merge de um formulário no User/Profile do cliente (inline e em lote):
+    user_type=Customer e só preenche o que está vazio, nunca sobrescreve.
+    Retorna os campos alterados (user, profile).
+    """
+    user_fields, prof_fields = set(), set()
+    if user is not None:  # Profile.user é opcional
+        if email and not user.email:
+            user.email = email
+            user_fields.add("email")
+        if first_name and not user.first_name:
+            user.first_name = first_name[:150]
+            user_fields.add("first_name")
+        if last_name and not user.last_name:
+            user.last_name = last_name[:150]
+            user_fields.add("last_name")
+
+    if prof.user_type_id != customer_ut.id:
+        prof.user_type = customer_ut
+        prof_fields.add("user_type")
+    if first_name and not prof.first_name:
+        prof.first_name = first_name[:40]
+        prof_fields.add("first_name")
+    if last_name and not prof.last_name:
+        prof.last_name = last_name[:40]
+        prof_fields.add("last_name")
+    if email and not prof.email:
+        prof.email = email
+        prof_fields.add("email")
+    if phone_norm and not prof.phone_number:
+        prof.phone_number = phone_norm[:12]
+        prof_fields.add("phone_number")
+    if company_id and not prof.company_id:
+        prof.company_id = company_id
+        prof_fields.add("company")
+    return user_fields, prof_fields
+
+
 def create_or_update_user_profile_from_form(
     *,
     first_name: str,
@@ -75,39 +130,21 @@ def create_or_update_user_profile_from_form(
         username = _derive_username(email, first_name, last_name, phone_norm)
         user = User.objects.create_user(username=username, email=email or None, password=None)
         user.set_unusable_password()
-        if first_name and not user.first_name:
-            user.first_name = first_name
-        if last_name and not user.last_name:
-            user.last_name = last_name
-        user.save()
-        prof = Profile.objects.create(user=user)
+        # o post_save de User (create_profile) já cria o Profile
+        prof, _ = Profile.objects.get_or_create(user=user)
     else:
         user = prof.user
-        # Atualiza o User de forma não destrutiva
-        if email and not user.email:
-            user.email = email
-        if first_name and not user.first_name:
-            user.first_name = first_name
-        if last_name and not user.last_name:
-            user.last_name = last_name
-        user.save()
 
-    # user_type = Customer
-    customer_ut = get_or_create_customer_usertype()
-    if not prof.user_type_id or prof.user_type_id != customer_ut.id:
-        prof.user_type = customer_ut
-
-    # Campos do Profile (não destrutivo no que for pessoal)
-    if first_name and not prof.first_name:
-        prof.first_name = first_name
-    if last_name and not prof.last_name:
-        prof.last_name = last_name
-    if email and not prof.email:
-        prof.email = email
-    if phone_norm and not prof.phone_number:
-        prof.phone_number = phone_norm
-    if company and not prof.company_id:
-        prof.company = company
+    # User e Profile de forma não destrutiva (mesma regra do vínculo em lote)
+    user_fields, _ = _fill_from_form(
+        user, prof,
+        first_name=first_name, last_name=last_name, email=email, phone_norm=phone_norm,
+        company_id=company.id if company else None,
+        customer_ut=get_or_create_customer_usertype(),
+    )
+    # só os campos alterados (o post_save de User invalida parciais de relatório)
+    if user_fields:
+        user.save(update_fields=sorted(user_fields))
 
     # Estes podem refletir o último interesse
     if coverageType:
@@ -119,3 +156,235 @@ def create_or_update_user_profile_from_form(
 
     prof.save()
     return user, prof
+
+
+# ---------------------------------------------------------------------
+# Vínculo em lote FormSubmission -> Profile (pipeline em background)
+# ---------------------------------------------------------------------
+
+def _username_base(email: str, first_name: str, last_name: str, phone_norm: str) -> str:
+    """Mesma regra de _derive_username, sem consultar o banco."""
+    if email and "@" in email:
+        base = email.split("@", 1)[0]
+    elif first_name or last_name:
+        base = f"{first_name}.{last_name}".replace("..", ".")
+    elif phone_norm:
+        base = f"user{phone_norm[-6:]}"
+    else:
+        base = "user"
+    return re.sub(r"[^a-z0-9._-]+", "", slugify(base or "user", allow_unicode=False)) or "user"
+
+
+def _unique_usernames(bases: Iterable[str]) -> List[str]:
+    """
+    Versão em lote de _unique_username: uma única query para os usernames
+    já ocupados e desambiguação em memória (base, base2, base3...).
+    """
+    bases = list(bases)
+    if not bases:
+        return []
+    taken = set(
+        User.objects.filter(reduce(or_, (Q(username__startswith=b) for b in set(bases))))
+        .values_list("username", flat=True)
+    )
+    out = []
+    for base in bases:
+        cand, i = base, 2
+        while cand in taken:
+            cand = f"{base}{i}"
+            i += 1
+        taken.add(cand)
+        out.append(cand)
+    return out
+
+
+def _resolve_profiles_by_contact(emails, phones) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """
+    Equivalente set-based de find_profile_by_contact para muitos contatos:
+    retorna ({email: profile_id}, {phone_norm: profile_id}).
+    """
+    by_email: Dict[str, int] = {}
+    by_phone: Dict[str, int] = {}
+
+    if emails:
+        rows = (
+            Profile.objects.annotate(email_l=Lower("email"))
+            .filter(email_l__in=emails)
+            .order_by("id")
+            .values_list("email_l", "id")
+        )
+        for em, pid in rows:
+            by_email.setdefault(em, pid)
+
+        missing = [e for e in emails if e not in by_email]
+        if missing:
+            rows = (
+                User.objects.annotate(email_l=Lower("email"))
+                .filter(email_l__in=missing, profile__isnull=False)
+                .order_by("id")
+                .values_list("email_l", "profile__id")
+            )
+            for em, pid in rows:
+                by_email.setdefault(em, pid)
+
+    if phones:
+        rows = (
+            Profile.objects.filter(phone_number__in=phones)
+            .order_by("id")
+            .values_list("phone_number", "id")
+        )
+        for ph, pid in rows:
+            by_phone.setdefault(ph, pid)
+
+    return by_email, by_phone
+
+
+def _group_by_contact(subs, contacts) -> List[list]:
+    """
+    Agrupa as submissions da mesma pessoa: mesmo email OU mesmo telefone
+    (transitivo: só-telefone + email/telefone com o mesmo número -> um grupo).
+    Sem contato utilizável (email em branco, telefone sem dígitos, ex.: "N/A"):
+    grupo próprio, como o fluxo inline, que cria um User por submission.
+    """
+    parent: Dict[str, str] = {}
+
+    def find(x: str) -> str:
+        while parent.setdefault(x, x) != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def node(s) -> str:
+        em, ph = contacts[s.id]
+        if em:
+            return f"e:{em}"
+        return f"p:{ph}" if ph else f"s:{s.id}"
+
+    for s in subs:
+        em, ph = contacts[s.id]
+        if em and ph:
+            parent[find(f"p:{ph}")] = find(f"e:{em}")
+        else:
+            find(node(s))
+
+    groups: Dict[str, list] = {}
+    for s in subs:
+        groups.setdefault(find(node(s)), []).append(s)
+    return list(groups.values())
+
+
+def link_form_submissions_batch(batch_size: int = 500) -> int:
+    """
+    Vincula um lote de FormSubmission sem profile ao Profile do cliente.
+    Faz o mesmo que create_or_update_user_profile_from_form, mas por lote:
+      - agrupa as submissions por pessoa (email OU telefone normalizado)
+      - resolve contatos com poucas queries (email/telefone via IN)
+      - cria os User/Profile que faltam com bulk_create (user_type=Customer)
+      - aplica o mesmo merge não destrutivo do fluxo inline (_fill_from_form) e
+        grava com bulk_update
+      - grava FormSubmission.profile com um único bulk_update
+    Usa SELECT ... FOR UPDATE SKIP LOCKED, então vários workers podem rodar juntos.
+    Retorna quantas submissions foram vinculadas (0 = nada pendente).
+    """
+    from src.forms.models import FormSubmission  # evita import circular (forms -> users.Profile)
+
+    with transaction.atomic():
+        subs = list(
+            FormSubmission.objects.select_for_update(skip_locked=True)
+            .filter(profile__isnull=True)
+            .filter(Q(email__gt="") | Q(phone__gt=""))
+            .only("id", "email", "phone", "first_name", "last_name", "company_id")
+            .order_by("id")[:batch_size]
+        )
+        if not subs:
+            return 0
+
+        contacts = {
+            s.id: ((s.email or "").strip().lower(), _normalize_phone(s.phone))
+            for s in subs
+        }
+        emails = {em for em, _ in contacts.values() if em}
+        phones = {ph for _, ph in contacts.values() if ph}
+        by_email, by_phone = _resolve_profiles_by_contact(emails, phones)
+
+        # Pessoas sem profile: um novo User+Profile por grupo (não por submission)
+        groups = _group_by_contact(subs, contacts)
+        group_pid: Dict[int, int] = {}
+        pending: List[int] = []
+        for i, group in enumerate(groups):
+            # email tem prioridade sobre telefone, como em find_profile_by_contact
+            pid = next((by_email[contacts[s.id][0]] for s in group if contacts[s.id][0] in by_email), None)
+            if pid is None:
+                pid = next((by_phone[contacts[s.id][1]] for s in group if contacts[s.id][1] in by_phone), None)
+            if pid is None:
+                pending.append(i)
+            else:
+                group_pid[i] = pid
+
+        customer_ut = get_or_create_customer_usertype()
+        profiles: Dict[int, Profile] = Profile.objects.select_related("user").in_bulk(set(group_pid.values()))
+
+        if pending:
+            firsts = [groups[i][0] for i in pending]
+            usernames = _unique_usernames(
+                _username_base(contacts[s.id][0], s.first_name or "", s.last_name or "", contacts[s.id][1])
+                for s in firsts
+            )
+            users = User.objects.bulk_create([
+                User(
+                    username=username,
+                    email=contacts[s.id][0],
+                    first_name=(s.first_name or "")[:150],
+                    last_name=(s.last_name or "")[:150],
+                    password=make_password(None),  # senha inutilizável, igual ao fluxo inline
+                )
+                for s, username in zip(firsts, usernames)
+            ])
+            # bulk_create não dispara o post_save -> criamos os Profiles aqui
+            created = Profile.objects.bulk_create([
+                Profile(
+                    user=user,
+                    user_type=customer_ut,
+                    first_name=(s.first_name or "")[:40] or None,
+                    last_name=(s.last_name or "")[:40] or None,
+                    email=contacts[s.id][0] or None,
+                    phone_number=contacts[s.id][1][:12] or None,
+                    company_id=s.company_id,
+                )
+                for s, user in zip(firsts, users)
+            ])
+            for i, prof in zip(pending, created):
+                group_pid[i] = prof.id
+                profiles[prof.id] = prof
+
+        # merge de cada submission no profile do grupo (ordem de id, igual ao inline)
+        user_fields, prof_fields = set(), set()
+        changed_users, changed_profiles = {}, {}
+        for i, group in enumerate(groups):
+            prof = profiles[group_pid[i]]
+            for s in group:
+                em, ph = contacts[s.id]
+                uf, pf = _fill_from_form(
+                    prof.user, prof,
+                    first_name=s.first_name or "", last_name=s.last_name or "",
+                    email=em, phone_norm=ph, company_id=s.company_id, customer_ut=customer_ut,
+                )
+                if uf:
+                    user_fields |= uf
+                    changed_users[prof.user.pk] = prof.user
+                if pf:
+                    prof_fields |= pf
+                    changed_profiles[prof.pk] = prof
+                s.profile_id = prof.id
+        if changed_users:
+            User.objects.bulk_update(list(changed_users.values()), sorted(user_fields))
+        if changed_profiles:
+            Profile.objects.bulk_update(list(changed_profiles.values()), sorted(prof_fields))
+
+        FormSubmission.objects.bulk_update(subs, ["profile"])
+        # bulk_update não dispara signals: parciais de relatório que dependem desses campos
+        from src.reports.incremental import invalidate_for_update
+        invalidate_for_update(User, user_fields)
+        invalidate_for_update(FormSubmission, ["profile"])
+
+    return len(subs)
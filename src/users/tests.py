@@ -1,3 +1,60 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
 
-# Create your tests here.
+from src.forms.models import FormSubmission
+from src.users.models import Profile
+from src.users.services import link_form_submissions_batch
+
+
+class LinkFormSubmissionsBatchTests(TestCase):
+    def _sub(self, **kw):
+        kw.setdefault("formType", "contact")
+        return FormSubmission.objects.create(**kw)
+
+    def test_phone_only_and_email_phone_become_one_profile(self):
+        a = self._sub(phone="(555) 123-4567", first_name="Ana")
+        b = self._sub(email="Ana@Example.com", phone="555.123.4567", last_name="Silva")
+        c = self._sub(email="ana@example.com")
+
+        self.assertEqual(link_form_submissions_batch(), 3)
+
+        ids = set(FormSubmission.objects.filter(pk__in=[a.pk, b.pk, c.pk]).values_list("profile_id", flat=True))
+        self.assertEqual(len(ids), 1)
+        prof = Profile.objects.select_related("user").get(pk=ids.pop())
+        self.assertEqual(prof.phone_number, "5551234567")
+        self.assertEqual(prof.email, "ana@example.com")
+        self.assertEqual((prof.first_name, prof.last_name), ("Ana", "Silva"))
+        self.assertEqual(prof.user.email, "ana@example.com")
+        self.assertEqual(prof.user_type.user_type, "Customer")
+
+    def test_submissions_without_usable_contact_are_not_merged(self):
+        a = self._sub(email="  ", phone="N/A", first_name="Ana")
+        b = self._sub(phone="-", first_name="Bia")
+
+        self.assertEqual(link_form_submissions_batch(), 2)
+
+        profiles = dict(FormSubmission.objects.filter(pk__in=[a.pk, b.pk]).values_list("pk", "profile_id"))
+        self.assertNotEqual(profiles[a.pk], profiles[b.pk])
+        self.assertEqual(
+            set(Profile.objects.filter(pk__in=profiles.values()).values_list("first_name", flat=True)),
+            {"Ana", "Bia"},
+        )
+
+    def test_existing_profile_gets_empty_fields_filled_not_overwritten(self):
+        user = User.objects.create_user("bob", email="")
+        prof = user.profile  # criado pelo post_save
+        prof.phone_number = "5550001111"
+        prof.first_name = "Robert"
+        prof.save()
+        self._sub(phone="555-000-1111", first_name="Bob", last_name="Lee", email="bob@example.com")
+
+        link_form_submissions_batch()
+
+        prof.refresh_from_db()
+        user.refresh_from_db()
+        self.assertEqual(prof.first_name, "Robert")
+        self.assertEqual(prof.last_name, "Lee")
+        self.assertEqual(prof.email, "bob@example.com")
+        self.assertEqual(user.email, "bob@example.com")
+        self.assertEqual(prof.user_type.user_type, "Customer")
+        self.assertEqual(Profile.objects.count(), 1)